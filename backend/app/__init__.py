@@ -1,16 +1,47 @@
 from flask import Flask
 from flask_cors import CORS
 import os
+import threading
 from dotenv import load_dotenv
 
-def create_app():
+def create_app(mode=None):
+    """Build the API app.
+
+    mode (default: SERVER_MODE, 'sync') picks the serving mode: 'sync' returns the Flask WSGI
+    app; 'async' wraps it in an ASGI app that serves the upstream-bound routes on an event loop.
+    """
     # Load environment variables from .env file
     load_dotenv()
+    mode = (mode or os.environ.get('SERVER_MODE', 'sync')).lower()
+    if mode not in ('sync', 'async'):
+        raise ValueError(f"Unknown SERVER_MODE '{mode}'; expected 'sync' or 'async'")
+    
+    # Route application logs through the background log writer
+    from .log import configure_logging
+    configure_logging()
     
     app = Flask(__name__)
     CORS(app)
     
-    from .routes import api_bp
+    # orjson-backed JSON (with numpy/pandas support) unless JSON_PROVIDER=stdlib
+    from .json_provider import JSON_PROVIDERS
+    provider = os.environ.get('JSON_PROVIDER', 'fast').lower()
+    if provider not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER '{provider}'; expected one of {', '.join(JSON_PROVIDERS)}")
+    app.json = JSON_PROVIDERS[provider](app)
+    
+    from .routes import api_bp, dashboard_snapshots, prefetch_company_reference
     app.register_blueprint(api_bp, url_prefix='/api')
     
-    return app 
\ No newline at end of file
+    # Keep the shared dashboard snapshots warm in the background
+    if os.environ.get('SNAPSHOT_BACKGROUND_REFRESH', 'true').lower() == 'true':
+        dashboard_snapshots.start()
+    
+    # Warm the on-disk company reference store so quotes don't need OVERVIEW calls
+    if os.environ.get('REFERENCE_PREFETCH', 'true').lower() == 'true':
+        threading.Thread(target=prefetch_company_reference, name='reference-prefetch', daemon=True).start()
+    
+    if mode == 'async':
+        from .asgi import AsyncAPI
+        return AsyncAPI(app)
+    return app
@@ -0,0 +1,697 @@
+import asyncio
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from .circuit import upstream_circuits
+from .fanout import FanOutResult
+from .llm_cache import llm_cache
+from .log import get_logger
+from .metrics import metrics, current_route, http_error_reason
+from .ratelimit import alpha_vantage_governor, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from .reference import company_reference
+from .routes import (
+    ALPHA_VANTAGE_API_KEY, XAI_API_KEY, USE_MOCK_DATA_FALLBACK, BATCH_QUOTES_MAX_SYMBOLS,
+    BATCH_QUOTES_DEADLINE, FANOUT_MAX_WORKERS, STREAM_MAX_SYMBOLS, STREAM_HEARTBEAT_INTERVAL,
+    quote_cache, upstream_flights, quote_hub, parse_symbol_list, has_quote_price,
+    alpha_vantage_call_key, short_circuit_alpha_vantage, record_alpha_vantage_reply, quote_fallback,
+    build_quote, build_batch_entry, batch_quotes_payload, quote_event, get_mock_quote, xai_headers,
+    news_summary_body, research_body, completion_content, chat_stream_delta, mock_token_chunks, sse_event,
+    ChatStreamError, XAI_CIRCUIT_OPEN, get_mock_news_summary, get_mock_research_response
+)
+from .singleflight import AsyncSingleFlight
+from .streaming import TooManyConnections
+from .upstream import AsyncUpstreamClient, alpha_vantage, xai
+
+# Threads serving the routes that are not handled natively (history, indicators, dashboards...)
+ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', '32'))
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no')
+]
+# flask-cors allows every origin on the sync app; native responses send the same header
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+log = get_logger('asgi')
+
+alpha_vantage_async = None
+xai_async = None
+async_flights = AsyncSingleFlight(upstream_flights)
+
+
+class AsyncRequest:
+    """The parts of an ASGI HTTP request the native handlers use"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = parse_qs(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+        self.body = body
+
+    def arg(self, name, default=None):
+        values = self.args.get(name)
+        return values[0] if values else default
+
+    def arg_list(self, name):
+        return self.args.get(name, [])
+
+    def get_json(self):
+        try:
+            return json.loads(self.body or b'null')
+        except ValueError:
+            return None
+
+
+class JSONResponse:
+    def __init__(self, payload, status=200):
+        self.payload = payload
+        self.status = status
+
+
+class EventStreamResponse:
+    """A Server-Sent Events response fed by an async generator of event strings"""
+
+    def __init__(self, events):
+        self.events = events
+
+
+# --- Alpha Vantage -------------------------------------------------------------------------
+
+async def query_alpha_vantage(params, priority=PRIORITY_BACKGROUND):
+    """Async query_alpha_vantage: same budget, circuits, single-flight key and 'Information' fallback"""
+    return await async_flights.do(alpha_vantage_call_key(params), lambda: send_alpha_vantage(params, priority))
+
+
+async def send_alpha_vantage(params, priority):
+    function = params['function']
+    shortcut = short_circuit_alpha_vantage(params)
+    if shortcut is not None:
+        return shortcut
+    if not await alpha_vantage_governor.acquire_async(priority):
+        upstream_circuits.get('alpha_vantage', function).release()
+        metrics.record_upstream_error(function, 'budget')
+        return {"Information": "Alpha Vantage call budget exhausted; request was not sent."}
+
+    try:
+        response, data = await timed_upstream_json(function, alpha_vantage_async.get(params=params))
+    except Exception:
+        upstream_circuits.get('alpha_vantage', function).record_failure()
+        raise
+    # A rate-limit reply marks the shared SQLite budget exhausted
+    await asyncio.to_thread(record_alpha_vantage_reply, params, data)
+    return data
+
+
+async def timed_upstream_json(function, sending, decode_errors=True):
+    """Async routes.timed_upstream_json: awaits the request coroutine and decodes the reply"""
+    started = time.perf_counter()
+    try:
+        response = await sending
+    except Exception:
+        metrics.observe_upstream(function, time.perf_counter() - started)
+        metrics.record_upstream_error(function, 'network')
+        raise
+
+    received = time.perf_counter()
+    if response.status_code >= 400:
+        metrics.record_upstream_error(function, http_error_reason(response.status_code))
+    if response.status_code != 200 and not decode_errors:
+        metrics.observe_upstream(function, received - started)
+        return response, None
+
+    try:
+        return response, response.json()
+    except ValueError:
+        metrics.record_upstream_error(function, 'parse')
+        raise
+    finally:
+        metrics.observe_upstream(function, received - started, time.perf_counter() - received)
+
+
+async def fetch_global_quote(symbol, priority=PRIORITY_BACKGROUND):
+    cached = quote_cache.get(symbol.upper())
+    if cached is not None:
+        return cached
+    return await request_global_quote(symbol, priority)
+
+
+async def request_global_quote(symbol, priority=PRIORITY_BACKGROUND):
+    params = {
+        'function': 'GLOBAL_QUOTE',
+        'symbol': symbol,
+        'apikey': ALPHA_VANTAGE_API_KEY
+    }
+    data = await query_alpha_vantage(params, priority)
+
+    if has_quote_price(data):
+        quote_cache.set(symbol.upper(), data)
+    return data
+
+
+async def fetch_company_reference(symbol, priority=PRIORITY_BACKGROUND):
+    reference = await asyncio.to_thread(company_reference.get, symbol)
+    if reference is not None:
+        return reference
+
+    try:
+        company_params = {
+            'function': 'OVERVIEW',
+            'symbol': symbol,
+            'apikey': ALPHA_VANTAGE_API_KEY
+        }
+        company_data = await query_alpha_vantage(company_params, priority)
+        reference = await asyncio.to_thread(company_reference.put_reply, symbol, company_data)
+        if reference is not None:
+            if not company_data.get("Name"):
+                log.info('reference.placeholder', symbol=symbol)
+            return reference
+        log.info('reference.missing', symbol=symbol)
+    except Exception as e:
+        log.warning('reference.fetch_failed', symbol=symbol, error=str(e))
+
+    return await asyncio.to_thread(company_reference.get, symbol, allow_stale=True) or {}
+
+
+# --- X.AI ----------------------------------------------------------------------------------
+
+async def post_chat_completion(headers, body, timeout):
+    breaker = upstream_circuits.get('xai', 'xai_chat')
+    if not breaker.allow():
+        metrics.record_upstream_error('xai_chat', 'circuit_open')
+        return XAI_CIRCUIT_OPEN
+    try:
+        response, data = await timed_upstream_json(
+            'xai_chat', xai_async.post("/chat/completions", headers=headers, json=body, timeout=timeout), decode_errors=False
+        )
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record(response.status_code == 200)
+    if response.status_code == 200:
+        return response.status_code, data, None
+    return response.status_code, None, response.text or "No response text available"
+
+
+async def stream_chat_completion(headers, body, timeout):
+    breaker = upstream_circuits.get('xai', 'xai_chat_stream')
+    if not breaker.allow():
+        metrics.record_upstream_error('xai_chat_stream', 'circuit_open')
+        raise ChatStreamError(XAI_CIRCUIT_OPEN[2])
+    started = time.perf_counter()
+    try:
+        response = await xai_async.post("/chat/completions", headers=headers, json=dict(body, stream=True),
+                                        timeout=timeout, stream=True)
+    except Exception:
+        breaker.record_failure()
+        metrics.observe_upstream('xai_chat_stream', time.perf_counter() - started)
+        metrics.record_upstream_error('xai_chat_stream', 'network')
+        raise
+
+    parse = 0.0
+    breaker.record(response.status_code == 200)
+    try:
+        if response.status_code != 200:
+            metrics.record_upstream_error('xai_chat_stream', http_error_reason(response.status_code))
+            raise ChatStreamError(f"Error calling X.AI API: {response.status_code}")
+
+        async for line in response.aiter_lines():
+            parsing = time.perf_counter()
+            finished, content = chat_stream_delta(line)
+            parse += time.perf_counter() - parsing
+            if finished:
+                break
+            if content:
+                yield content
+    finally:
+        metrics.observe_upstream('xai_chat_stream', time.perf_counter() - started - parse, parse)
+        await response.aclose()
+
+
+async def completion_events(headers, body, timeout, mock_text, fields, error=None):
+    """Async counterpart of routes.stream_completion_response's event generator"""
+    source = "xai"
+    failure = error
+    sent = False
+    if headers is not None:
+        cached = await asyncio.to_thread(llm_cache.get, body)
+        if cached is not None:
+            for content in mock_token_chunks(cached):
+                yield sse_event("token", {"content": content})
+            yield sse_event("done", dict(fields, source=source, cached=True))
+            return
+
+        parts = []
+        try:
+            async for content in stream_chat_completion(headers, body, timeout):
+                sent = True
+                parts.append(content)
+                yield sse_event("token", {"content": content})
+            await asyncio.to_thread(llm_cache.put, body, ''.join(parts))
+        except Exception as e:
+            failure = f"Error streaming X.AI completion: {str(e)}"
+            log.warning('xai.stream_failed', error=failure)
+
+    if headers is None or (failure and not sent):
+        source = "mock"
+        for content in mock_token_chunks(mock_text()):
+            yield sse_event("token", {"content": content})
+
+    done = dict(fields, source=source)
+    if failure:
+        done["error"] = failure
+    yield sse_event("done", done)
+
+
+# --- Native route handlers -----------------------------------------------------------------
+
+async def get_quote(request, symbol):
+    try:
+        # Add a small delay to simulate network latency
+        await asyncio.sleep(0.2)
+
+        log.debug('quote.request', symbol=symbol)
+
+        try:
+            data = await fetch_global_quote(symbol, PRIORITY_INTERACTIVE)
+
+            log.debug('quote.response', symbol=symbol, payload=data)
+
+            if not has_quote_price(data):
+                return JSONResponse(*quote_fallback(symbol, data))
+
+            reference = await fetch_company_reference(symbol, PRIORITY_INTERACTIVE)
+            return JSONResponse(build_quote(symbol, data['Global Quote'], reference))
+        except Exception as api_error:
+            log.warning('quote.request_failed', symbol=symbol, error=str(api_error))
+            if USE_MOCK_DATA_FALLBACK:
+                log.info('quote.mock_fallback', symbol=symbol, reason='request_error')
+                return JSONResponse(get_mock_quote(symbol))
+            raise api_error
+
+    except Exception as e:
+        log.exception('quote.failed', symbol=symbol, error=str(e))
+
+        if USE_MOCK_DATA_FALLBACK:
+            log.info('quote.mock_fallback', symbol=symbol, reason='exception')
+            return JSONResponse(get_mock_quote(symbol))
+
+        return JSONResponse({"error": str(e)}, 500)
+
+
+async def get_quotes(request):
+    try:
+        symbols = parse_symbol_list(','.join(request.arg_list('symbols')))
+
+        if not symbols:
+            return JSONResponse({"error": "At least one symbol is required"}, 400)
+        if len(symbols) > BATCH_QUOTES_MAX_SYMBOLS:
+            return JSONResponse({"error": f"At most {BATCH_QUOTES_MAX_SYMBOLS} symbols are allowed per request"}, 400)
+
+        references = await asyncio.to_thread(company_reference.get_many, symbols, allow_stale=True)
+        quotes = {}
+
+        to_fetch = []
+        for symbol in symbols:
+            cached = quote_cache.get(symbol)
+            if cached is not None:
+                quotes[symbol] = build_batch_entry(symbol, cached, references.get(symbol, {}), "cache")
+            else:
+                to_fetch.append(symbol)
+
+        # Same concurrency cap per request as the sync mode's batch pool
+        limit = asyncio.Semaphore(FANOUT_MAX_WORKERS)
+
+        async def load_quote(symbol):
+            async with limit:
+                data = await request_global_quote(symbol, PRIORITY_INTERACTIVE)
+                reference = references.get(symbol)
+                if reference is None and has_quote_price(data):
+                    reference = await fetch_company_reference(symbol)
+            return build_batch_entry(symbol, data, reference or {}, "live")
+
+        result = await gather_until(load_quote, to_fetch, BATCH_QUOTES_DEADLINE)
+        return JSONResponse(batch_quotes_payload(symbols, quotes, result, BATCH_QUOTES_DEADLINE))
+    except Exception as e:
+        log.exception('quotes.failed', error=str(e))
+        return JSONResponse({"error": str(e)}, 500)
+
+
+async def gather_until(fn, keys, deadline):
+    """Run fn(key) for every key concurrently and collect what finishes before the deadline"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks = {asyncio.ensure_future(fn(key)): key for key in keys}
+    if tasks:
+        await asyncio.wait(tasks, timeout=deadline)
+
+    results, errors, missed = {}, {}, []
+    for task, key in tasks.items():
+        if not task.done():
+            task.cancel()
+            missed.append(key)
+        elif task.exception() is not None:
+            errors[key] = task.exception()
+        else:
+            results[key] = task.result()
+    return FanOutResult(results, errors, missed, loop.time() - started)
+
+
+async def stream_quotes(request):
+    symbols = parse_symbol_list(','.join(request.arg_list('symbols')))
+
+    if not symbols:
+        return JSONResponse({"error": "At least one symbol is required"}, 400)
+    if len(symbols) > STREAM_MAX_SYMBOLS:
+        return JSONResponse({"error": f"At most {STREAM_MAX_SYMBOLS} symbols are allowed per stream"}, 400)
+
+    # Pollers push from their own threads; the wakeup moves the notification onto the loop
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Event()
+    try:
+        subscription = quote_hub.subscribe(symbols)
+    except TooManyConnections as e:
+        return JSONResponse({"error": str(e)}, 503)
+    subscription.wakeup = lambda: loop.call_soon_threadsafe(pending.set)
+    if not subscription.queue.empty():
+        pending.set()
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(pending.wait(), timeout=STREAM_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                pending.clear()
+                while not subscription.queue.empty():
+                    symbol, quote = subscription.queue.get_nowait()
+                    yield quote_event(symbol, quote)
+        finally:
+            quote_hub.unsubscribe(subscription)
+
+    return EventStreamResponse(events())
+
+
+async def get_stock_news_summary(request, symbol):
+    try:
+        stream = (request.arg('stream') or 'false').lower() == 'true'
+        log.debug('news_summary.request', symbol=symbol, stream=stream)
+
+        if not XAI_API_KEY:
+            log.warning('xai.not_configured')
+            if stream:
+                return EventStreamResponse(completion_events(None, None, None, lambda: get_mock_news_summary(symbol),
+                                                             {"symbol": symbol}, error="X.AI API key is not configured"))
+            return JSONResponse({
+                "symbol": symbol,
+                "summary": get_mock_news_summary(symbol),
+                "source": "mock",
+                "error": "X.AI API key is not configured"
+            })
+
+        headers = xai_headers()
+        body = news_summary_body(symbol)
+
+        if stream:
+            return EventStreamResponse(completion_events(headers, body, 20, lambda: get_mock_news_summary(symbol), {"symbol": symbol}))
+
+        cached = await asyncio.to_thread(llm_cache.get, body)
+        if cached is not None:
+            return JSONResponse({"symbol": symbol, "summary": cached, "source": "xai", "cached": True})
+
+        status_code, data, error_details = await async_flights.do(
+            ('xai_chat', json.dumps(body, sort_keys=True)),
+            lambda: post_chat_completion(headers, body, timeout=20)
+        )
+
+        log.debug('xai.response', status=status_code)
+
+        if status_code == 200:
+            message = completion_content(data)
+            if message is not None:
+                await asyncio.to_thread(llm_cache.put, body, message)
+                return JSONResponse({"symbol": symbol, "summary": message, "source": "xai"})
+            log.warning('xai.invalid_response', payload=data)
+            return JSONResponse({
+                "symbol": symbol,
+                "summary": get_mock_news_summary(symbol),
+                "source": "mock",
+                "error": "Invalid API response format"
+            })
+
+        error_message = f"Error calling X.AI API: {status_code}"
+        log.warning('xai.request_failed', status=status_code, details=error_details)
+        return JSONResponse({
+            "symbol": symbol,
+            "summary": get_mock_news_summary(symbol),
+            "source": "mock",
+            "error": error_message
+        })
+
+    except Exception as e:
+        error_message = f"Error generating news summary for {symbol}: {str(e)}"
+        log.exception('xai.failed', error=error_message)
+        return JSONResponse({
+            "symbol": symbol,
+            "summary": get_mock_news_summary(symbol),
+            "source": "mock",
+            "error": error_message
+        })
+
+
+async def get_research_response(request):
+    data = request.get_json()
+    if not isinstance(data, dict) or 'message' not in data:
+        return JSONResponse({"error": "Message is required"}, 400)
+
+    message = data['message']
+    prompt_type = data.get('promptType', 'GENERAL_ADVISOR')
+    try:
+        stream = bool(data.get('stream')) or (request.arg('stream') or 'false').lower() == 'true'
+
+        log.debug('research.request', prompt_type=prompt_type, stream=stream)
+
+        if not XAI_API_KEY:
+            log.warning('xai.not_configured')
+            if stream:
+                return EventStreamResponse(completion_events(None, None, None, lambda: get_mock_research_response(message, prompt_type),
+                                                             {}, error="X.AI API key is not configured"))
+            return JSONResponse({
+                "response": get_mock_research_response(message, prompt_type),
+                "source": "mock",
+                "error": "X.AI API key is not configured"
+            })
+
+        headers = xai_headers()
+        body = research_body(message, prompt_type)
+
+        if stream:
+            return EventStreamResponse(completion_events(headers, body, 30, lambda: get_mock_research_response(message, prompt_type), {}))
+
+        cached = await asyncio.to_thread(llm_cache.get, body)
+        if cached is not None:
+            return JSONResponse({"response": cached, "source": "xai", "cached": True})
+
+        status_code, data, error_details = await post_chat_completion(headers, body, timeout=30)
+
+        log.debug('xai.response', status=status_code)
+
+        if status_code == 200:
+            ai_response = completion_content(data)
+            if ai_response is not None:
+                await asyncio.to_thread(llm_cache.put, body, ai_response)
+                return JSONResponse({"response": ai_response, "source": "xai"})
+            log.warning('xai.invalid_response', payload=data)
+            return JSONResponse({
+                "response": get_mock_research_response(message, prompt_type),
+                "source": "mock",
+                "error": "Invalid API response format"
+            })
+
+        error_message = f"Error calling X.AI API: {status_code}"
+        log.warning('xai.request_failed', status=status_code, details=error_details)
+        return JSONResponse({
+            "response": get_mock_research_response(message, prompt_type),
+            "source": "mock",
+            "error": error_message
+        })
+
+    except Exception as e:
+        error_message = f"Error generating research response: {str(e)}"
+        log.exception('xai.failed', error=error_message)
+        return JSONResponse({
+            "response": get_mock_research_response(message, prompt_type),
+            "source": "mock",
+            "error": error_message
+        })
+
+
+# method, path pattern, Flask rule (the metrics route label), handler; path groups are passed to the handler
+NATIVE_ROUTES = [
+    ('GET', re.compile(r'^/api/quote/([^/]+)$'), '/api/quote/<symbol>', get_quote),
+    ('GET', re.compile(r'^/api/quotes$'), '/api/quotes', get_quotes),
+    ('GET', re.compile(r'^/api/stream/quotes$'), '/api/stream/quotes', stream_quotes),
+    ('GET', re.compile(r'^/api/stock-news-summary/([^/]+)$'), '/api/stock-news-summary/<symbol>', get_stock_news_summary),
+    ('POST', re.compile(r'^/api/research$'), '/api/research', get_research_response)
+]
+
+
+class AsyncAPI:
+    """ASGI application for the async serving mode.
+
+    The routes that spend their time waiting on Alpha Vantage or X.AI (quotes, the quote
+    stream, news summaries and research) run as coroutines on the event loop with an httpx
+    client per upstream, so one process can hold hundreds of them in flight. Every other
+    request is passed to the Flask app on a bounded thread pool, so all endpoints and
+    response shapes match the sync mode.
+    """
+
+    def __init__(self, flask_app, wsgi_threads=ASYNC_WSGI_THREADS):
+        global alpha_vantage_async, xai_async
+        if alpha_vantage_async is None:
+            alpha_vantage_async = AsyncUpstreamClient(alpha_vantage)
+            xai_async = AsyncUpstreamClient(xai)
+
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=wsgi_threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await read_body(receive)
+        for method, pattern, rule, handler in NATIVE_ROUTES:
+            match = pattern.match(scope['path'])
+            if match and scope['method'] == method:
+                # Each request runs in its own task, so the route label stays with this request
+                current_route.set(rule)
+                started = time.perf_counter()
+                response = await handler(AsyncRequest(scope, body), *match.groups())
+                status = response.status if isinstance(response, JSONResponse) else 200
+                metrics.observe_route(rule, method, status, time.perf_counter() - started)
+                await self.respond(response, receive, send)
+                return
+
+        await self.call_wsgi(scope, body, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await alpha_vantage_async.aclose()
+                await xai_async.aclose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, response, receive, send):
+        if isinstance(response, JSONResponse):
+            body = self.flask_app.json.response_bytes(response.payload)
+            await send({
+                'type': 'http.response.start',
+                'status': response.status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())] + CORS_HEADERS
+            })
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS + CORS_HEADERS})
+
+        async def pump():
+            async for chunk in response.events:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        # Stop generating (and release the subscription) as soon as the client goes away
+        streaming = asyncio.ensure_future(pump())
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        for task in (streaming, disconnected):
+            task.cancel()
+        await asyncio.gather(streaming, disconnected, return_exceptions=True)
+        await response.events.aclose()
+
+    async def call_wsgi(self, scope, body, send):
+        """Serve a request with the Flask app on the thread pool, relaying its body chunk by chunk"""
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        iterable = await loop.run_in_executor(self.executor, self.flask_app, wsgi_environ(scope, body), start_response)
+        chunks = iter(iterable)
+        try:
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            while chunk is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(self.executor, iterable.close)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def wsgi_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body))
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
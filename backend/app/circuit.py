@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+from .log import get_logger
+from .metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+log = get_logger('circuit')
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one upstream function.
+
+    Closed: calls go through and consecutive failures are counted. After failure_threshold
+    of them the circuit opens and calls are refused without being sent. Once recovery_timeout
+    seconds have passed it is half-open: one probe call at a time goes through, and
+    success_threshold consecutive successful probes close it again while a failed probe
+    re-opens it. A probe that never reports back frees its slot after recovery_timeout.
+    """
+
+    def __init__(self, upstream, function, failure_threshold=5, recovery_timeout=30.0, success_threshold=1):
+        self.upstream = upstream
+        self.function = function
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.success_threshold = success_threshold
+        self.state = CLOSED
+        self.failures = 0
+        self.successes = 0
+        self.opened_at = None
+        self.probe_started = None
+        self.rejected = 0
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may be sent now; refused calls are counted"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and (self.probe_started is None
+                                            or now - self.probe_started >= self.recovery_timeout):
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back a permitted call that was not sent after all"""
+        with self._lock:
+            self.probe_started = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self.probe_started = None
+                self.successes += 1
+                if self.successes >= self.success_threshold:
+                    self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def record(self, success):
+        if success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def _transition(self, state):
+        self.state = state
+        self.successes = 0
+        self.probe_started = None
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.opened += 1
+        metrics.record_circuit_state(self.upstream, self.function, state)
+        log.warning('circuit.' + state, upstream=self.upstream, function=self.function, failures=self.failures)
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutiveFailures": self.failures,
+                "retryIn": retry_in,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+
+
+class CircuitBreakers:
+    """One breaker per (upstream, function), created on first use with shared thresholds"""
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, success_threshold=1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.success_threshold = success_threshold
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, upstream, function):
+        breaker = self._breakers.get((upstream, function))
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get((upstream, function))
+                if breaker is None:
+                    breaker = self._breakers[(upstream, function)] = CircuitBreaker(
+                        upstream, function, self.failure_threshold, self.recovery_timeout, self.success_threshold
+                    )
+        return breaker
+
+    def status(self):
+        """{upstream: {function: breaker status}} for monitoring"""
+        with self._lock:
+            breakers = sorted(self._breakers.items())
+        status = {}
+        for (upstream, function), breaker in breakers:
+            status.setdefault(upstream, {})[function] = breaker.status()
+        return status
+
+
+upstream_circuits = CircuitBreakers(
+    failure_threshold=int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5')),
+    recovery_timeout=float(os.environ.get('CIRCUIT_RECOVERY_TIMEOUT', '30')),
+    success_threshold=int(os.environ.get('CIRCUIT_SUCCESS_THRESHOLD', '1'))
+)
@@ -0,0 +1,67 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class FanOutResult:
+    """Outcome of a fan-out: per-key results, per-key errors and the keys that missed the deadline"""
+
+    def __init__(self, results, errors, missed, elapsed):
+        self.results = results
+        self.errors = errors
+        self.missed = missed
+        self.elapsed = elapsed
+
+    @property
+    def partial(self):
+        return bool(self.missed)
+
+
+class FanOut:
+    """Bounded thread pool that runs one task per key and gives up on stragglers at a deadline.
+
+    The pool is shared by every caller, so max_workers caps the total number of concurrent
+    upstream calls made through it across all requests in this process.
+    """
+
+    def __init__(self, max_workers=8, deadline=8.0):
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+
+    def run(self, fn, keys, deadline=None):
+        """Call fn(key) for every key concurrently and collect what finishes in time.
+
+        Tasks still queued at the deadline are cancelled; tasks already running are left
+        to finish in the background (their side effects, such as cache fills, still land).
+        """
+        deadline = self.deadline if deadline is None else deadline
+        started = time.monotonic()
+
+        futures = {}
+        for key in keys:
+            if key not in futures:
+                # Tasks run in a copy of the caller's context so request-scoped context vars carry over
+                futures[key] = self._executor.submit(contextvars.copy_context().run, fn, key)
+
+        done, _ = wait(futures.values(), timeout=deadline)
+
+        results = {}
+        errors = {}
+        missed = []
+        for key, future in futures.items():
+            if future not in done:
+                future.cancel()
+                missed.append(key)
+                continue
+
+            error = future.exception()
+            if error is not None:
+                errors[key] = error
+            else:
+                results[key] = future.result()
+
+        return FanOutResult(results, errors, missed, time.monotonic() - started)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
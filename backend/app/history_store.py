@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BAR_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8')
+])
+
+
+# Bars Alpha Vantage returns for outputsize=compact; a gap at least this long (less a margin
+# for holidays) can only be closed by a full fetch
+COMPACT_BARS = 100
+COMPACT_MARGIN = 5
+
+
+def bars_since(last, interval, today=None):
+    """Number of bars of a series published after the date `last`, up to today"""
+    today = np.datetime64('today', 'D') if today is None else today
+    if interval == 'weekly':
+        return int((today - last) // np.timedelta64(7, 'D'))
+    if interval == 'monthly':
+        return int((today.astype('datetime64[M]') - last.astype('datetime64[M]')) // np.timedelta64(1, 'M'))
+    return int(np.busday_count(last + np.timedelta64(1, 'D'), today + np.timedelta64(1, 'D')))
+
+
+def empty_bars():
+    return np.empty(0, dtype=BAR_DTYPE)
+
+
+def merge_bars(existing, new):
+    """Union two bar arrays sorted by date; bars in new replace existing bars for the same date"""
+    if len(existing) == 0:
+        combined = new
+    elif len(new) == 0:
+        combined = existing
+    else:
+        combined = np.concatenate([new, existing])
+    # np.unique keeps the first occurrence of each date, i.e. the one from new
+    _, index = np.unique(combined['date'], return_index=True)
+    return combined[index]
+
+
+class HistoryStore:
+    """Per-symbol on-disk store of daily/weekly/monthly OHLCV bars.
+
+    Each series is one .npy file holding a date-sorted structured array, memory-mapped on
+    read, plus a small JSON sidecar recording whether the full history has been backfilled
+    and when the series was last refreshed. Writes go to a temporary file that is then
+    renamed into place, so readers in other workers never see a partial file.
+    """
+
+    def __init__(self, root, refresh_interval=900):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol, interval, suffix):
+        safe_symbol = ''.join(c for c in symbol.upper() if c.isalnum() or c in '.-_')
+        return os.path.join(self.root, f"{safe_symbol}.{interval}.{suffix}")
+
+    def load(self, symbol, interval):
+        """Return the stored bars for a series (oldest first), or None if it was never fetched"""
+        path = self._path(symbol, interval, 'npy')
+        try:
+            return np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def meta(self, symbol, interval):
+        try:
+            with open(self._path(symbol, interval, 'json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def needs_fetch(self, symbol, interval, full):
+        """Decide what to fetch: 'full' to backfill, 'compact' to top up the tail, or None if fresh.
+
+        A stale series whose last bar is older than the compact window is fetched in full, so
+        merging the tail never leaves a gap between the stored and the new bars.
+        """
+        meta = self.meta(symbol, interval)
+        if not meta or (full and not meta.get('backfilled')):
+            return 'full' if full else 'compact'
+        if time.time() - meta.get('updated', 0) < self.refresh_interval:
+            return None
+        bars = self.load(symbol, interval)
+        if bars is not None and len(bars) and bars_since(bars['date'][-1], interval) >= COMPACT_BARS - COMPACT_MARGIN:
+            return 'full'
+        return 'compact'
+
+    def append(self, symbol, interval, bars, backfilled=False):
+        """Merge newly fetched bars into the stored series and return the merged array"""
+        with self._lock:
+            existing = self.load(symbol, interval)
+            merged = merge_bars(empty_bars() if existing is None else np.asarray(existing), bars)
+            meta = self.meta(symbol, interval)
+
+            self._write(self._path(symbol, interval, 'npy'), lambda f: np.save(f, merged))
+            meta = {
+                'backfilled': bool(backfilled or meta.get('backfilled')),
+                'updated': time.time(),
+                'bars': int(len(merged))
+            }
+            self._write(self._path(symbol, interval, 'json'), lambda f: f.write(json.dumps(meta).encode()))
+            return merged
+
+    def _write(self, path, writer):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+history_store = HistoryStore(
+    os.environ.get('HISTORY_STORE_DIR', os.path.join(tempfile.gettempdir(), 'tennant-ticker-history')),
+    refresh_interval=float(os.environ.get('HISTORY_REFRESH_INTERVAL', '900'))
+)
@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the saving would not cover the CPU cost
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+
+# Preferred first when the client accepts both with the same weight
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class EncodedBody:
+    """A serialized response body with its content-hash ETag.
+
+    Compressed variants are built on first request for each encoding and kept, so a body
+    shared by many clients (a dashboard snapshot, a stored history window) is compressed once.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        """The body bytes for a content coding (None for identity)"""
+        if encoding is None:
+            return self.data
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    body = compress(self.data, encoding)
+                    self._encoded[encoding] = body
+        return body
+
+    def etag_for(self, encoding):
+        """Quoted ETag of one representation; compressed variants get a suffix as their bytes differ"""
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into {coding: q}"""
+    weights = {}
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate_encoding(header, size):
+    """Pick the content coding for a body of size bytes, or None to send it uncompressed"""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    weights = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header names any representation of the body with this ETag"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag.split('-', 1)[0] == etag:
+            return True
+    return False
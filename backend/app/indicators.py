@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from .cache import TTLCache
+
+# Bars per year used to annualize volatility for each stored interval
+PERIODS_PER_YEAR = {'daily': 252, 'weekly': 52, 'monthly': 12}
+
+
+def ewm(values, alpha, seed=None):
+    """Exponentially weighted mean (adjust=False), optionally continuing from a previous value"""
+    if seed is None:
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    seeded = np.concatenate([[seed], values])
+    return pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def tail_start(resume, lookback):
+    return max(0, resume - lookback)
+
+
+def sma(close, resume, prior, window):
+    start = tail_start(resume, window)
+    values = pd.Series(close[start:]).rolling(window).mean().to_numpy()[resume - start:]
+    return {"sma": values}
+
+
+def ema(close, resume, prior, span):
+    seed = prior["ema"][-1] if resume else None
+    return {"ema": ewm(close[resume:], 2.0 / (span + 1), seed)}
+
+
+def rsi(close, resume, prior, period):
+    if resume:
+        delta = np.diff(close[resume - 1:])
+    else:
+        delta = np.diff(close, prepend=close[:1])
+    alpha = 1.0 / period
+    avg_gain = ewm(np.clip(delta, 0, None), alpha, prior["avg_gain"][-1] if resume else None)
+    avg_loss = ewm(np.clip(-delta, 0, None), alpha, prior["avg_loss"][-1] if resume else None)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    values = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), values)
+    return {"rsi": values, "avg_gain": avg_gain, "avg_loss": avg_loss}
+
+
+def macd(close, resume, prior, fast, slow, signal):
+    ema_fast = ewm(close[resume:], 2.0 / (fast + 1), prior["ema_fast"][-1] if resume else None)
+    ema_slow = ewm(close[resume:], 2.0 / (slow + 1), prior["ema_slow"][-1] if resume else None)
+    line = ema_fast - ema_slow
+    signal_line = ewm(line, 2.0 / (signal + 1), prior["signal"][-1] if resume else None)
+    return {
+        "macd": line,
+        "signal": signal_line,
+        "histogram": line - signal_line,
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow
+    }
+
+
+def bbands(close, resume, prior, window, width):
+    start = tail_start(resume, window)
+    rolling = pd.Series(close[start:]).rolling(window)
+    middle = rolling.mean().to_numpy()[resume - start:]
+    std = rolling.std(ddof=0).to_numpy()[resume - start:]
+    return {"middle": middle, "upper": middle + width * std, "lower": middle - width * std}
+
+
+def volatility(close, resume, prior, window, periods_per_year):
+    start = tail_start(resume, window)
+    segment = close[start:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_close = np.log(np.where(segment > 0, segment, np.nan))
+    returns = np.diff(log_close, prepend=np.nan)
+    values = pd.Series(returns).rolling(window).std().to_numpy()[resume - start:]
+    return {"volatility": values * np.sqrt(periods_per_year)}
+
+
+class IndicatorSpec:
+    """One requested indicator: a registered name plus its numeric parameters"""
+
+    def __init__(self, name, params):
+        self.name = name
+        self.params = tuple(params)
+
+    @property
+    def key(self):
+        return '_'.join([self.name] + [f"{p:g}" for p in self.params])
+
+
+# name -> (function, default parameters, public outputs, warmup in bars given the parameters)
+INDICATORS = {
+    'sma': (sma, (20,), ("sma",), lambda window: window - 1),
+    'ema': (ema, (20,), ("ema",), lambda span: 0),
+    'rsi': (rsi, (14,), ("rsi",), lambda period: period),
+    'macd': (macd, (12, 26, 9), ("macd", "signal", "histogram"), lambda fast, slow, signal: 0),
+    'bbands': (bbands, (20, 2), ("middle", "upper", "lower"), lambda window, width: window - 1),
+    'volatility': (volatility, (20,), ("volatility",), lambda window: window)
+}
+
+DEFAULT_INDICATORS = 'sma,ema,rsi,macd,bbands,volatility'
+
+
+def parse_indicator_specs(text):
+    """Parse 'sma:50,rsi:14,macd:12:26:9' into IndicatorSpecs, filling in default parameters.
+
+    Raises ValueError for unknown indicators or bad parameters.
+    """
+    specs = []
+    for item in (text or DEFAULT_INDICATORS).split(','):
+        if not item.strip():
+            continue
+        name, *raw_params = item.strip().lower().split(':')
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator '{name}'. Available: {', '.join(INDICATORS)}")
+
+        defaults = INDICATORS[name][1]
+        if len(raw_params) > len(defaults):
+            raise ValueError(f"Indicator '{name}' takes at most {len(defaults)} parameters")
+        params = [float(p) for p in raw_params] + list(defaults[len(raw_params):])
+        if any(p <= 0 for p in params):
+            raise ValueError(f"Indicator '{name}' parameters must be positive")
+        # Window lengths are whole bars; Bollinger width may be fractional
+        params = [p if (name == 'bbands' and i == 1) else int(p) for i, p in enumerate(params)]
+        specs.append(IndicatorSpec(name, params))
+    return specs
+
+
+class IndicatorEngine:
+    """Computes indicators over stored bar arrays and memoizes them per symbol and parameters.
+
+    Memo entries keep every internal series (including EMA state) up to the second-to-last
+    bar, since the latest bar may still be revised intraday. When the series grows, only
+    the bars from that point on are computed: recursive indicators resume from their last
+    state and window indicators recompute a window-sized tail.
+    """
+
+    def __init__(self, ttl=24 * 3600, max_entries=2048):
+        self.memo = TTLCache(ttl=ttl, max_entries=max_entries)
+        self.full_computes = 0
+        self.incremental_computes = 0
+
+    def compute(self, symbol, interval, bars, spec):
+        """Return {output: array aligned with bars (oldest first)} with warmup bars set to NaN"""
+        function, _, outputs, warmup = INDICATORS[spec.name]
+        params = spec.params
+        if spec.name == 'volatility':
+            params = params + (PERIODS_PER_YEAR.get(interval, 252),)
+
+        close = np.asarray(bars['close'], dtype='f8')
+        dates = bars['date']
+        key = (symbol.upper(), interval, spec.name, spec.params)
+
+        resume, prior = 0, None
+        entry = self.memo.get(key)
+        if entry is not None:
+            committed, first_date, last_date, series = entry
+            if (committed and len(dates) > committed and dates[0] == first_date
+                    and dates[committed - 1] == last_date):
+                resume = committed
+                prior = {name: values[:committed] for name, values in series.items()}
+
+        computed = function(close, resume, prior, *params)
+        if prior is not None:
+            series = {name: np.concatenate([prior[name], values]) for name, values in computed.items()}
+            self.incremental_computes += 1
+        else:
+            series = computed
+            self.full_computes += 1
+
+        committed = len(close) - 1
+        if committed > 0:
+            self.memo.set(key, (committed, dates[0], dates[committed - 1],
+                                {name: values[:committed] for name, values in series.items()}))
+
+        masked = {}
+        skip = min(warmup(*spec.params), len(close))
+        for name in outputs:
+            values = series[name].copy()
+            values[:skip] = np.nan
+            masked[name] = values
+        return masked
+
+    def stats(self):
+        stats = self.memo.stats()
+        stats.update({"fullComputes": self.full_computes, "incrementalComputes": self.incremental_computes})
+        return stats
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; without it the stdlib encoder is used
+    orjson = None
+
+
+def numpy_default(o):
+    """Convert numpy and pandas values the stdlib encoder cannot handle"""
+    if isinstance(o, pd.Timestamp):
+        return o.isoformat()
+    if isinstance(o, np.datetime64):
+        return np.datetime_as_string(o)
+    if isinstance(o, np.ndarray):
+        return np.datetime_as_string(o).tolist() if o.dtype.kind == 'M' else o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, (pd.Series, pd.Index)):
+        return numpy_default(o.to_numpy())
+    return DefaultJSONProvider.default(o)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib JSON provider, plus numpy scalars/arrays and pandas values"""
+
+    default = staticmethod(numpy_default)
+
+    def response_bytes(self, obj):
+        """The exact body response() sends for obj, for callers that cache or stream it"""
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            text = self.dumps(obj, indent=2)
+        else:
+            text = self.dumps(obj, separators=(',', ':'))
+        return f"{text}\n".encode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.response_bytes(obj), mimetype=self.mimetype)
+
+
+class FastJSONProvider(NumpyJSONProvider):
+    """JSON provider backed by orjson, falling back to the stdlib encoder when it is not installed.
+
+    orjson serializes numpy arrays and scalars natively, writes UTF-8 instead of \\u escapes and
+    numpy datetime64 values as full RFC 3339 timestamps; otherwise output matches the stdlib
+    provider (sorted keys, datetimes as HTTP dates).
+    """
+
+    def _options(self, indent):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Only the layout arguments Flask itself passes map onto orjson options
+        if orjson is None or not set(kwargs) <= {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response_bytes(self, obj):
+        if orjson is None:
+            return super().response_bytes(obj)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+
+
+# JSON_PROVIDER values accepted by create_app
+JSON_PROVIDERS = {
+    'fast': FastJSONProvider,
+    'stdlib': NumpyJSONProvider
+}
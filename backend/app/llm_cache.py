@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TIMEZONE = ZoneInfo('America/New_York')
+except Exception:
+    MARKET_TIMEZONE = timezone.utc
+
+
+def normalize_prompt(text):
+    """Case-fold, collapse whitespace and drop trailing punctuation so trivially different prompts match"""
+    return re.sub(r'\s+', ' ', text or '').strip().lower().rstrip('?!. ')
+
+
+def trading_day(now=None):
+    """The US market trading day a moment belongs to; weekends map back to Friday"""
+    day = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE).date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+class LLMCache:
+    """Persistent cache of chat completion results.
+
+    Entries are keyed by model, system prompt, normalized user prompt and trading day, so a
+    summary generated once is reused for the rest of that day across workers and restarts.
+    Entries expire after ttl seconds and the least recently used are evicted past max_entries.
+    """
+
+    def __init__(self, path, ttl=6 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS llm_results ("
+            "key TEXT PRIMARY KEY, model TEXT, day TEXT, content TEXT, created REAL, last_used REAL)"
+        )
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def key_for(body):
+        """Cache key for a chat completion request body (system + user message)"""
+        system = next((m['content'] for m in body['messages'] if m['role'] == 'system'), '')
+        user = next((m['content'] for m in reversed(body['messages']) if m['role'] == 'user'), '')
+        day = trading_day()
+        raw = json.dumps([body['model'], system, normalize_prompt(user), day])
+        return hashlib.sha256(raw.encode()).hexdigest(), day
+
+    def get(self, body):
+        """Return the cached completion text for a request body, or None"""
+        key, _ = self.key_for(body)
+        now = time.time()
+        db = self._connect()
+        row = db.execute(
+            "SELECT content FROM llm_results WHERE key = ? AND created >= ?", (key, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        db.execute("UPDATE llm_results SET last_used = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, body, content):
+        key, day = self.key_for(body)
+        now = time.time()
+        db = self._connect()
+        db.execute(
+            "INSERT OR REPLACE INTO llm_results (key, model, day, content, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, body['model'], day, content, now, now)
+        )
+
+        count = db.execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+        expired = db.execute("DELETE FROM llm_results WHERE created < ?", (now - self.ttl,)).rowcount
+        overflow = count - expired - self.max_entries
+        if overflow > 0:
+            db.execute(
+                "DELETE FROM llm_results WHERE key IN (SELECT key FROM llm_results ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def stats(self):
+        entries = self._connect().execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "maxEntries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": (self.hits / lookups) if lookups else 0.0
+        }
+
+
+llm_cache = LLMCache(
+    os.environ.get('LLM_CACHE_DB', os.path.join(tempfile.gettempdir(), 'tennant-ticker-llm-cache.sqlite')),
+    ttl=float(os.environ.get('LLM_CACHE_TTL', str(6 * 3600))),
+    max_entries=int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '5000'))
+)
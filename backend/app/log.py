@@ -0,0 +1,154 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .metrics import metrics
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# 'text' (timestamp level logger event key=value...) or 'json' (one object per line)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+# Field values longer than this are cut, so a full upstream payload never floods the log
+LOG_MAX_FIELD_CHARS = int(os.environ.get('LOG_MAX_FIELD_CHARS', '300'))
+# Records waiting for the writer thread; when full, new records are dropped rather than blocking
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+ENABLE_LOGGING = os.environ.get('ENABLE_LOGGING', 'true').lower() == 'true'
+
+
+def parse_sample_rates(text):
+    """Parse 'quote.response=0.01,quote.request=0.1' into {event: fraction of messages kept}"""
+    rates = {}
+    for item in text.split(','):
+        if '=' in item:
+            event, rate = item.split('=', 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))
+
+
+def truncate(text, limit=LOG_MAX_FIELD_CHARS):
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def render_value(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats a record's event and fields as text or JSON, truncating long field values"""
+
+    def __init__(self, style=LOG_FORMAT, max_field_chars=LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.style = style
+        self.max_field_chars = max_field_chars
+
+    def format(self, record):
+        fields = {key: truncate(render_value(value), self.max_field_chars)
+                  for key, value in getattr(record, 'fields', {}).items()}
+        error = ''.join(traceback.format_exception(*record.exc_info)).rstrip() if record.exc_info else None
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds')
+
+        if self.style == 'json':
+            entry = {"ts": timestamp, "level": record.levelname, "logger": record.name, "event": record.getMessage()}
+            entry.update(fields)
+            if error:
+                entry["traceback"] = error
+            return json.dumps(entry)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={json.dumps(value) if ' ' in value else value}" for key, value in fields.items())
+        return f"{line}\n{error}" if error else line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queues records unformatted, so formatting and tracebacks are rendered on the writer thread.
+
+    Never blocks: when the queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.log_records_dropped.child().inc()
+
+
+class StructuredLogger:
+    """Levelled logger taking an event name plus keyword fields: log.info('quote.fetched', symbol='AAPL').
+
+    Disabled levels cost one check. sample (or a LOG_SAMPLE_RATES entry for the event) keeps
+    only that fraction of messages; kept messages carry the rate as a 'sampled' field.
+    """
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def log(self, level, event, sample=1.0, exc_info=False, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = LOG_SAMPLE_RATES.get(event, sample)
+        if rate < 1.0:
+            if random.random() >= rate:
+                return
+            fields['sampled'] = rate
+        self.logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
+
+    def debug(self, event, **fields):
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        self.log(logging.ERROR, event, **fields)
+
+    def exception(self, event, **fields):
+        """Log at ERROR with the traceback of the exception being handled"""
+        self.log(logging.ERROR, event, exc_info=True, **fields)
+
+
+def get_logger(name):
+    return StructuredLogger(f'tennant.{name}')
+
+
+_listener = None
+
+
+def configure_logging():
+    """Route every 'tennant.*' logger through a bounded queue to a writer thread on stdout (once per process)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    root = logging.getLogger('tennant')
+    root.setLevel(LOG_LEVEL if ENABLE_LOGGING else logging.CRITICAL + 1)
+    root.propagate = False
+
+    handler = DeferredQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(StructuredFormatter())
+    _listener = QueueListener(handler.queue, output)
+    _listener.start()
+    root.addHandler(handler)
+
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
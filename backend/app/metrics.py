@@ -0,0 +1,174 @@
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Latency bucket upper bounds in seconds, from cache hits up to the slowest X.AI completions
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Route template of the request being served; background threads report as 'background'
+current_route = ContextVar('current_route', default='background')
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and three additions under a lock"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+# Gauge value of each circuit breaker state
+CIRCUIT_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+class Family:
+    """One metric name: its type, help text and a child metric per label-value tuple"""
+
+    def __init__(self, name, kind, help_text, labels, factory):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.labels = labels
+        self.factory = factory
+        self.children = {}
+        self._lock = threading.Lock()
+
+    def child(self, *values):
+        metric = self.children.get(values)
+        if metric is None:
+            with self._lock:
+                metric = self.children.setdefault(values, self.factory())
+        return metric
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def http_error_reason(status_code):
+    return f"http_{status_code // 100}xx"
+
+
+class MetricsRegistry:
+    """Request and upstream instrumentation, rendered in the Prometheus text format.
+
+    Routes are labelled by their URL rule (e.g. /api/quote/<symbol>) and upstream calls by
+    function (GLOBAL_QUOTE, OVERVIEW, TIME_SERIES_DAILY, xai_chat...), so label cardinality
+    stays fixed however many symbols are requested.
+    """
+
+    def __init__(self, prefix='tennant'):
+        self.families = []
+        self.route_latency = self._family(f'{prefix}_http_request_duration_seconds', 'histogram',
+                                          'Time to produce a response, by route', ('route', 'method'), Histogram)
+        self.route_requests = self._family(f'{prefix}_http_requests_total', 'counter',
+                                           'Responses sent, by route and status code', ('route', 'method', 'status'), Counter)
+        self.mock_fallbacks = self._family(f'{prefix}_mock_fallbacks_total', 'counter',
+                                           'Responses served from mock data, by route and kind', ('route', 'kind'), Counter)
+        self.upstream_latency = self._family(f'{prefix}_upstream_request_duration_seconds', 'histogram',
+                                             'Network time of upstream calls including retries, by function', ('function',), Histogram)
+        self.upstream_errors = self._family(f'{prefix}_upstream_errors_total', 'counter',
+                                            'Failed upstream calls, by function and reason', ('function', 'reason'), Counter)
+        self.upstream_phase = self._family(f'{prefix}_upstream_phase_seconds_total', 'counter',
+                                           'Time spent on upstream calls, split into network and parse', ('function', 'phase'), Counter)
+        self.circuit_state = self._family(f'{prefix}_upstream_circuit_state', 'gauge',
+                                          'Circuit breaker state per upstream function (0 closed, 1 half-open, 2 open)',
+                                          ('upstream', 'function'), Gauge)
+        self.circuit_transitions = self._family(f'{prefix}_upstream_circuit_transitions_total', 'counter',
+                                                'Circuit breaker state changes, by upstream function and new state',
+                                                ('upstream', 'function', 'state'), Counter)
+        self.log_records_dropped = self._family(f'{prefix}_log_records_dropped_total', 'counter',
+                                                'Log records dropped because the log queue was full', (), Counter)
+
+    def _family(self, name, kind, help_text, labels, factory):
+        family = Family(name, kind, help_text, labels, factory)
+        self.families.append(family)
+        return family
+
+    def observe_route(self, route, method, status, seconds):
+        self.route_latency.child(route, method).observe(seconds)
+        self.route_requests.child(route, method, str(status)).inc()
+
+    def record_mock(self, kind):
+        self.mock_fallbacks.child(current_route.get(), kind).inc()
+
+    def observe_upstream(self, function, network, parse=0.0):
+        """Record one upstream call: seconds waiting on the network and seconds decoding the reply"""
+        self.upstream_latency.child(function).observe(network)
+        self.upstream_phase.child(function, 'network').inc(network)
+        if parse:
+            self.upstream_phase.child(function, 'parse').inc(parse)
+
+    def observe_parse(self, function, seconds):
+        self.upstream_phase.child(function, 'parse').inc(seconds)
+
+    def record_upstream_error(self, function, reason):
+        self.upstream_errors.child(function, reason).inc()
+
+    def record_circuit_state(self, upstream, function, state):
+        self.circuit_state.child(upstream, function).set(CIRCUIT_STATE_VALUES[state])
+        self.circuit_transitions.child(upstream, function, state).inc()
+
+    def render(self):
+        lines = []
+        for family in self.families:
+            lines.append(f"# HELP {family.name} {family.help_text}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            with family._lock:
+                children = sorted(family.children.items())
+            for values, metric in children:
+                if family.kind == 'histogram':
+                    counts, total, count = metric.snapshot()
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric.buckets + (float('inf'),), counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                        labels = format_labels(family.labels, values, 'le="' + le + '"')
+                        lines.append(f"{family.name}_bucket{labels} {cumulative}")
+                    lines.append(f"{family.name}_sum{format_labels(family.labels, values)} {total:.6f}")
+                    lines.append(f"{family.name}_count{format_labels(family.labels, values)} {count}")
+                else:
+                    lines.append(f"{family.name}{format_labels(family.labels, values)} {metric.value}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
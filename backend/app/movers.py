@@ -0,0 +1,164 @@
+import threading
+import time
+
+import numpy as np
+
+# Ranking name -> (score to rank by, largest first; entries that qualify)
+RANKINGS = {
+    'movers': (lambda table: np.abs(table.change_percent), lambda table: np.isfinite(table.change_percent)),
+    'gainers': (lambda table: table.change_percent, lambda table: table.change_percent > 0),
+    'losers': (lambda table: -table.change_percent, lambda table: table.change_percent < 0),
+    'volume': (lambda table: table.volume, lambda table: table.volume > 0)
+}
+
+
+def top_indices(scores, limit):
+    """Indices of the `limit` highest scores, highest first.
+
+    argpartition finds them in O(n); only those `limit` are then sorted.
+    """
+    if limit < len(scores):
+        candidates = np.argpartition(scores, len(scores) - limit)[len(scores) - limit:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class MoverTable:
+    """Immutable array snapshot of the latest quote for every symbol in the universe.
+
+    Each field is one array indexed by symbol position; symbols without a quote yet hold NaN.
+    Rankings are computed on demand and their serialized bodies memoized per table.
+    """
+
+    MAX_MEMOIZED_BODIES = 512
+
+    def __init__(self, symbols, names, sector_codes, sectors, price, change, change_percent, volume, updated):
+        self.symbols = symbols
+        self.names = names
+        self.sector_codes = sector_codes
+        self.sectors = sectors
+        self.price = price
+        self.change = change
+        self.change_percent = change_percent
+        self.volume = volume
+        self.updated = updated
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return len(self.symbols)
+
+    @property
+    def quoted(self):
+        return int(np.count_nonzero(np.isfinite(self.price)))
+
+    def sector_code(self, sector):
+        """Code of a sector name (case-insensitive), or None if no symbol is in it"""
+        try:
+            return self.sectors.index(sector.strip().upper())
+        except ValueError:
+            return None
+
+    def rank(self, ranking='movers', limit=8, sector=None):
+        """Entries of the top `limit` symbols for a ranking, optionally within one sector"""
+        score, qualifies = RANKINGS[ranking]
+        mask = np.isfinite(self.price) & qualifies(self)
+        if sector:
+            code = self.sector_code(sector)
+            if code is None:
+                return []
+            mask &= self.sector_codes == code
+
+        candidates = np.flatnonzero(mask)
+        chosen = candidates[top_indices(score(self)[candidates], limit)]
+        return [self.entry(index) for index in chosen.tolist()]
+
+    def entry(self, index):
+        code = self.sector_codes[index]
+        return {
+            "symbol": self.symbols[index],
+            "name": self.names[index],
+            "sector": self.sectors[code].title() if code >= 0 else None,
+            "price": float(self.price[index]),
+            "change": float(self.change[index]),
+            "changePercent": float(self.change_percent[index]),
+            "volume": float(self.volume[index])
+        }
+
+    def ranked_body(self, key, build):
+        """The body for a (ranking, limit, sector) key, built once per table"""
+        body = self._bodies.get(key)
+        if body is None:
+            body = build()
+            with self._lock:
+                if len(self._bodies) >= self.MAX_MEMOIZED_BODIES:
+                    self._bodies.clear()
+                self._bodies[key] = body
+        return body
+
+
+class MoverUniverse:
+    """The symbol universe ranked for top movers, refreshed a batch at a time.
+
+    Each refresh quotes the `batch_size` symbols attempted longest ago and publishes a new
+    MoverTable, so a large universe is covered over several refresh cycles while readers
+    always rank a complete, consistent table.
+    """
+
+    def __init__(self, symbols, batch_size=100):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.batch_size = batch_size
+        empty = np.full(len(self.symbols), np.nan)
+        self.table = MoverTable(self.symbols, list(self.symbols), np.full(len(self.symbols), -1, dtype=np.int16), [],
+                                empty, empty, empty, empty, np.zeros(len(self.symbols)))
+        # When each symbol was last tried, so symbols that keep failing don't starve the rest
+        self._attempted = np.zeros(len(self.symbols))
+        self._lock = threading.Lock()
+
+    def stalest(self, count):
+        if count >= len(self._attempted):
+            return np.arange(len(self._attempted))
+        return np.argpartition(self._attempted, count)[:count]
+
+    def refresh(self, load_quotes, load_references):
+        """Quote the stalest batch and publish a new table; returns (table, missed symbols).
+
+        load_quotes(symbols) returns ({symbol: {"price", "change", "changePercent", "volume"} or None},
+        missed symbols); load_references(symbols) returns {symbol: reference row} for names and sectors.
+        """
+        with self._lock:
+            previous = self.table
+            batch = self.stalest(self.batch_size)
+            quotes, missed = load_quotes([self.symbols[index] for index in batch.tolist()])
+
+            price, change = previous.price.copy(), previous.change.copy()
+            change_percent, volume = previous.change_percent.copy(), previous.volume.copy()
+            updated = previous.updated.copy()
+            now = time.time()
+            self._attempted[batch] = now
+            for index in batch.tolist():
+                quote = quotes.get(self.symbols[index])
+                if quote:
+                    price[index] = quote["price"]
+                    change[index] = quote["change"]
+                    change_percent[index] = quote["changePercent"]
+                    volume[index] = quote["volume"]
+                    updated[index] = now
+
+            names, sector_codes, sectors = self.reference_columns(load_references(self.symbols))
+            self.table = MoverTable(self.symbols, names, sector_codes, sectors,
+                                    price, change, change_percent, volume, updated)
+            return self.table, missed
+
+    def reference_columns(self, references):
+        """Names, sector codes and the sector list (upper-cased) from reference rows"""
+        names, codes, sectors = [], np.full(len(self.symbols), -1, dtype=np.int16), {}
+        for index, symbol in enumerate(self.symbols):
+            reference = references.get(symbol) or {}
+            names.append(reference.get("name") or symbol)
+            sector = (reference.get("sector") or '').strip().upper()
+            if sector and sector != 'NONE':
+                codes[index] = sectors.setdefault(sector, len(sectors))
+        return names, codes, list(sectors)
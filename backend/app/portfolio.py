@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def parse_holdings(items, max_positions=500):
+    """Validate [{"symbol", "quantity", "costBasis"?}] and merge lots of the same symbol.
+
+    costBasis is the price paid per share. Returns (symbols, quantities, total costs), with
+    NaN cost for symbols where any lot has no cost basis. Raises ValueError for bad input.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("holdings must be a non-empty list of {symbol, quantity, costBasis}")
+
+    positions = {}
+    for item in items:
+        if not isinstance(item, dict) or not str(item.get('symbol') or '').strip():
+            raise ValueError("Every holding needs a symbol")
+        symbol = str(item['symbol']).strip().upper()
+        try:
+            quantity = float(item.get('quantity', 0))
+            cost_basis = float(item['costBasis']) if item.get('costBasis') is not None else np.nan
+        except (TypeError, ValueError):
+            raise ValueError(f"quantity and costBasis for {symbol} must be numbers")
+        if not np.isfinite(quantity):
+            raise ValueError(f"quantity for {symbol} must be finite")
+        quantity_total, cost_total = positions.get(symbol, (0.0, 0.0))
+        positions[symbol] = (quantity_total + quantity, cost_total + quantity * cost_basis)
+
+    if len(positions) > max_positions:
+        raise ValueError(f"At most {max_positions} positions are allowed per request")
+
+    symbols = list(positions)
+    quantities = np.array([positions[symbol][0] for symbol in symbols])
+    costs = np.array([positions[symbol][1] for symbol in symbols])
+    return symbols, quantities, costs
+
+
+def json_values(values, decimals=None):
+    """Array to nested lists with NaN as None, optionally rounded"""
+    values = np.asarray(values, dtype='f8')
+    if decimals is not None:
+        values = np.round(values, decimals)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def aligned_returns(closes, symbols):
+    """Daily log returns of the symbols with history, on one shared date index.
+
+    Prices are forward-filled across dates a symbol did not trade, and returns before a
+    symbol's first bar count as 0, so every column has the same length.
+    """
+    with_history = [symbol for symbol in symbols if symbol in closes and len(closes[symbol]) > 1]
+    if not with_history:
+        return with_history, np.empty((0, 0)), None, None
+    frame = pd.DataFrame({symbol: closes[symbol] for symbol in with_history}).sort_index().ffill()
+    returns = np.log(frame.to_numpy()[1:] / frame.to_numpy()[:-1])
+    returns[~np.isfinite(returns)] = 0.0
+    return with_history, returns, frame.index[0], frame.index[-1]
+
+
+def analyze(symbols, quantities, costs, quotes, sectors, closes):
+    """Aggregate analytics for a portfolio.
+
+    quotes maps symbol to {"price", "change"}; sectors maps symbol to a sector name; closes
+    maps symbol to a pd.Series of closes indexed by date. Positions without a quote have no
+    value and are left out of weights and exposure.
+    """
+    price = np.array([quotes.get(symbol, {}).get('price', np.nan) for symbol in symbols], dtype='f8')
+    change = np.array([quotes.get(symbol, {}).get('change', np.nan) for symbol in symbols], dtype='f8')
+    priced = np.isfinite(price)
+
+    value = quantities * price
+    day_pnl = quantities * change
+    total_value = float(np.nansum(value))
+    previous_value = float(np.nansum(quantities * (price - change)))
+    total_day_pnl = float(np.nansum(day_pnl))
+    weight = value / total_value if total_value else np.full(len(symbols), np.nan)
+    unrealized = value - costs
+    has_cost = priced & np.isfinite(costs)
+    total_cost = float(costs[has_cost].sum())
+
+    # Sector exposure: sum values per sector in one pass over integer sector codes
+    sector_names = np.array([sectors.get(symbol) or 'Unknown' for symbol in symbols])
+    sector_list, sector_codes = np.unique(sector_names[priced], return_inverse=True)
+    sector_values = np.bincount(sector_codes, weights=value[priced], minlength=len(sector_list))
+    order = np.argsort(-sector_values, kind='stable')
+
+    # Risk from aligned daily returns: covariance, correlation and annualized volatility
+    with_history, returns, start, end = aligned_returns(closes, symbols)
+    position_vol = dict.fromkeys(symbols, np.nan)
+    correlation = np.empty((0, 0))
+    portfolio_vol = np.nan
+    if len(returns) > 1:
+        covariance = np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS_PER_YEAR
+        deviation = np.sqrt(np.diag(covariance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = covariance / np.outer(deviation, deviation)
+        position_vol.update(zip(with_history, deviation))
+
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        history_value = np.nan_to_num(value[[index[symbol] for symbol in with_history]])
+        if history_value.sum():
+            w = history_value / history_value.sum()
+            portfolio_vol = float(np.sqrt(w @ covariance @ w))
+
+    # Per-position fields are computed as whole columns, then transposed into one dict per position
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns = {
+            "price": price,
+            "value": value,
+            "weight": weight,
+            "dayPnl": day_pnl,
+            "dayPnlPercent": change / (price - change) * 100,
+            "costBasis": costs / quantities,
+            "unrealizedPnl": unrealized,
+            "volatility": np.array([position_vol[symbol] for symbol in symbols], dtype='f8')
+        }
+    rows = json_values(np.column_stack(list(columns.values())), 6)
+    positions = [
+        dict(symbol=symbol, sector=str(sector), quantity=float(quantity), **dict(zip(columns, row)))
+        for symbol, sector, quantity, row in zip(symbols, sector_names, quantities, rows)
+    ]
+
+    return {
+        "summary": {
+            "totalValue": total_value,
+            "previousValue": previous_value,
+            "dayPnl": total_day_pnl,
+            "dayPnlPercent": total_day_pnl / previous_value * 100 if previous_value else None,
+            "totalCost": total_cost if has_cost.any() else None,
+            "unrealizedPnl": float(unrealized[has_cost].sum()) if has_cost.any() else None,
+            "volatility": None if np.isnan(portfolio_vol) else portfolio_vol,
+            "positions": len(symbols),
+            "priced": int(priced.sum())
+        },
+        "positions": positions,
+        "sectorExposure": [
+            {"sector": str(sector_list[i]), "value": float(sector_values[i]),
+             "weight": float(sector_values[i] / total_value) if total_value else None}
+            for i in order.tolist()
+        ],
+        "correlation": {
+            "symbols": with_history if len(returns) > 1 else [],
+            "matrix": json_values(correlation, 4)
+        },
+        "history": {
+            "start": str(start.date()) if start is not None else None,
+            "end": str(end.date()) if end is not None else None,
+            "returns": len(returns)
+        }
+    }
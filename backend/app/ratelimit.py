@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+
+
+class RateLimitGovernor:
+    """Token-bucket budget for one upstream key, shared by every worker process on the host.
+
+    State lives in a small SQLite file so gunicorn workers draw from the same per-minute
+    bucket and per-day counter. Interactive callers may spend the whole budget and wait
+    briefly for a token to refill; background callers must leave a reserve untouched and
+    never wait, so user-facing lookups are served ahead of dashboard refreshes.
+    """
+
+    def __init__(self, name, path, per_minute=5, per_day=25, minute_reserve=1, day_reserve=5,
+                 interactive_wait=2.0):
+        self.name = name
+        self.path = path
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.minute_reserve = minute_reserve
+        self.day_reserve = day_reserve
+        self.interactive_wait = interactive_wait
+        self.denied = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self._local = threading.local()
+
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL, updated REAL, day TEXT, day_used INTEGER)"
+            )
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def _load(self, db, now):
+        """Read the bucket row, applying refill and the daily reset"""
+        row = db.execute(
+            "SELECT tokens, updated, day, day_used FROM buckets WHERE name = ?", (self.name,)
+        ).fetchone()
+        today = self._today()
+        if row is None:
+            return float(self.per_minute), today, 0
+
+        tokens, updated, day, day_used = row
+        if self.per_minute:
+            tokens = min(float(self.per_minute), tokens + (now - updated) * self.per_minute / 60.0)
+        if day != today:
+            day_used = 0
+        return tokens, today, day_used
+
+    def _save(self, db, now, tokens, day, day_used):
+        db.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, updated, day, day_used) VALUES (?, ?, ?, ?, ?)",
+            (self.name, tokens, now, day, day_used)
+        )
+
+    def try_acquire(self, priority=PRIORITY_BACKGROUND):
+        """Take one call from the budget if allowed.
+
+        Returns (granted, wait) where wait is the number of seconds until a minute token
+        frees up, or None if waiting would not help (daily budget spent).
+        """
+        interactive = priority == PRIORITY_INTERACTIVE
+        minute_reserve = 0 if interactive else self.minute_reserve
+        day_reserve = 0 if interactive else self.day_reserve
+        now = time.time()
+
+        with self._transaction() as db:
+            tokens, day, day_used = self._load(db, now)
+
+            if self.per_day and day_used + 1 > self.per_day - day_reserve:
+                self._save(db, now, tokens, day, day_used)
+                return False, None
+
+            if self.per_minute and tokens - 1 < minute_reserve:
+                self._save(db, now, tokens, day, day_used)
+                return False, (1 + minute_reserve - tokens) * 60.0 / self.per_minute
+
+            if self.per_minute:
+                tokens -= 1
+            self._save(db, now, tokens, day, day_used + 1)
+            return True, 0.0
+
+    def acquire(self, priority=PRIORITY_BACKGROUND):
+        """Take one call from the budget, letting interactive callers wait briefly for a refill"""
+        deadline = time.monotonic() + (self.interactive_wait if priority == PRIORITY_INTERACTIVE else 0)
+        while True:
+            granted, wait = self.try_acquire(priority)
+            if granted:
+                return True
+
+            remaining = deadline - time.monotonic()
+            if wait is None or wait > remaining:
+                self.denied[priority] += 1
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, priority=PRIORITY_BACKGROUND):
+        """acquire() for the event loop: the SQLite transaction runs on a worker thread (it may wait
+        on another process's lock) and refills are awaited with asyncio.sleep instead of blocking"""
+        deadline = time.monotonic() + (self.interactive_wait if priority == PRIORITY_INTERACTIVE else 0)
+        while True:
+            granted, wait = await asyncio.to_thread(self.try_acquire, priority)
+            if granted:
+                return True
+
+            remaining = deadline - time.monotonic()
+            if wait is None or wait > remaining:
+                self.denied[priority] += 1
+                return False
+            await asyncio.sleep(wait)
+
+    def mark_exhausted(self, daily=False):
+        """Drain the bucket after the upstream reports the key is over its limit"""
+        now = time.time()
+        with self._transaction() as db:
+            tokens, day, day_used = self._load(db, now)
+            if daily and self.per_day:
+                day_used = max(day_used, self.per_day)
+            self._save(db, now, 0.0, day, day_used)
+
+    def remaining(self):
+        """Report the budget left in the current minute and day"""
+        now = time.time()
+        with self._transaction() as db:
+            tokens, day, day_used = self._load(db, now)
+
+        return {
+            "perMinute": self.per_minute,
+            "perDay": self.per_day,
+            "minuteRemaining": int(tokens) if self.per_minute else None,
+            "dayRemaining": max(self.per_day - day_used, 0) if self.per_day else None,
+            "dayUsed": day_used,
+            "minuteReserve": self.minute_reserve,
+            "dayReserve": self.day_reserve,
+            "denied": dict(self.denied)
+        }
+
+
+alpha_vantage_governor = RateLimitGovernor(
+    'alpha_vantage',
+    os.environ.get('RATE_LIMIT_DB', os.path.join(tempfile.gettempdir(), 'tennant-ticker-ratelimit.sqlite')),
+    per_minute=int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', '5')),
+    per_day=int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_DAY', '25')),
+    minute_reserve=int(os.environ.get('ALPHA_VANTAGE_MINUTE_RESERVE', '1')),
+    day_reserve=int(os.environ.get('ALPHA_VANTAGE_DAY_RESERVE', '5')),
+    interactive_wait=float(os.environ.get('ALPHA_VANTAGE_INTERACTIVE_WAIT', '2'))
+)
@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+def parse_market_cap(value):
+    try:
+        return float(value) if value not in (None, '', 'None', '-') else None
+    except (ValueError, TypeError):
+        return None
+
+
+class ReferenceStore:
+    """On-disk store of slow-changing company reference data (Alpha Vantage OVERVIEW).
+
+    Rows survive process restarts and are shared by every worker on the host, so a freshly
+    booted worker can build quotes without re-fetching OVERVIEW for symbols already seen.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+        db = self._connect()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS company_reference ("
+            "symbol TEXT PRIMARY KEY, name TEXT, market_cap REAL, sector TEXT, industry TEXT, "
+            "exchange TEXT, payload TEXT, fetched REAL)"
+        )
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _row_to_dict(row):
+        return {
+            "symbol": row["symbol"],
+            "name": row["name"],
+            "marketCap": row["market_cap"],
+            "sector": row["sector"],
+            "industry": row["industry"],
+            "exchange": row["exchange"],
+            "fetched": row["fetched"]
+        }
+
+    def get(self, symbol, allow_stale=False):
+        """Return the reference row for symbol, or None if missing (or expired unless allow_stale)"""
+        row = self._connect().execute(
+            "SELECT * FROM company_reference WHERE symbol = ?", (symbol.upper(),)
+        ).fetchone()
+        if row is None:
+            return None
+        if not allow_stale and time.time() - row["fetched"] > self.ttl:
+            return None
+        return self._row_to_dict(row)
+
+    def get_many(self, symbols, allow_stale=False):
+        """Return {symbol: row} for the symbols that have a (fresh) reference row"""
+        symbols = [symbol.upper() for symbol in symbols]
+        if not symbols:
+            return {}
+        placeholders = ','.join('?' * len(symbols))
+        rows = self._connect().execute(
+            f"SELECT * FROM company_reference WHERE symbol IN ({placeholders})", symbols
+        ).fetchall()
+        now = time.time()
+        return {
+            row["symbol"]: self._row_to_dict(row)
+            for row in rows
+            if allow_stale or now - row["fetched"] <= self.ttl
+        }
+
+    def put(self, symbol, overview):
+        """Store an OVERVIEW payload and return the resulting reference row"""
+        symbol = symbol.upper()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO company_reference "
+            "(symbol, name, market_cap, sector, industry, exchange, payload, fetched) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                symbol,
+                overview.get("Name") or symbol,
+                parse_market_cap(overview.get("MarketCapitalization")),
+                overview.get("Sector"),
+                overview.get("Industry"),
+                overview.get("Exchange"),
+                json.dumps(overview),
+                time.time()
+            )
+        )
+        return self.get(symbol, allow_stale=True)
+
+    def put_reply(self, symbol, overview):
+        """Store an OVERVIEW reply and return the row, or None for a rate-limit 'Information' reply.
+
+        Replies without a Name (ETFs such as SPY, unknown symbols) are stored as a placeholder
+        row named after the symbol with no sector, so they are not requested again until it expires.
+        """
+        if 'Information' in overview:
+            return None
+        return self.put(symbol, overview)
+
+    def missing(self, symbols):
+        """Symbols with no fresh reference row"""
+        fresh = self.get_many(symbols)
+        return [symbol for symbol in symbols if symbol.upper() not in fresh]
+
+    def prefetch(self, symbols, loader):
+        """Fill the store for every symbol that is missing or stale.
+
+        loader(symbol) returns an OVERVIEW reply; a missing or 'Information' reply stops the
+        prefetch early (e.g. when the call budget is spent). Returns the number of rows written.
+        """
+        written = 0
+        for symbol in self.missing(symbols):
+            overview = loader(symbol)
+            if overview is None or self.put_reply(symbol, overview) is None:
+                break
+            written += 1
+        return written
+
+    def stats(self):
+        total, fresh = self._connect().execute(
+            "SELECT COUNT(*), SUM(CASE WHEN fetched >= ? THEN 1 ELSE 0 END) FROM company_reference",
+            (time.time() - self.ttl,)
+        ).fetchone()
+        return {"entries": total, "fresh": fresh or 0, "ttl": self.ttl}
+
+
+company_reference = ReferenceStore(
+    os.environ.get('REFERENCE_DB', os.path.join(tempfile.gettempdir(), 'tennant-ticker-reference.sqlite')),
+    ttl=float(os.environ.get('REFERENCE_TTL_DAYS', '7')) * 24 * 3600
+)
@@ -1,25 +1,128 @@
-from flask import Blueprint, jsonify, request
-import requests
+from flask import Blueprint, Response, current_app, g, jsonify, request
 import json
-import traceback
+import queue
+import re
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
+import numpy as np
 import pandas as pd
 import random
 import time
 
+from .cache import TTLCache
+from .circuit import upstream_circuits
+from .fanout import FanOut
+from .upstream import alpha_vantage, xai, upstream_stats
+from .snapshots import SnapshotRefresher
+from .reference import company_reference
+from .simulator import market_simulator
+from .singleflight import SingleFlight
+from .history_store import history_store
+from .http_cache import EncodedBody, etag_matches, negotiate_encoding
+from .indicators import IndicatorEngine, parse_indicator_specs
+from .llm_cache import llm_cache
+from .log import get_logger
+from .metrics import metrics, current_route, http_error_reason
+from .movers import MoverUniverse, RANKINGS
+from .portfolio import analyze, parse_holdings
+from .streaming import QuoteHub, TooManyConnections
+from .timeseries import (
+    parse_time_series, parse_interval, resample_bars, downsample_bars, DOWNSAMPLERS, bars_to_rows, bars_to_columns
+)
+from .ratelimit import alpha_vantage_governor, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
 api_bp = Blueprint('api', __name__)
+log = get_logger('routes')
+
+@api_bp.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    current_route.set(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@api_bp.after_request
+def record_request_metrics(response):
+    # Streaming responses are timed to their headers; the body is sent after this hook
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        metrics.observe_route(current_route.get(), request.method, response.status_code, time.perf_counter() - started)
+    return response
 
 # Get Alpha Vantage API key from environment variable or use demo key
 ALPHA_VANTAGE_API_KEY = os.environ.get('ALPHA_VANTAGE_API_KEY', 'demo')
-ALPHA_VANTAGE_BASE_URL = 'https://www.alphavantage.co/query'
 
 # Get X.AI API key
 XAI_API_KEY = os.environ.get('XAI_API_KEY', '')
-XAI_API_URL = 'https://api.x.ai/v1'
 
-# Enable mock data as fallback when API fails
-USE_MOCK_DATA_FALLBACK = True
+# Enable mock data as fallback when API fails; disable it to see real upstream failures (e.g. when benchmarking)
+USE_MOCK_DATA_FALLBACK = os.environ.get('USE_MOCK_DATA_FALLBACK', 'true').lower() == 'true'
+
+# Quote cache shared by every GLOBAL_QUOTE caller, keyed by symbol
+QUOTE_CACHE_TTL = int(os.environ.get('QUOTE_CACHE_TTL', '60'))
+QUOTE_CACHE_MAX_ENTRIES = int(os.environ.get('QUOTE_CACHE_MAX_ENTRIES', '512'))
+quote_cache = TTLCache(ttl=QUOTE_CACHE_TTL, max_entries=QUOTE_CACHE_MAX_ENTRIES)
+
+# Alpha Vantage calls answered with an invalid-symbol error are not repeated for this many seconds
+INVALID_SYMBOL_CACHE_TTL = int(os.environ.get('INVALID_SYMBOL_CACHE_TTL', '300'))
+INVALID_SYMBOL_CACHE_MAX_ENTRIES = int(os.environ.get('INVALID_SYMBOL_CACHE_MAX_ENTRIES', '1024'))
+invalid_symbol_cache = TTLCache(ttl=INVALID_SYMBOL_CACHE_TTL, max_entries=INVALID_SYMBOL_CACHE_MAX_ENTRIES)
+
+# Coalesces identical in-flight upstream calls (Alpha Vantage functions and X.AI chat)
+upstream_flights = SingleFlight()
+
+# Concurrency cap and overall deadline (seconds) for the multi-symbol dashboard endpoints
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', '8'))
+FANOUT_DEADLINE = float(os.environ.get('FANOUT_DEADLINE', '8'))
+dashboard_fanout = FanOut(max_workers=FANOUT_MAX_WORKERS, deadline=FANOUT_DEADLINE)
+
+# Batch quote lookups get their own pool so watchlists aren't queued behind dashboard refreshes
+BATCH_QUOTES_MAX_SYMBOLS = int(os.environ.get('BATCH_QUOTES_MAX_SYMBOLS', '100'))
+BATCH_QUOTES_DEADLINE = float(os.environ.get('BATCH_QUOTES_DEADLINE', '8'))
+batch_fanout = FanOut(max_workers=FANOUT_MAX_WORKERS, deadline=BATCH_QUOTES_DEADLINE)
+
+# Indicator results are memoized per symbol, indicator and parameters
+INDICATORS_MAX_SYMBOLS = int(os.environ.get('INDICATORS_MAX_SYMBOLS', '20'))
+indicator_engine = IndicatorEngine(max_entries=int(os.environ.get('INDICATOR_CACHE_MAX_ENTRIES', '2048')))
+
+# Quote streaming: one shared poller per symbol feeds every connected client
+STREAM_POLL_INTERVAL = float(os.environ.get('STREAM_POLL_INTERVAL', '15'))
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('STREAM_HEARTBEAT_INTERVAL', '15'))
+STREAM_MAX_CONNECTIONS = int(os.environ.get('STREAM_MAX_CONNECTIONS', '1000'))
+STREAM_MAX_SYMBOLS = int(os.environ.get('STREAM_MAX_SYMBOLS', '50'))
+
+# Holdings accepted per /portfolio/analyze request; positions are loaded on the batch quote pool
+PORTFOLIO_MAX_POSITIONS = int(os.environ.get('PORTFOLIO_MAX_POSITIONS', '500'))
+
+# Market indices, top movers and sector performance are the same for every user, so they are
+# served from snapshots rebuilt in the background every SNAPSHOT_REFRESH_INTERVAL seconds
+SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', '60'))
+dashboard_snapshots = SnapshotRefresher(interval=SNAPSHOT_REFRESH_INTERVAL)
+
+# Serialized /historical bodies (with their compressed variants), keyed by the requested window
+# and the stored series revision, so repeat requests skip serialization and compression
+HISTORICAL_BODY_CACHE_MAX_ENTRIES = int(os.environ.get('HISTORICAL_BODY_CACHE_MAX_ENTRIES', '256'))
+historical_bodies = TTLCache(ttl=history_store.refresh_interval, max_entries=HISTORICAL_BODY_CACHE_MAX_ENTRIES)
+
+def json_bytes(payload):
+    """Serialize a payload exactly as jsonify would"""
+    return current_app.json.response_bytes(payload)
+
+def encoded_response(body, max_age):
+    """Send an EncodedBody with its ETag and Cache-Control max-age.
+
+    Answers a matching If-None-Match with 304 and no body, and compresses with the best
+    coding the client accepts once the body is large enough.
+    """
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), len(body.data))
+    if etag_matches(request.headers.get('If-None-Match'), body.etag):
+        response = Response(status=304)
+    else:
+        response = Response(body.encoded(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = body.etag_for(encoding)
+    response.headers['Cache-Control'] = f"public, max-age={max(0, int(max_age))}"
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 def format_number(value):
     """Format a number to handle non-numeric values"""
@@ -29,59 +132,223 @@ def format_number(value):
         return 0.0
 
 def get_mock_quote(symbol):
-    """Generate mock quote data for testing when API is unavailable"""
-    current_price = random.uniform(100, 500)
-    change = random.uniform(-20, 20)
-    change_percent = (change / current_price) * 100
+    """Simulated quote for testing when API is unavailable; matches the simulated history"""
+    metrics.record_mock('quote')
+    return market_simulator.quote(symbol)
+
+def get_mock_historical_bars(symbol, days=30):
+    """Simulated daily bars covering the last `days` calendar days, oldest first"""
+    metrics.record_mock('historical')
+    return market_simulator.bars(symbol, market_simulator.business_days(days))
+
+def get_mock_historical_data(symbol, days=30):
+    """Generate mock historical data (rows, oldest first) for testing when API is unavailable"""
+    return bars_to_rows(get_mock_historical_bars(symbol, days))
+
+def parse_symbol_list(text):
+    """Split a comma-separated symbol list into unique upper-case symbols, keeping their order"""
+    return list(dict.fromkeys(symbol.strip().upper() for symbol in text.split(',') if symbol.strip()))
+
+def has_quote_price(data):
+    """Check whether a GLOBAL_QUOTE payload contains a usable price"""
+    return bool('Global Quote' in data and data['Global Quote'] and data['Global Quote'].get("05. price"))
+
+def query_alpha_vantage(params, priority=PRIORITY_BACKGROUND):
+    """Call Alpha Vantage within the rate-limit budget shared by all workers.
+
+    When the budget is spent the call is not sent and an 'Information' payload is returned,
+    the same shape Alpha Vantage uses for its own limit, so callers keep their fallbacks.
+    Payloads may be shared between concurrent callers and must not be mutated.
+    """
+    # Concurrent identical calls (same function and parameters) share one upstream request
+    return upstream_flights.do(alpha_vantage_call_key(params), lambda: send_alpha_vantage(params, priority))
+
+def alpha_vantage_call_key(params):
+    """Single-flight key for an Alpha Vantage call: the function, then the other parameters minus the API key"""
+    return (params['function'],) + tuple(sorted((k, v) for k, v in params.items() if k not in ('function', 'apikey')))
+
+def is_invalid_symbol_payload(data):
+    """An 'Error Message' reply, or a GLOBAL_QUOTE reply with an empty quote: the symbol does not exist"""
+    return 'Error Message' in data or data.get('Global Quote') == {}
+
+def short_circuit_alpha_vantage(params):
+    """The payload to answer a call with without sending it, or None if it may be sent.
+
+    Calls that recently failed with an invalid-symbol error get the same error back, and
+    while the function's circuit is open an 'Information' payload is returned, the shape
+    callers already fall back on (cached or mock data).
+    """
+    cached = invalid_symbol_cache.get(alpha_vantage_call_key(params))
+    if cached is not None:
+        return cached
+    function = params['function']
+    if not upstream_circuits.get('alpha_vantage', function).allow():
+        metrics.record_upstream_error(function, 'circuit_open')
+        return {"Information": f"Alpha Vantage {function} circuit is open; request was not sent."}
+    return None
+
+def record_alpha_vantage_reply(params, data):
+    """Feed a reply to the function's circuit: rate-limit replies count as failures"""
+    function = params['function']
+    breaker = upstream_circuits.get('alpha_vantage', function)
+    if 'Information' in data:
+        metrics.record_upstream_error(function, 'rate_limited')
+        alpha_vantage_governor.mark_exhausted(daily='per day' in str(data['Information']).lower())
+        breaker.record_failure()
+        return
+    breaker.record_success()
+    if is_invalid_symbol_payload(data):
+        invalid_symbol_cache.set(alpha_vantage_call_key(params), data)
+
+def send_alpha_vantage(params, priority):
+    function = params['function']
+    shortcut = short_circuit_alpha_vantage(params)
+    if shortcut is not None:
+        return shortcut
+    if not alpha_vantage_governor.acquire(priority):
+        upstream_circuits.get('alpha_vantage', function).release()
+        metrics.record_upstream_error(function, 'budget')
+        return {"Information": "Alpha Vantage call budget exhausted; request was not sent."}
+
+    try:
+        response, data = timed_upstream_json(function, lambda: alpha_vantage.get(params=params))
+    except Exception:
+        upstream_circuits.get('alpha_vantage', function).record_failure()
+        raise
+    record_alpha_vantage_reply(params, data)
+    return data
+
+def timed_upstream_json(function, send, decode_errors=True):
+    """Call send() and decode the JSON reply, recording network and parse time for the function.
+
+    Returns (response, payload). With decode_errors=False the payload of a non-200 reply is None.
+    """
+    started = time.perf_counter()
+    try:
+        response = send()
+    except Exception:
+        metrics.observe_upstream(function, time.perf_counter() - started)
+        metrics.record_upstream_error(function, 'network')
+        raise
+    
+    received = time.perf_counter()
+    if response.status_code >= 400:
+        metrics.record_upstream_error(function, http_error_reason(response.status_code))
+    if response.status_code != 200 and not decode_errors:
+        metrics.observe_upstream(function, received - started)
+        return response, None
     
+    try:
+        return response, response.json()
+    except ValueError:
+        metrics.record_upstream_error(function, 'parse')
+        raise
+    finally:
+        metrics.observe_upstream(function, received - started, time.perf_counter() - received)
+
+def fetch_global_quote(symbol, priority=PRIORITY_BACKGROUND):
+    """Fetch the GLOBAL_QUOTE payload for a symbol, reading through the shared quote cache.
+
+    Only payloads with a price are cached; error and rate-limit payloads are returned
+    as-is so the caller can decide how to fall back.
+    """
+    cached = quote_cache.get(symbol.upper())
+    if cached is not None:
+        return cached
+    return request_global_quote(symbol, priority)
+
+def request_global_quote(symbol, priority=PRIORITY_BACKGROUND):
+    """Call GLOBAL_QUOTE upstream (skipping the cache read) and cache the payload if it has a price"""
+    params = {
+        'function': 'GLOBAL_QUOTE',
+        'symbol': symbol,
+        'apikey': ALPHA_VANTAGE_API_KEY
+    }
+    data = query_alpha_vantage(params, priority)
+
+    if has_quote_price(data):
+        quote_cache.set(symbol.upper(), data)
+    return data
+
+def fetch_company_reference(symbol, priority=PRIORITY_BACKGROUND):
+    """Return the company reference row for a symbol, calling OVERVIEW only when it is missing or expired.
+
+    Falls back to an expired row, or an empty dict, if the refresh fails.
+    """
+    reference = company_reference.get(symbol)
+    if reference is not None:
+        return reference
+    
+    try:
+        company_params = {
+            'function': 'OVERVIEW',
+            'symbol': symbol,
+            'apikey': ALPHA_VANTAGE_API_KEY
+        }
+        company_data = query_alpha_vantage(company_params, priority)
+        reference = company_reference.put_reply(symbol, company_data)
+        if reference is not None:
+            if not company_data.get("Name"):
+                log.info('reference.placeholder', symbol=symbol)
+            return reference
+        log.info('reference.missing', symbol=symbol)
+    except Exception as e:
+        log.warning('reference.fetch_failed', symbol=symbol, error=str(e))
+    
+    return company_reference.get(symbol, allow_stale=True) or {}
+
+def prefetch_company_reference():
+    """Fill the reference store for the configured symbol universe, stopping when the call budget runs out"""
+    def load_overview(symbol):
+        company_params = {
+            'function': 'OVERVIEW',
+            'symbol': symbol,
+            'apikey': ALPHA_VANTAGE_API_KEY
+        }
+        return query_alpha_vantage(company_params)
+    
+    try:
+        written = company_reference.prefetch(REFERENCE_UNIVERSE, load_overview)
+        log.info('reference.prefetched', symbols=written)
+    except Exception as e:
+        log.warning('reference.prefetch_failed', error=str(e))
+
+def build_quote(symbol, quote_data, reference):
+    """Build the quote response from a GLOBAL_QUOTE payload and a company reference row"""
     return {
         "symbol": symbol,
-        "shortName": f"{symbol} Inc.",
-        "regularMarketPrice": current_price,
-        "regularMarketChange": change,
-        "regularMarketChangePercent": change_percent,
-        "regularMarketVolume": random.randint(1000000, 10000000),
-        "marketCap": current_price * random.randint(10000000, 1000000000),
-        "regularMarketOpen": current_price - random.uniform(-10, 10),
-        "regularMarketDayHigh": current_price + random.uniform(0, 10),
-        "regularMarketDayLow": current_price - random.uniform(0, 10),
-        "regularMarketPreviousClose": current_price - change
+        "shortName": reference.get("name") or symbol,
+        "regularMarketPrice": format_number(quote_data.get("05. price")),
+        "regularMarketChange": format_number(quote_data.get("09. change")),
+        "regularMarketChangePercent": format_number(quote_data.get("10. change percent").replace('%', '')) if quote_data.get("10. change percent") else 0,
+        "regularMarketVolume": format_number(quote_data.get("06. volume")),
+        "marketCap": format_number(reference.get("marketCap")),
+        "regularMarketOpen": format_number(quote_data.get("02. open")),
+        "regularMarketDayHigh": format_number(quote_data.get("03. high")),
+        "regularMarketDayLow": format_number(quote_data.get("04. low")),
+        "regularMarketPreviousClose": format_number(quote_data.get("08. previous close"))
     }
 
-def get_mock_historical_data(symbol, days=30):
-    """Generate mock historical data for testing when API is unavailable"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    
-    data = []
-    current_price = random.uniform(100, 500)
-    
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() < 5:  # Only generate data for weekdays
-            # Randomly adjust price with some trend
-            price_change = random.uniform(-5, 5)
-            current_price += price_change
-            
-            # Ensure price doesn't go negative
-            current_price = max(current_price, 10)
-            
-            open_price = current_price - random.uniform(-2, 2)
-            high_price = max(current_price, open_price) + random.uniform(0, 3)
-            low_price = min(current_price, open_price) - random.uniform(0, 3)
-            
-            data.append({
-                "Date": current_date.strftime("%Y-%m-%d"),
-                "Open": round(open_price, 2),
-                "High": round(high_price, 2),
-                "Low": round(low_price, 2),
-                "Close": round(current_price, 2),
-                "Volume": random.randint(1000000, 10000000)
-            })
-        
-        current_date += timedelta(days=1)
-    
-    return data
+def quote_fallback(symbol, data):
+    """Response (payload, status) for a GLOBAL_QUOTE payload without a price: mock data or an error"""
+    if 'Error Message' in data:
+        log.warning('quote.upstream_error', symbol=symbol, error=data['Error Message'])
+        if USE_MOCK_DATA_FALLBACK:
+            log.info('quote.mock_fallback', symbol=symbol, reason='api_error')
+            return get_mock_quote(symbol), 200
+        return {"error": data['Error Message']}, 400
+    elif 'Information' in data:
+        log.warning('quote.rate_limited', symbol=symbol, info=data['Information'])
+        if USE_MOCK_DATA_FALLBACK:
+            log.info('quote.mock_fallback', symbol=symbol, reason='rate_limited')
+            return get_mock_quote(symbol), 200
+        return {"error": "API rate limit reached. Please try again later."}, 429
+    else:
+        log.warning('quote.unknown_response', symbol=symbol, payload=data)
+        if USE_MOCK_DATA_FALLBACK:
+            log.info('quote.mock_fallback', symbol=symbol, reason='unknown_response')
+            return get_mock_quote(symbol), 200
+        return {"error": f"Unable to retrieve quote data for {symbol}"}, 404
 
 @api_bp.route('/quote/<symbol>', methods=['GET'])
 def get_quote(symbol):
@@ -89,95 +356,283 @@ def get_quote(symbol):
         # Add a small delay to simulate network latency
         time.sleep(0.2)
         
-        params = {
-            'function': 'GLOBAL_QUOTE',
-            'symbol': symbol,
-            'apikey': ALPHA_VANTAGE_API_KEY
-        }
-        
-        print(f"Making API request to Alpha Vantage for {symbol}...")
+        log.debug('quote.request', symbol=symbol)
         
         try:
-            response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=5)
-            data = response.json()
+            data = fetch_global_quote(symbol, PRIORITY_INTERACTIVE)
             
-            print(f"Alpha Vantage API response for {symbol}: {data}")
+            log.debug('quote.response', symbol=symbol, payload=data)
             
-            if 'Global Quote' not in data or not data['Global Quote'] or not data['Global Quote'].get("05. price"):
-                if 'Error Message' in data:
-                    print(f"Alpha Vantage API error: {data['Error Message']}")
-                    if USE_MOCK_DATA_FALLBACK:
-                        print(f"Using mock data for {symbol} due to API error")
-                        return jsonify(get_mock_quote(symbol))
-                    return jsonify({"error": data['Error Message']}), 400
-                elif 'Information' in data:
-                    print(f"Alpha Vantage API limit: {data['Information']}")
-                    if USE_MOCK_DATA_FALLBACK:
-                        print(f"Using mock data for {symbol} due to API limit")
-                        return jsonify(get_mock_quote(symbol))
-                    return jsonify({"error": "API rate limit reached. Please try again later."}), 429
-                else:
-                    print(f"Unknown API response format: {data}")
-                    if USE_MOCK_DATA_FALLBACK:
-                        print(f"Using mock data for {symbol} due to unknown response format")
-                        return jsonify(get_mock_quote(symbol))
-                    return jsonify({"error": f"Unable to retrieve quote data for {symbol}"}), 404
+            if not has_quote_price(data):
+                payload, status = quote_fallback(symbol, data)
+                return jsonify(payload), status
             
             quote_data = data['Global Quote']
             
-            # Try to get company overview, but don't fail if it doesn't work
-            company_data = {}
-            try:
-                company_params = {
-                    'function': 'OVERVIEW',
-                    'symbol': symbol,
-                    'apikey': ALPHA_VANTAGE_API_KEY
-                }
-                company_response = requests.get(ALPHA_VANTAGE_BASE_URL, params=company_params, timeout=5)
-                company_data = company_response.json()
-                print(f"Company overview API response: {company_data}")
-            except Exception as e:
-                print(f"Error fetching company data for {symbol}: {str(e)}")
-            
-            quote = {
-                "symbol": symbol,
-                "shortName": company_data.get("Name", symbol),
-                "regularMarketPrice": format_number(quote_data.get("05. price")),
-                "regularMarketChange": format_number(quote_data.get("09. change")),
-                "regularMarketChangePercent": format_number(quote_data.get("10. change percent").replace('%', '')) if quote_data.get("10. change percent") else 0,
-                "regularMarketVolume": format_number(quote_data.get("06. volume")),
-                "marketCap": format_number(company_data.get("MarketCapitalization")),
-                "regularMarketOpen": format_number(quote_data.get("02. open")),
-                "regularMarketDayHigh": format_number(quote_data.get("03. high")),
-                "regularMarketDayLow": format_number(quote_data.get("04. low")),
-                "regularMarketPreviousClose": format_number(quote_data.get("08. previous close"))
-            }
+            # Join the live quote with the stored company reference row
+            reference = fetch_company_reference(symbol, PRIORITY_INTERACTIVE)
+            quote = build_quote(symbol, quote_data, reference)
             return jsonify(quote)
         except Exception as api_error:
-            print(f"API request error for {symbol}: {str(api_error)}")
+            log.warning('quote.request_failed', symbol=symbol, error=str(api_error))
             if USE_MOCK_DATA_FALLBACK:
-                print(f"Using mock data for {symbol} due to API request error")
+                log.info('quote.mock_fallback', symbol=symbol, reason='request_error')
                 return jsonify(get_mock_quote(symbol))
             raise api_error
             
     except Exception as e:
-        print(f"Error fetching quote for {symbol}: {str(e)}")
-        print(traceback.format_exc())
+        log.exception('quote.failed', symbol=symbol, error=str(e))
         
         if USE_MOCK_DATA_FALLBACK:
-            print(f"Using mock data for {symbol} due to exception")
+            log.info('quote.mock_fallback', symbol=symbol, reason='exception')
             return jsonify(get_mock_quote(symbol))
             
         return jsonify({"error": str(e)}), 500
 
+def quote_failure_status(data):
+    """Map a GLOBAL_QUOTE payload without a price to a batch status and error message"""
+    if 'Error Message' in data:
+        return "not_found", data['Error Message']
+    if 'Information' in data:
+        return "rate_limited", "API rate limit reached. Please try again later."
+    return "error", "Unable to retrieve quote data"
+
+def build_batch_entry(symbol, data, reference, source):
+    if has_quote_price(data):
+        return {
+            "status": "ok",
+            "source": source,
+            "quote": build_quote(symbol, data['Global Quote'], reference)
+        }
+
+    status, error = quote_failure_status(data)
+    entry = {"status": status, "error": error}
+    if USE_MOCK_DATA_FALLBACK:
+        entry.update({"source": "mock", "quote": get_mock_quote(symbol)})
+    return entry
+
+def batch_quotes_payload(symbols, quotes, result, deadline):
+    """Merge cached entries with a fan-out result into the /api/quotes response, in request order"""
+    quotes.update(result.results)
+    
+    for symbol, error in result.errors.items():
+        log.warning('quotes.symbol_failed', symbol=symbol, error=str(error))
+        quotes[symbol] = {"status": "error", "error": str(error)}
+    for symbol in result.missed:
+        quotes[symbol] = {"status": "timeout", "error": f"Quote did not arrive within {deadline}s"}
+    
+    for symbol, entry in quotes.items():
+        if entry["status"] in ("error", "timeout") and USE_MOCK_DATA_FALLBACK and "quote" not in entry:
+            entry.update({"source": "mock", "quote": get_mock_quote(symbol)})
+    
+    return {
+        "quotes": {symbol: quotes[symbol] for symbol in symbols},
+        "partial": result.partial
+    }
+
+@api_bp.route('/quotes', methods=['GET'])
+def get_quotes():
+    """Batch quote lookup: /api/quotes?symbols=AAPL,MSFT,...
+
+    Symbols are de-duplicated, served from the quote cache where possible and the rest are
+    fetched concurrently. Returns one map of symbol to {status, source, quote, error}.
+    """
+    try:
+        symbols = parse_symbol_list(','.join(request.args.getlist('symbols')))
+        
+        if not symbols:
+            return jsonify({"error": "At least one symbol is required"}), 400
+        if len(symbols) > BATCH_QUOTES_MAX_SYMBOLS:
+            return jsonify({"error": f"At most {BATCH_QUOTES_MAX_SYMBOLS} symbols are allowed per request"}), 400
+        
+        references = company_reference.get_many(symbols, allow_stale=True)
+        quotes = {}
+        
+        # Serve everything the cache already has without touching the pool
+        to_fetch = []
+        for symbol in symbols:
+            cached = quote_cache.get(symbol)
+            if cached is not None:
+                quotes[symbol] = build_batch_entry(symbol, cached, references.get(symbol, {}), "cache")
+            else:
+                to_fetch.append(symbol)
+        
+        def load_quote(symbol):
+            data = request_global_quote(symbol, PRIORITY_INTERACTIVE)
+            reference = references.get(symbol)
+            if reference is None and has_quote_price(data):
+                reference = fetch_company_reference(symbol)
+            return build_batch_entry(symbol, data, reference or {}, "live")
+        
+        result = batch_fanout.run(load_quote, to_fetch)
+        return jsonify(batch_quotes_payload(symbols, quotes, result, batch_fanout.deadline))
+    except Exception as e:
+        log.exception('quotes.failed', error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+# Alpha Vantage function and payload key for each stored bar interval
+HISTORY_SERIES = {
+    'daily': ('TIME_SERIES_DAILY', 'Time Series (Daily)'),
+    'weekly': ('TIME_SERIES_WEEKLY', 'Weekly Time Series'),
+    'monthly': ('TIME_SERIES_MONTHLY', 'Monthly Time Series')
+}
+
+def load_history(symbol, interval, full):
+    """Return the stored bars for a series (oldest first), topping them up from Alpha Vantage.
+
+    The full history is downloaded once per series; after that only the compact tail is
+    fetched when the stored copy is stale. Stored bars are served as-is if the refresh fails.
+    Returns None if nothing is stored and the upstream has no data.
+    """
+    function, time_series_key = HISTORY_SERIES[interval]
+    bars = history_store.load(symbol, interval)
+    output_size = history_store.needs_fetch(symbol, interval, full)
+    if output_size is None:
+        return bars
+    
+    params = {
+        'function': function,
+        'symbol': symbol,
+        'apikey': ALPHA_VANTAGE_API_KEY,
+        'outputsize': output_size
+    }
+    
+    log.debug('history.request', symbol=symbol, interval=interval, outputsize=output_size)
+    
+    try:
+        data = query_alpha_vantage(params, PRIORITY_INTERACTIVE)
+    except Exception as e:
+        if bars is None:
+            raise
+        log.warning('history.refresh_failed', symbol=symbol, interval=interval, error=str(e))
+        return bars
+    
+    if time_series_key not in data or not data[time_series_key]:
+        log.warning('history.no_data', symbol=symbol, interval=interval, payload=data)
+        return bars
+    
+    started = time.perf_counter()
+    bars = parse_time_series(data[time_series_key])
+    metrics.observe_parse(function, time.perf_counter() - started)
+    return history_store.append(symbol, interval, bars, backfilled=output_size == 'full')
+
+# Number of bars returned for each period; other periods return the whole stored series
+PERIOD_BAR_LIMITS = {'1mo': 30, '3mo': 90, '6mo': 180, '1y': 365}
+FULL_HISTORY_PERIODS = ['1y', '2y', '5y', 'max']
+
+def history_series_for(interval):
+    """Map an interval query value to a stored series"""
+    if interval in ['1wk', 'weekly']:
+        return 'weekly'
+    if interval in ['1mo', 'monthly']:
+        return 'monthly'
+    # Default to daily
+    return 'daily'
+
+def period_bar_limit(period, available):
+    return PERIOD_BAR_LIMITS.get(period, available)
+
+def historical_columns(symbol, series, bars):
+    """Columnar /historical payload: parallel arrays, newest bar first like the row format"""
+    payload = {"symbol": symbol, "interval": series}
+    payload.update(bars_to_columns(bars))
+    return payload
+
+def shape_history(bars, interval, max_points, method):
+    """Resample oldest-first daily bars to the interval and downsample them to at most max_points"""
+    return downsample_bars(resample_bars(bars, interval), max_points, method)
+
+def parse_max_points(text):
+    """The maxPoints query value: None (every bar) or an integer of at least 4"""
+    if text is None or text == '':
+        return None
+    try:
+        max_points = int(text)
+    except ValueError:
+        raise ValueError("maxPoints must be an integer")
+    if max_points < 4:
+        raise ValueError("maxPoints must be at least 4")
+    return max_points
+
+def mock_historical_response(symbol, days, response_format, interval='daily', max_points=None, method='lttb'):
+    bars = shape_history(get_mock_historical_bars(symbol, days), interval, max_points, method)
+    if response_format == 'columnar':
+        return jsonify(historical_columns(symbol, interval, bars[::-1]))
+    return jsonify(bars_to_rows(bars))
+
+def load_stream_quote(symbol):
+    """Quote published to streaming clients; None when no price is available"""
+    data = fetch_global_quote(symbol)
+    if not has_quote_price(data):
+        return None
+    return build_quote(symbol, data['Global Quote'], fetch_company_reference(symbol))
+
+quote_hub = QuoteHub(load_stream_quote, poll_interval=STREAM_POLL_INTERVAL, max_connections=STREAM_MAX_CONNECTIONS)
+
+def quote_event(symbol, quote):
+    return f"event: quote\nid: {symbol}\ndata: {json.dumps(quote)}\n\n"
+
+@api_bp.route('/stream/quotes', methods=['GET'])
+def stream_quotes():
+    """Server-Sent Events stream of quote updates: /api/stream/quotes?symbols=AAPL,MSFT
+
+    Sends a 'quote' event whenever a symbol's quote changes and a comment line as a
+    heartbeat when nothing has changed for STREAM_HEARTBEAT_INTERVAL seconds.
+    """
+    symbols = parse_symbol_list(','.join(request.args.getlist('symbols')))
+    
+    if not symbols:
+        return jsonify({"error": "At least one symbol is required"}), 400
+    if len(symbols) > STREAM_MAX_SYMBOLS:
+        return jsonify({"error": f"At most {STREAM_MAX_SYMBOLS} symbols are allowed per stream"}), 400
+    
+    try:
+        subscription = quote_hub.subscribe(symbols)
+    except TooManyConnections as e:
+        return jsonify({"error": str(e)}), 503
+    
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    symbol, quote = subscription.queue.get(timeout=STREAM_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield quote_event(symbol, quote)
+        finally:
+            quote_hub.unsubscribe(subscription)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_bp.route('/historical/<symbol>', methods=['GET'])
 def get_historical(symbol):
+    """Price history: /api/historical/AAPL?period=1y&interval=1wk&maxPoints=300
+
+    Every interval (1d, 1wk, 1mo or Nd) is resampled from the stored daily bars. maxPoints
+    downsamples the bars by their closes (downsample=lttb, or minmax to keep each bucket's
+    extremes) so the payload follows the chart width rather than the history length.
+    """
+    try:
+        interval = parse_interval(request.args.get('interval', '1d'))
+        max_points = parse_max_points(request.args.get('maxPoints'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    method = request.args.get('downsample', 'lttb').lower()
+    if method not in DOWNSAMPLERS:
+        return jsonify({"error": f"Unknown downsample '{method}'; expected one of {', '.join(DOWNSAMPLERS)}"}), 400
+    
     try:
         # Add a small delay to simulate network latency
         time.sleep(0.2)
         
         period = request.args.get('period', '1mo')
-        interval = request.args.get('interval', '1d')
+        # 'rows' (default): one dict per bar; 'columnar': parallel arrays per field
+        response_format = request.args.get('format', 'rows')
         
         # Map period to days for mock data
         if period == '1mo':
@@ -191,257 +646,453 @@ def get_historical(symbol):
         else:
             days = 30  # Default
         
-        # Map period to Alpha Vantage output size
-        output_size = 'full' if period in ['1y', '2y', '5y', 'max'] else 'compact'
-        
-        # Map interval to Alpha Vantage function
-        if interval in ['1d', 'daily']:
-            function = 'TIME_SERIES_DAILY'
-            time_series_key = 'Time Series (Daily)'
-        elif interval in ['1wk', 'weekly']:
-            function = 'TIME_SERIES_WEEKLY'
-            time_series_key = 'Weekly Time Series'
-        elif interval in ['1mo', 'monthly']:
-            function = 'TIME_SERIES_MONTHLY'
-            time_series_key = 'Monthly Time Series'
-        else:
-            # Default to daily
-            function = 'TIME_SERIES_DAILY'
-            time_series_key = 'Time Series (Daily)'
+        # Periods beyond the compact window need the full history backfilled
+        full = period in FULL_HISTORY_PERIODS
+        
+        shape = (interval, max_points, method)
         
         try:
-            params = {
-                'function': function,
-                'symbol': symbol,
-                'apikey': ALPHA_VANTAGE_API_KEY,
-                'outputsize': output_size
-            }
-            
-            print(f"Making historical data API request for {symbol}...")
-            
-            response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=5)
-            data = response.json()
+            bars = load_history(symbol, 'daily', full)
             
-            if time_series_key not in data or not data[time_series_key]:
-                print(f"No historical data available for {symbol}, response: {data}")
+            if bars is None or len(bars) == 0:
                 if USE_MOCK_DATA_FALLBACK:
-                    print(f"Using mock historical data for {symbol}")
-                    return jsonify(get_mock_historical_data(symbol, days))
+                    log.info('history.mock_fallback', symbol=symbol, reason='no_data')
+                    return mock_historical_response(symbol, days, response_format, *shape)
                 return jsonify({"error": f"Unable to retrieve historical data for {symbol}"}), 404
             
-            time_series = data[time_series_key]
-            
-            # Create a list of historical data points
-            historical_data = []
-            for date, values in time_series.items():
-                historical_data.append({
-                    "Date": date,
-                    "Open": format_number(values.get("1. open")),
-                    "High": format_number(values.get("2. high")),
-                    "Low": format_number(values.get("3. low")),
-                    "Close": format_number(values.get("4. close")),
-                    "Volume": format_number(values.get("5. volume", values.get("6. volume", 0)))
-                })
+            updated = history_store.meta(symbol, 'daily').get('updated', 0)
             
-            # Sort by date (newest first)
-            historical_data.sort(key=lambda x: x["Date"], reverse=True)
-            
-            # Limit results based on period
-            if period == '1mo':
-                limit = 30
-            elif period == '3mo':
-                limit = 90
-            elif period == '6mo':
-                limit = 180
-            elif period == '1y':
-                limit = 365
-            else:
-                limit = len(historical_data)
+            def serialize():
+                # The period is cut from the daily bars, so it spans the same dates at every interval.
+                # Bars are stored oldest first; respond newest first
+                recent = bars[-period_bar_limit(period, len(bars)):]
+                recent = shape_history(recent, interval, max_points, method)[::-1]
+                if response_format == 'columnar':
+                    return EncodedBody(json_bytes(historical_columns(symbol, interval, recent)))
+                return EncodedBody(json_bytes(bars_to_rows(recent)))
             
-            return jsonify(historical_data[:limit])
+            key = (symbol, period, interval, max_points, method, response_format, updated)
+            body = historical_bodies.get_or_load(key, serialize)
+            # Fresh until the stored series is due for its next refresh
+            return encoded_response(body, history_store.refresh_interval - (time.time() - updated))
         except Exception as api_error:
-            print(f"API request error for historical data: {str(api_error)}")
+            log.warning('history.request_failed', symbol=symbol, error=str(api_error))
             if USE_MOCK_DATA_FALLBACK:
-                print(f"Using mock historical data for {symbol} due to API error")
-                return jsonify(get_mock_historical_data(symbol, days))
+                log.info('history.mock_fallback', symbol=symbol, reason='request_error')
+                return mock_historical_response(symbol, days, response_format, *shape)
             raise api_error
             
     except Exception as e:
-        print(f"Error fetching historical data for {symbol}: {str(e)}")
-        print(traceback.format_exc())
+        log.exception('history.failed', symbol=symbol, error=str(e))
         
         if USE_MOCK_DATA_FALLBACK:
-            print(f"Using mock historical data for {symbol} due to exception")
-            return jsonify(get_mock_historical_data(symbol, days))
+            log.info('history.mock_fallback', symbol=symbol, reason='exception')
+            return mock_historical_response(symbol, days, response_format, interval, max_points, method)
             
         return jsonify({"error": str(e)}), 500
 
-@api_bp.route('/market-indices', methods=['GET'])
-def get_market_indices():
+def nan_to_none(values):
+    return np.where(np.isnan(values), None, values).tolist()
+
+@api_bp.route('/indicators', methods=['GET'])
+@api_bp.route('/indicators/<symbols>', methods=['GET'])
+def get_indicators(symbols=None):
+    """Technical indicators computed server-side over the stored bar history.
+
+    /api/indicators/AAPL?indicators=sma:50,rsi:14,macd:12:26:9&period=6mo&interval=1d
+    /api/indicators?symbols=AAPL,MSFT&indicators=bbands:20:2,volatility:20
+
+    Series are returned newest first, aligned with the dates array; bars inside an
+    indicator's warmup window are null.
+    """
     try:
-        indices = ['SPY', 'QQQ', 'DIA', 'IWM']  # ETFs that track S&P 500, NASDAQ, Dow Jones, Russell 2000
-        names = ['S&P 500', 'NASDAQ', 'Dow Jones', 'Russell 2000']
-        market_indices = []
+        symbol_list = parse_symbol_list(symbols or ','.join(request.args.getlist('symbols')))
+        period = request.args.get('period', '1y')
+        series = history_series_for(request.args.get('interval', '1d'))
         
-        for symbol, name in zip(indices, names):
-            try:
-                params = {
-                    'function': 'GLOBAL_QUOTE',
-                    'symbol': symbol,
-                    'apikey': ALPHA_VANTAGE_API_KEY
-                }
-                
-                response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params)
-                data = response.json()
-                
-                if 'Global Quote' in data and data['Global Quote']:
-                    quote_data = data['Global Quote']
-                    
-                    market_indices.append({
-                        "symbol": symbol,
-                        "name": name,
-                        "price": format_number(quote_data.get("05. price")),
-                        "change": format_number(quote_data.get("09. change")),
-                        "changePercent": format_number(quote_data.get("10. change percent", "0").replace('%', ''))
-                    })
-            except Exception as e:
-                print(f"Error processing index {symbol}: {str(e)}")
-                # Continue with other indices even if one fails
+        if not symbol_list:
+            return jsonify({"error": "At least one symbol is required"}), 400
+        if len(symbol_list) > INDICATORS_MAX_SYMBOLS:
+            return jsonify({"error": f"At most {INDICATORS_MAX_SYMBOLS} symbols are allowed per request"}), 400
+        try:
+            specs = parse_indicator_specs(request.args.get('indicators'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        if not market_indices:
-            return jsonify({"error": "Failed to retrieve market indices"}), 500
+        def compute_for(symbol):
+            bars = load_history(symbol, series, period in FULL_HISTORY_PERIODS)
+            if bars is None or len(bars) == 0:
+                return {"status": "not_found", "error": f"Unable to retrieve historical data for {symbol}"}
             
-        return jsonify(market_indices)
+            # Indicators run over the whole stored series so warmup and memoized state carry
+            # across requests; only the requested period is returned
+            limit = period_bar_limit(period, len(bars))
+            values = {}
+            for spec in specs:
+                outputs = indicator_engine.compute(symbol, series, bars, spec)
+                recent = {name: nan_to_none(output[-limit:][::-1]) for name, output in outputs.items()}
+                values[spec.key] = next(iter(recent.values())) if len(recent) == 1 else recent
+            
+            return {
+                "status": "ok",
+                "interval": series,
+                "dates": np.datetime_as_string(bars['date'][-limit:][::-1]).tolist(),
+                "indicators": values
+            }
+        
+        result = batch_fanout.run(compute_for, symbol_list)
+        payload = dict(result.results)
+        for symbol, error in result.errors.items():
+            log.warning('indicators.symbol_failed', symbol=symbol, error=str(error))
+            payload[symbol] = {"status": "error", "error": str(error)}
+        for symbol in result.missed:
+            payload[symbol] = {"status": "timeout", "error": f"Indicators did not finish within {batch_fanout.deadline}s"}
+        
+        return jsonify(payload)
     except Exception as e:
-        print("Error fetching market indices:", str(e))
-        print(traceback.format_exc())
+        log.exception('indicators.failed', error=str(e))
         return jsonify({"error": str(e)}), 500
 
-@api_bp.route('/top-movers', methods=['GET'])
-def get_top_movers():
+def portfolio_quote(symbol, data):
+    """Price and day change for a position from a GLOBAL_QUOTE payload, else the mock quote"""
+    if has_quote_price(data):
+        quote = data['Global Quote']
+        return {"price": format_number(quote.get("05. price")), "change": format_number(quote.get("09. change"))}, "live"
+    if USE_MOCK_DATA_FALLBACK:
+        mock = get_mock_quote(symbol)
+        return {"price": mock["regularMarketPrice"], "change": mock["regularMarketChange"]}, "mock"
+    return None, None
+
+def portfolio_closes(symbol, bars, limit):
+    """The last `limit` daily closes as a date-indexed series"""
+    bars = bars[-limit:]
+    return pd.Series(bars['close'], index=pd.to_datetime(bars['date']))
+
+@api_bp.route('/portfolio/analyze', methods=['POST'])
+def analyze_portfolio():
+    """Server-side analytics for a portfolio or watchlist.
+
+    Body: {"holdings": [{"symbol": "AAPL", "quantity": 10, "costBasis": 150.0}, ...], "period": "1y"}
+    Returns totals, per-position P&L and weights, sector exposure, and the correlation matrix
+    and annualized volatility of daily returns over the period. Sectors come from the reference
+    store; rows it lacks are fetched at background priority, and symbols still without a sector
+    (ETFs, or when the call budget is spent) are listed in "unclassified".
+    """
     try:
-        symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NVDA', 'TSLA', 'JPM', 
-                  'V', 'HD', 'PG', 'UNH', 'XOM', 'COST', 'AVGO', 'ADBE']
-        movers = []
+        data = request.get_json(silent=True) or {}
+        period = data.get('period', '1y')
+        if period not in PERIOD_BAR_LIMITS:
+            return jsonify({"error": f"period must be one of {', '.join(PERIOD_BAR_LIMITS)}"}), 400
+        try:
+            symbols, quantities, costs = parse_holdings(data.get('holdings'), PORTFOLIO_MAX_POSITIONS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        for symbol in symbols:
+        limit = PERIOD_BAR_LIMITS[period]
+        references = company_reference.get_many(symbols, allow_stale=True)
+        
+        def load_position(symbol):
+            quote, quote_source = portfolio_quote(symbol, fetch_global_quote(symbol, PRIORITY_INTERACTIVE))
+            reference = references.get(symbol)
+            if reference is None:
+                # Background priority: sectors never spend the budget reserved for interactive calls
+                reference = fetch_company_reference(symbol, PRIORITY_BACKGROUND)
             try:
-                params = {
-                    'function': 'GLOBAL_QUOTE',
-                    'symbol': symbol,
-                    'apikey': ALPHA_VANTAGE_API_KEY
-                }
-                
-                response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params)
-                data = response.json()
-                
-                if 'Global Quote' in data and data['Global Quote']:
-                    quote_data = data['Global Quote']
-                    
-                    # Try to get company name from OVERVIEW endpoint
-                    company_name = symbol
-                    try:
-                        company_params = {
-                            'function': 'OVERVIEW',
-                            'symbol': symbol,
-                            'apikey': ALPHA_VANTAGE_API_KEY
-                        }
-                        company_response = requests.get(ALPHA_VANTAGE_BASE_URL, params=company_params)
-                        company_data = company_response.json()
-                        if 'Name' in company_data:
-                            company_name = company_data['Name']
-                    except:
-                        pass
-                    
-                    movers.append({
-                        "symbol": symbol,
-                        "name": company_name,
-                        "price": format_number(quote_data.get("05. price")),
-                        "change": format_number(quote_data.get("09. change")),
-                        "changePercent": format_number(quote_data.get("10. change percent", "0").replace('%', '')),
-                        "volume": format_number(quote_data.get("06. volume"))
-                    })
+                bars = load_history(symbol, 'daily', False)
+                history_source = "stored"
             except Exception as e:
-                print(f"Error processing mover {symbol}: {str(e)}")
-                # Continue with other symbols even if one fails
+                log.warning('portfolio.history_failed', symbol=symbol, error=str(e))
+                bars = None
+            if (bars is None or len(bars) < 2) and USE_MOCK_DATA_FALLBACK:
+                bars = get_mock_historical_bars(symbol, limit)
+                history_source = "mock"
+            if bars is None or len(bars) < 2:
+                return quote, quote_source, reference, None, None
+            return quote, quote_source, reference, portfolio_closes(symbol, bars, limit), history_source
         
-        # Sort by absolute change percentage to get real movers
-        movers.sort(key=lambda x: abs(x["changePercent"]), reverse=True)
+        result = batch_fanout.run(load_position, symbols)
+        # Built from the results only: tasks that missed the deadline may still be running
+        quotes, closes, sources, sectors = {}, {}, {}, {}
+        for symbol, (quote, quote_source, reference, series, history_source) in result.results.items():
+            if quote is not None:
+                quotes[symbol] = quote
+            if reference and reference.get('sector') and reference['sector'] != 'None':
+                sectors[symbol] = reference['sector'].title()
+            if series is not None:
+                closes[symbol] = series
+            sources[symbol] = {"quote": quote_source, "history": history_source}
+        for symbol, error in result.errors.items():
+            log.warning('portfolio.symbol_failed', symbol=symbol, error=str(error))
         
-        # Take top 8 movers
-        return jsonify(movers[:8])
+        unclassified = [symbol for symbol in symbols if symbol not in sectors]
+        payload = analyze(symbols, quantities, costs, quotes, sectors, closes)
+        for position in payload["positions"]:
+            position["source"] = sources.get(position["symbol"], {"quote": None, "history": None})
+        payload["period"] = period
+        payload["errors"] = {symbol: str(error) for symbol, error in result.errors.items()}
+        payload["missing"] = list(result.missed)
+        payload["partial"] = result.partial
+        payload["unclassified"] = unclassified
+        return jsonify(payload)
     except Exception as e:
-        print("Error fetching top movers:", str(e))
-        print(traceback.format_exc())
+        log.exception('portfolio.failed', error=str(e))
         return jsonify({"error": str(e)}), 500
 
-@api_bp.route('/sector-performance', methods=['GET'])
-def get_sector_performance():
+MARKET_INDICES = {
+    'SPY': 'S&P 500',  # ETFs that track S&P 500, NASDAQ, Dow Jones, Russell 2000
+    'QQQ': 'NASDAQ',
+    'DIA': 'Dow Jones',
+    'IWM': 'Russell 2000'
+}
+
+TOP_MOVER_SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NVDA', 'TSLA', 'JPM',
+                     'V', 'HD', 'PG', 'UNH', 'XOM', 'COST', 'AVGO', 'ADBE']
+
+def load_symbol_universe():
+    """Top movers universe: TOP_MOVERS_UNIVERSE_FILE (symbols separated by commas or newlines),
+    else the TOP_MOVERS_UNIVERSE list, else TOP_MOVER_SYMBOLS"""
+    path = os.environ.get('TOP_MOVERS_UNIVERSE_FILE')
+    if path:
+        with open(path) as f:
+            text = f.read().replace('\n', ',')
+    else:
+        text = os.environ.get('TOP_MOVERS_UNIVERSE', ','.join(TOP_MOVER_SYMBOLS))
+    return parse_symbol_list(text)
+
+# Symbols ranked by /api/top-movers; each snapshot refresh quotes the TOP_MOVERS_BATCH_SIZE
+# symbols with the oldest data, so a large universe is covered over several refreshes
+TOP_MOVERS_UNIVERSE = load_symbol_universe()
+TOP_MOVERS_BATCH_SIZE = int(os.environ.get('TOP_MOVERS_BATCH_SIZE', '100'))
+TOP_MOVERS_MAX_LIMIT = int(os.environ.get('TOP_MOVERS_MAX_LIMIT', '100'))
+mover_universe = MoverUniverse(TOP_MOVERS_UNIVERSE, batch_size=TOP_MOVERS_BATCH_SIZE)
+
+# Symbols whose company reference data (names, sectors) is prefetched at startup
+REFERENCE_UNIVERSE = [
+    symbol.strip().upper()
+    for symbol in os.environ.get('REFERENCE_UNIVERSE', ','.join(TOP_MOVERS_UNIVERSE)).split(',')
+    if symbol.strip()
+]
+
+# Map ETF symbols to sector names
+SECTOR_ETFS = {
+    'XLK': 'Technology',
+    'XLF': 'Financial',
+    'XLV': 'Healthcare',
+    'XLE': 'Energy',
+    'XLY': 'Consumer Cyclical',
+    'XLP': 'Consumer Defensive',
+    'XLI': 'Industrial',
+    'XLB': 'Basic Materials',
+    'XLRE': 'Real Estate',
+    'XLU': 'Utilities',
+    'XLC': 'Communication Services'
+}
+
+def snapshot_response(snapshot, body=None):
+    """Send a dashboard snapshot, reporting its age and any symbols that missed the fan-out deadline.
+
+    The body (by default the snapshot payload) is serialized and compressed once per snapshot.
+    max-age is the refresh interval; caches subtract the Age header from it.
+    """
+    response = encoded_response(body or snapshot.body(json_bytes), dashboard_snapshots.interval)
+    response.headers['Age'] = str(int(snapshot.age))
+    response.headers['X-Snapshot-Updated'] = snapshot.updated_at.isoformat()
+    if snapshot.partial:
+        response.headers['X-Partial-Results'] = 'true'
+        response.headers['X-Missed-Symbols'] = ','.join(snapshot.missed)
+    return response
+
+def build_index_entry(symbol):
+    data = fetch_global_quote(symbol)
+    if 'Global Quote' not in data or not data['Global Quote']:
+        return None
+
+    quote_data = data['Global Quote']
+    return {
+        "symbol": symbol,
+        "name": MARKET_INDICES[symbol],
+        "price": format_number(quote_data.get("05. price")),
+        "change": format_number(quote_data.get("09. change")),
+        "changePercent": format_number(quote_data.get("10. change percent", "0").replace('%', ''))
+    }
+
+def build_market_indices():
+    result = dashboard_fanout.run(build_index_entry, list(MARKET_INDICES))
+    
+    for symbol, error in result.errors.items():
+        log.warning('snapshot.entry_failed', snapshot='market-indices', symbol=symbol, error=str(error))
+    for symbol in result.missed:
+        log.warning('snapshot.entry_missed', snapshot='market-indices', symbol=symbol, deadline=dashboard_fanout.deadline)
+    
+    # Keep the configured order and skip indices that failed
+    market_indices = [result.results[symbol] for symbol in MARKET_INDICES if result.results.get(symbol)]
+    
+    if not market_indices:
+        raise RuntimeError("Failed to retrieve market indices")
+    
+    return market_indices, result.missed
+
+@api_bp.route('/market-indices', methods=['GET'])
+def get_market_indices():
     try:
-        # Map ETF symbols to sector names
-        sectors = {
-            'XLK': 'Technology',
-            'XLF': 'Financial',
-            'XLV': 'Healthcare',
-            'XLE': 'Energy',
-            'XLY': 'Consumer Cyclical',
-            'XLP': 'Consumer Defensive',
-            'XLI': 'Industrial',
-            'XLB': 'Basic Materials',
-            'XLRE': 'Real Estate',
-            'XLU': 'Utilities',
-            'XLC': 'Communication Services'
-        }
-        
-        performance = []
-        for symbol, sector in sectors.items():
-            try:
-                params = {
-                    'function': 'GLOBAL_QUOTE',
-                    'symbol': symbol,
-                    'apikey': ALPHA_VANTAGE_API_KEY
-                }
-                
-                response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params)
-                data = response.json()
-                
-                if 'Global Quote' in data and data['Global Quote']:
-                    quote_data = data['Global Quote']
-                    
-                    performance.append({
-                        "sector": sector,
-                        "performance": format_number(quote_data.get("10. change percent", "0").replace('%', '')),
-                        "lastUpdated": datetime.now().isoformat()
-                    })
-            except Exception as e:
-                print(f"Error processing sector {sector} ({symbol}): {str(e)}")
-                # Add placeholder data if we can't get the actual data
-                performance.append({
-                    "sector": sector,
-                    "performance": 0,
-                    "lastUpdated": datetime.now().isoformat(),
-                    "error": True
-                })
+        return snapshot_response(dashboard_snapshots.get('market-indices'))
+    except Exception as e:
+        log.exception('market_indices.failed', error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+def build_mover_entry(symbol):
+    data = fetch_global_quote(symbol)
+    if 'Global Quote' not in data or not data['Global Quote']:
+        return None
+
+    quote_data = data['Global Quote']
+    return {
+        "price": format_number(quote_data.get("05. price")),
+        "change": format_number(quote_data.get("09. change")),
+        "changePercent": format_number(quote_data.get("10. change percent", "0").replace('%', '')),
+        "volume": format_number(quote_data.get("06. volume"))
+    }
+
+def load_mover_quotes(symbols):
+    result = dashboard_fanout.run(build_mover_entry, symbols)
+    
+    for symbol, error in result.errors.items():
+        log.warning('snapshot.entry_failed', snapshot='top-movers', symbol=symbol, error=str(error))
+    for symbol in result.missed:
+        log.warning('snapshot.entry_missed', snapshot='top-movers', symbol=symbol, deadline=dashboard_fanout.deadline)
+    
+    return result.results, result.missed
+
+def build_top_movers():
+    """Quote the next batch of the universe; names and sectors come from the reference store"""
+    return mover_universe.refresh(load_mover_quotes, lambda symbols: company_reference.get_many(symbols, allow_stale=True))
+
+@api_bp.route('/top-movers', methods=['GET'])
+def get_top_movers():
+    """Top symbols of the movers universe: /api/top-movers?rank=gainers&limit=20&sector=Technology
+
+    rank is movers (largest absolute % change, the default), gainers, losers or volume.
+    """
+    ranking = request.args.get('rank', 'movers').lower()
+    sector = request.args.get('sector', '').strip()
+    if ranking not in RANKINGS:
+        return jsonify({"error": f"Unknown rank '{ranking}'; expected one of {', '.join(RANKINGS)}"}), 400
+    try:
+        limit = int(request.args.get('limit', '8'))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not 1 <= limit <= TOP_MOVERS_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {TOP_MOVERS_MAX_LIMIT}"}), 400
+    
+    try:
+        snapshot = dashboard_snapshots.get('top-movers')
+        table = snapshot.payload
+        key = (ranking, limit, sector.upper())
+        body = table.ranked_body(key, lambda: EncodedBody(json_bytes(table.rank(ranking, limit, sector))))
+        response = snapshot_response(snapshot, body)
+        response.headers['X-Universe-Size'] = str(table.size)
+        response.headers['X-Universe-Quoted'] = str(table.quoted)
+        return response
+    except Exception as e:
+        log.exception('top_movers.failed', error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+def build_sector_entry(symbol):
+    data = fetch_global_quote(symbol)
+    if 'Global Quote' not in data or not data['Global Quote']:
+        return None
+
+    quote_data = data['Global Quote']
+    return {
+        "sector": SECTOR_ETFS[symbol],
+        "performance": format_number(quote_data.get("10. change percent", "0").replace('%', '')),
+        "lastUpdated": datetime.now().isoformat()
+    }
+
+def build_sector_performance():
+    result = dashboard_fanout.run(build_sector_entry, list(SECTOR_ETFS))
+    
+    performance = []
+    for symbol, sector in SECTOR_ETFS.items():
+        if symbol in result.results:
+            if result.results[symbol]:
+                performance.append(result.results[symbol])
+            continue
         
-        # Sort by performance (descending)
-        performance.sort(key=lambda x: x.get("performance", 0), reverse=True)
+        if symbol in result.errors:
+            log.warning('snapshot.entry_failed', snapshot='sector-performance', sector=sector, symbol=symbol, error=str(result.errors[symbol]))
+        else:
+            log.warning('snapshot.entry_missed', snapshot='sector-performance', sector=sector, symbol=symbol, deadline=dashboard_fanout.deadline)
         
-        return jsonify(performance)
+        # Add placeholder data if we can't get the actual data
+        placeholder = {
+            "sector": sector,
+            "performance": 0,
+            "lastUpdated": datetime.now().isoformat(),
+            "error": True
+        }
+        if symbol in result.missed:
+            placeholder["partial"] = True
+        performance.append(placeholder)
+    
+    # Sort by performance (descending)
+    performance.sort(key=lambda x: x.get("performance", 0), reverse=True)
+    
+    return performance, result.missed
+
+@api_bp.route('/sector-performance', methods=['GET'])
+def get_sector_performance():
+    try:
+        return snapshot_response(dashboard_snapshots.get('sector-performance'))
     except Exception as e:
-        print("Error fetching sector performance:", str(e))
-        print(traceback.format_exc())
+        log.exception('sector_performance.failed', error=str(e))
         return jsonify({"error": str(e)}), 500
 
+dashboard_snapshots.register('market-indices', build_market_indices)
+dashboard_snapshots.register('top-movers', build_top_movers)
+dashboard_snapshots.register('sector-performance', build_sector_performance)
+
 @api_bp.route('/health', methods=['GET'])
 def health():
     from datetime import datetime
     return jsonify({"status": "ok", "timestamp": datetime.utcnow().isoformat()})
 
+@api_bp.route('/upstream-stats', methods=['GET'])
+def get_upstream_stats():
+    """Call counts and latency for each pooled upstream client"""
+    return jsonify(upstream_stats())
+
+@api_bp.route('/rate-limit', methods=['GET'])
+def get_rate_limit():
+    """Alpha Vantage call budget remaining across all workers"""
+    return jsonify(alpha_vantage_governor.remaining())
+
+@api_bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss/eviction counters for the in-process caches"""
+    return jsonify({
+        "quotes": quote_cache.stats(),
+        "companyReference": company_reference.stats(),
+        "singleFlight": upstream_flights.stats(),
+        "indicators": indicator_engine.stats(),
+        "quoteStreams": quote_hub.stats(),
+        "llmResults": llm_cache.stats(),
+        "historicalBodies": historical_bodies.stats(),
+        "invalidSymbols": invalid_symbol_cache.stats(),
+        "snapshots": dashboard_snapshots.status(),
+        "circuits": upstream_circuits.status()
+    })
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text-format metrics: per-route and per-upstream latency, errors and mock fallbacks"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @api_bp.route('/test-xai', methods=['GET'])
 def test_xai_api():
     """Test endpoint for X.AI API connectivity"""
     try:
-        print("Testing X.AI API connection...")
+        log.info('xai.test')
         
         if not XAI_API_KEY:
             return jsonify({"error": "X.AI API key is not configured"}), 400
@@ -461,8 +1112,8 @@ def test_xai_api():
             "max_tokens": 100
         }
         
-        response = requests.post(
-            f"{XAI_API_URL}/chat/completions",
+        response = xai.post(
+            "/chat/completions",
             headers=headers,
             json=body,
             timeout=10
@@ -490,18 +1141,215 @@ def test_xai_api():
             }), response.status_code
             
     except Exception as e:
-        print(f"Error testing X.AI API: {str(e)}")
-        print(traceback.format_exc())
+        log.exception('xai.test_failed', error=str(e))
         return jsonify({"error": str(e)}), 500
 
+def xai_headers():
+    return {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {XAI_API_KEY}'
+    }
+
+def news_summary_body(symbol):
+    """Chat completion request body for a stock's news summary"""
+    prompt = f"Give me a summary of the news today for {symbol}. Focus on the most important developments that could impact the stock price. Organize the summary by themes if there are multiple topics. Keep it concise but informative."
+    return {
+        "model": "grok-2-latest",
+        "messages": [
+            {"role": "system", "content": "You are a financial assistant providing stock news summaries. Keep responses concise and focused on how news might impact stock performance."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 500
+    }
+
+# System prompt for each research prompt type
+RESEARCH_SYSTEM_PROMPTS = {
+    'GENERAL_ADVISOR': "You are a knowledgeable financial advisor. Provide helpful, accurate information about investing, stocks, and financial markets. Be professional and conservative in your advice.",
+    'PORTFOLIO_ADVISOR': "You are a portfolio management expert. Help users with portfolio construction, asset allocation, risk management, and investment strategy. Focus on diversification and long-term planning.",
+    'NEWS_SUMMARY': "You are a financial news analyst. Provide concise summaries of market news and developments that could impact investments.",
+    'WEBSITE_HELP': "You are a helpful assistant for a financial website. Provide guidance on using the platform and understanding financial data.",
+    'STOCK_RECOMMENDATIONS': "You are a stock research analyst. Provide detailed analysis of stocks, including fundamentals, technicals, and market conditions. Always include appropriate disclaimers about investment risks."
+}
+
+def research_body(message, prompt_type):
+    """Chat completion request body for a research question of the given prompt type"""
+    system_prompt = RESEARCH_SYSTEM_PROMPTS.get(prompt_type, RESEARCH_SYSTEM_PROMPTS['GENERAL_ADVISOR'])
+    return {
+        "model": "grok-2-latest",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": message}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 1000
+    }
+
+def completion_content(data):
+    """The message text of a chat completion payload, or None if it has no choices"""
+    if 'choices' in data and len(data['choices']) > 0:
+        return data['choices'][0]['message']['content']
+    return None
+
+# Returned instead of calling X.AI while its circuit is open
+XAI_CIRCUIT_OPEN = (503, None, "X.AI circuit is open; request was not sent")
+
+def post_chat_completion(headers, body, timeout):
+    """POST a chat completion to X.AI and return (status_code, json payload, error text).
+
+    While the circuit is open the call is not sent and a 503 is returned at once.
+    """
+    breaker = upstream_circuits.get('xai', 'xai_chat')
+    if not breaker.allow():
+        metrics.record_upstream_error('xai_chat', 'circuit_open')
+        return XAI_CIRCUIT_OPEN
+    try:
+        response, data = timed_upstream_json('xai_chat', lambda: xai.post(
+            "/chat/completions",
+            headers=headers,
+            json=body,
+            timeout=timeout
+        ), decode_errors=False)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record(response.status_code == 200)
+    if response.status_code == 200:
+        return response.status_code, data, None
+    
+    try:
+        error_details = response.text
+    except:
+        error_details = "No response text available"
+    return response.status_code, None, error_details
+
+class ChatStreamError(Exception):
+    pass
+
+def stream_chat_completion(headers, body, timeout):
+    """Yield content deltas from a streaming X.AI chat completion as they arrive.
+
+    Metrics record the stream's duration as network time and the delta decoding as parse time.
+    Raises ChatStreamError without calling X.AI while its circuit is open.
+    """
+    breaker = upstream_circuits.get('xai', 'xai_chat_stream')
+    if not breaker.allow():
+        metrics.record_upstream_error('xai_chat_stream', 'circuit_open')
+        raise ChatStreamError(XAI_CIRCUIT_OPEN[2])
+    started = time.perf_counter()
+    try:
+        response = xai.post(
+            "/chat/completions",
+            headers=headers,
+            json=dict(body, stream=True),
+            timeout=timeout,
+            stream=True
+        )
+    except Exception:
+        breaker.record_failure()
+        metrics.observe_upstream('xai_chat_stream', time.perf_counter() - started)
+        metrics.record_upstream_error('xai_chat_stream', 'network')
+        raise
+    
+    parse = 0.0
+    breaker.record(response.status_code == 200)
+    try:
+        if response.status_code != 200:
+            metrics.record_upstream_error('xai_chat_stream', http_error_reason(response.status_code))
+            raise ChatStreamError(f"Error calling X.AI API: {response.status_code}")
+        
+        # text/event-stream responses usually carry no charset; the payload is UTF-8 JSON
+        response.encoding = response.encoding or 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            parsing = time.perf_counter()
+            finished, content = chat_stream_delta(line)
+            parse += time.perf_counter() - parsing
+            if finished:
+                break
+            if content:
+                yield content
+    finally:
+        metrics.observe_upstream('xai_chat_stream', time.perf_counter() - started - parse, parse)
+        response.close()
+
+def chat_stream_delta(line):
+    """Parse one line of a streaming chat completion into (finished, content delta or None)"""
+    if not line or not line.startswith('data:'):
+        return False, None
+    payload = line[len('data:'):].strip()
+    if payload == '[DONE]':
+        return True, None
+    choices = json.loads(payload).get('choices') or [{}]
+    return False, (choices[0].get('delta') or {}).get('content')
+
+def mock_token_chunks(text):
+    """Split a stored response into word-sized chunks so it streams like a live completion"""
+    return re.findall(r'\S+\s*|\s+', text)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_completion_response(headers, body, timeout, mock_text, fields, error=None):
+    """Relay a chat completion to the client as Server-Sent Events.
+
+    Emits one 'token' event per content delta and a final 'done' event carrying fields plus
+    the source. Cached completions are replayed and complete ones are cached. With
+    headers=None, or if the upstream fails before the first token, the mock text is streamed
+    instead; a failure after tokens were sent is reported in 'done'.
+    """
+    def events():
+        source = "xai"
+        failure = error
+        sent = False
+        if headers is not None:
+            cached = llm_cache.get(body)
+            if cached is not None:
+                for content in mock_token_chunks(cached):
+                    yield sse_event("token", {"content": content})
+                yield sse_event("done", dict(fields, source=source, cached=True))
+                return
+            
+            parts = []
+            try:
+                for content in stream_chat_completion(headers, body, timeout):
+                    sent = True
+                    parts.append(content)
+                    yield sse_event("token", {"content": content})
+                llm_cache.put(body, ''.join(parts))
+            except Exception as e:
+                failure = f"Error streaming X.AI completion: {str(e)}"
+                log.warning('xai.stream_failed', error=failure)
+        
+        if headers is None or (failure and not sent):
+            source = "mock"
+            for content in mock_token_chunks(mock_text()):
+                yield sse_event("token", {"content": content})
+        
+        done = dict(fields, source=source)
+        if failure:
+            done["error"] = failure
+        yield sse_event("done", done)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_bp.route('/stock-news-summary/<symbol>', methods=['GET'])
 def get_stock_news_summary(symbol):
-    """Get AI-powered news summary for a specific stock"""
+    """Get AI-powered news summary for a specific stock.
+
+    With ?stream=true the summary is sent as Server-Sent Events while it is generated.
+    """
     try:
-        print(f"Getting news summary for {symbol} using X.AI API...")
+        stream = request.args.get('stream', 'false').lower() == 'true'
+        log.debug('news_summary.request', symbol=symbol, stream=stream)
         
         if not XAI_API_KEY:
-            print("X.AI API key is not configured")
+            log.warning('xai.not_configured')
+            if stream:
+                return stream_completion_response(None, None, None, lambda: get_mock_news_summary(symbol),
+                                                  {"symbol": symbol}, error="X.AI API key is not configured")
             return jsonify({
                 "symbol": symbol,
                 "summary": get_mock_news_summary(symbol),
@@ -509,50 +1357,43 @@ def get_stock_news_summary(symbol):
                 "error": "X.AI API key is not configured"
             })
             
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {XAI_API_KEY}'
-        }
-        
-        # Create a prompt specific to the stock
-        prompt = f"Give me a summary of the news today for {symbol}. Focus on the most important developments that could impact the stock price. Organize the summary by themes if there are multiple topics. Keep it concise but informative."
+        headers = xai_headers()
+        body = news_summary_body(symbol)
         
-        body = {
-            "model": "grok-2-latest",
-            "messages": [
-                {"role": "system", "content": "You are a financial assistant providing stock news summaries. Keep responses concise and focused on how news might impact stock performance."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
+        if stream:
+            return stream_completion_response(headers, body, 20, lambda: get_mock_news_summary(symbol), {"symbol": symbol})
         
-        # Print request details (without sensitive data)
-        print(f"X.AI API URL: {XAI_API_URL}")
-        print(f"X.AI API Key: {'configured' if XAI_API_KEY else 'missing'}")
+        # The same summary prompt is answered from the result cache for the rest of the trading day
+        cached = llm_cache.get(body)
+        if cached is not None:
+            return jsonify({
+                "symbol": symbol,
+                "summary": cached,
+                "source": "xai",
+                "cached": True
+            })
         
-        response = requests.post(
-            f"{XAI_API_URL}/chat/completions",
-            headers=headers,
-            json=body,
-            timeout=20  # 20 second timeout for AI models
+        # Identical in-flight summary requests share one upstream call
+        status_code, data, error_details = upstream_flights.do(
+            ('xai_chat', json.dumps(body, sort_keys=True)),
+            lambda: post_chat_completion(headers, body, timeout=20)  # 20 second timeout for AI models
         )
         
-        print(f"X.AI API response status: {response.status_code}")
+        log.debug('xai.response', status=status_code)
         
-        if response.status_code == 200:
-            data = response.json()
-            print(f"X.AI API response data: {json.dumps(data)[:500]}...")  # Print first 500 chars
+        if status_code == 200:
+            log.debug('xai.response_data', payload=data)
             
-            if 'choices' in data and len(data['choices']) > 0:
-                message = data['choices'][0]['message']['content']
+            message = completion_content(data)
+            if message is not None:
+                llm_cache.put(body, message)
                 return jsonify({
                     "symbol": symbol,
                     "summary": message,
                     "source": "xai"
                 })
             else:
-                print(f"Invalid response format from X.AI API: {data}")
+                log.warning('xai.invalid_response', payload=data)
                 # Fall back to mock data
                 return jsonify({
                     "symbol": symbol,
@@ -561,13 +1402,9 @@ def get_stock_news_summary(symbol):
                     "error": "Invalid API response format"
                 })
         else:
-            error_message = f"Error calling X.AI API: {response.status_code}"
-            try:
-                error_details = response.text
-            except:
-                error_details = "No response text available"
+            error_message = f"Error calling X.AI API: {status_code}"
                 
-            print(f"{error_message} - {error_details}")
+            log.warning('xai.request_failed', status=status_code, details=error_details)
             # Fall back to mock data
             return jsonify({
                 "symbol": symbol,
@@ -578,8 +1415,7 @@ def get_stock_news_summary(symbol):
             
     except Exception as e:
         error_message = f"Error generating news summary for {symbol}: {str(e)}"
-        print(error_message)
-        print(traceback.format_exc())
+        log.exception('xai.failed', error=error_message)
         # Fall back to mock data
         return jsonify({
             "symbol": symbol,
@@ -590,6 +1426,7 @@ def get_stock_news_summary(symbol):
 
 def get_mock_news_summary(symbol):
     """Generate a mock news summary for a stock when API fails"""
+    metrics.record_mock('news_summary')
     return f"""**Product Announcements and Updates**
 - {symbol} recently unveiled its next-generation product line with enhanced features
 - The company's software platform received a major update focusing on security and performance
@@ -609,7 +1446,11 @@ def get_mock_news_summary(symbol):
 
 @api_bp.route('/research', methods=['POST'])
 def get_research_response():
-    """Get AI-powered research response for chat conversations"""
+    """Get AI-powered research response for chat conversations.
+
+    With "stream": true in the body (or ?stream=true) the response is sent as Server-Sent
+    Events while it is generated.
+    """
     try:
         data = request.get_json()
         if not data or 'message' not in data:
@@ -617,66 +1458,50 @@ def get_research_response():
             
         message = data['message']
         prompt_type = data.get('promptType', 'GENERAL_ADVISOR')
+        stream = bool(data.get('stream')) or request.args.get('stream', 'false').lower() == 'true'
         
-        print(f"Getting research response for prompt type: {prompt_type}")
+        log.debug('research.request', prompt_type=prompt_type, stream=stream)
         
         if not XAI_API_KEY:
-            print("X.AI API key is not configured")
+            log.warning('xai.not_configured')
+            if stream:
+                return stream_completion_response(None, None, None, lambda: get_mock_research_response(message, prompt_type),
+                                                  {}, error="X.AI API key is not configured")
             return jsonify({
                 "response": get_mock_research_response(message, prompt_type),
                 "source": "mock",
                 "error": "X.AI API key is not configured"
             })
             
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {XAI_API_KEY}'
-        }
-        
-        # Create system prompt based on prompt type
-        system_prompts = {
-            'GENERAL_ADVISOR': "You are a knowledgeable financial advisor. Provide helpful, accurate information about investing, stocks, and financial markets. Be professional and conservative in your advice.",
-            'PORTFOLIO_ADVISOR': "You are a portfolio management expert. Help users with portfolio construction, asset allocation, risk management, and investment strategy. Focus on diversification and long-term planning.",
-            'NEWS_SUMMARY': "You are a financial news analyst. Provide concise summaries of market news and developments that could impact investments.",
-            'WEBSITE_HELP': "You are a helpful assistant for a financial website. Provide guidance on using the platform and understanding financial data.",
-            'STOCK_RECOMMENDATIONS': "You are a stock research analyst. Provide detailed analysis of stocks, including fundamentals, technicals, and market conditions. Always include appropriate disclaimers about investment risks."
-        }
+        headers = xai_headers()
+        body = research_body(message, prompt_type)
         
-        system_prompt = system_prompts.get(prompt_type, system_prompts['GENERAL_ADVISOR'])
-        
-        body = {
-            "model": "grok-2-latest",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
+        if stream:
+            return stream_completion_response(headers, body, 30, lambda: get_mock_research_response(message, prompt_type), {})
         
-        print(f"Making X.AI API request for research response...")
+        # Prompts of the same type that normalize to the same text are answered from the cache
+        cached = llm_cache.get(body)
+        if cached is not None:
+            return jsonify({
+                "response": cached,
+                "source": "xai",
+                "cached": True
+            })
         
-        response = requests.post(
-            f"{XAI_API_URL}/chat/completions",
-            headers=headers,
-            json=body,
-            timeout=30  # 30 second timeout for AI models
-        )
+        status_code, completion, error_details = post_chat_completion(headers, body, timeout=30)  # 30 second timeout for AI models
         
-        print(f"X.AI API response status: {response.status_code}")
+        log.debug('xai.response', status=status_code)
         
-        if response.status_code == 200:
-            data = response.json()
-            print(f"X.AI API response received")
-            
-            if 'choices' in data and len(data['choices']) > 0:
-                ai_response = data['choices'][0]['message']['content']
+        if status_code == 200:
+            ai_response = completion_content(completion)
+            if ai_response is not None:
+                llm_cache.put(body, ai_response)
                 return jsonify({
                     "response": ai_response,
                     "source": "xai"
                 })
             else:
-                print(f"Invalid response format from X.AI API: {data}")
+                log.warning('xai.invalid_response', payload=completion)
                 # Fall back to mock data
                 return jsonify({
                     "response": get_mock_research_response(message, prompt_type),
@@ -684,13 +1509,9 @@ def get_research_response():
                     "error": "Invalid API response format"
                 })
         else:
-            error_message = f"Error calling X.AI API: {response.status_code}"
-            try:
-                error_details = response.text
-            except:
-                error_details = "No response text available"
+            error_message = f"Error calling X.AI API: {status_code}"
                 
-            print(f"{error_message} - {error_details}")
+            log.warning('xai.request_failed', status=status_code, details=error_details)
             # Fall back to mock data
             return jsonify({
                 "response": get_mock_research_response(message, prompt_type),
@@ -700,8 +1521,7 @@ def get_research_response():
             
     except Exception as e:
         error_message = f"Error generating research response: {str(e)}"
-        print(error_message)
-        print(traceback.format_exc())
+        log.exception('xai.failed', error=error_message)
         # Fall back to mock data
         return jsonify({
             "response": get_mock_research_response(data.get('message', ''), data.get('promptType', 'GENERAL_ADVISOR')),
@@ -711,6 +1531,7 @@ def get_research_response():
 
 def get_mock_research_response(message, prompt_type):
     """Generate a mock research response when API fails"""
+    metrics.record_mock('research')
     responses = {
         'GENERAL_ADVISOR': "Based on current market conditions, I recommend maintaining a diversified portfolio. Consider your risk tolerance and investment timeline when making decisions. Remember that past performance doesn't guarantee future results.",
         'PORTFOLIO_ADVISOR': "For portfolio construction, I suggest allocating across different asset classes. A typical balanced portfolio might include 60% stocks, 30% bonds, and 10% alternatives, but this should be adjusted based on your specific situation and goals.",
@@ -0,0 +1,202 @@
+import hashlib
+import os
+
+import numpy as np
+
+from .cache import TTLCache
+from .history_store import BAR_DTYPE
+
+# Same seed, same market: every worker and the fake upstream generate identical paths
+SIMULATOR_SEED = int(os.environ.get('SIMULATOR_SEED', '42'))
+
+TRADING_DAYS_PER_YEAR = 252
+# Volatility regimes last this many business days; a regime is calm or turbulent
+REGIME_DAYS = 21
+TURBULENT_PROBABILITY = 0.15
+TURBULENT_VOL_MULTIPLIER = 2.0
+
+# Noise streams drawn per (symbol, bar): a normal pair (return, opening gap), two uniforms
+# (high and low wicks) and one uniform (volume)
+RETURN_STREAM, WICK_STREAM, VOLUME_STREAM = (np.uint64(stream) for stream in range(3))
+STREAMS = np.uint64(3)
+REGIME_SALT = np.uint64(0xA5A5)
+# Per-symbol parameters: anchor price, drift, volatility, volume, shares outstanding
+PARAMETER_SALTS = np.arange(1, 6, dtype=np.uint64)
+
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_1, MIX_2 = np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB)
+SHIFT_30, SHIFT_27, SHIFT_31, SHIFT_32 = np.uint64(30), np.uint64(27), np.uint64(31), np.uint64(32)
+LOW_32 = np.uint64(0xFFFFFFFF)
+
+
+def mix64(x):
+    """splitmix64 finalizer: maps uint64 counters to well-mixed uint64 noise, elementwise"""
+    x = x + GOLDEN_GAMMA
+    x = (x ^ (x >> SHIFT_30)) * MIX_1
+    x = (x ^ (x >> SHIFT_27)) * MIX_2
+    return x ^ (x >> SHIFT_31)
+
+
+def uniform(bits):
+    """Uniform floats in (0, 1) from the high 32 bits of uint64 noise"""
+    return ((bits >> SHIFT_32).astype('f8') + 0.5) / 2.0**32
+
+
+def uniform_low(bits):
+    """Uniform floats in (0, 1) from the low 32 bits of uint64 noise"""
+    return ((bits & LOW_32).astype('f8') + 0.5) / 2.0**32
+
+
+def normal_pair(bits):
+    """Two independent standard normals per uint64 (Box-Muller on its two 32-bit halves)"""
+    radius = np.sqrt(-2.0 * np.log(uniform(bits)))
+    angle = 2.0 * np.pi * uniform_low(bits)
+    return radius * np.cos(angle), radius * np.sin(angle)
+
+
+def symbol_keys(symbols, seed):
+    return np.array([
+        int.from_bytes(hashlib.blake2b(f"{seed}:{symbol.upper()}".encode(), digest_size=8).digest(), 'little')
+        for symbol in symbols
+    ], dtype=np.uint64)
+
+
+class MarketSimulator:
+    """Deterministic synthetic market: seeded GBM price paths with volatility regimes.
+
+    Every random draw is a hash of (seed, symbol, bars back from the latest bar), so a
+    symbol's path is the same whichever other symbols are generated with it and however
+    many bars are requested; shorter windows are suffixes of longer ones. Any number of
+    symbols and bars is generated in one set of array operations with no Python loop
+    over days. Quotes are the latest bar of the daily path.
+
+    Single-symbol quotes and bar windows are memoized per business day, so mock fallbacks
+    under load cost a cache lookup.
+    """
+
+    def __init__(self, seed=SIMULATOR_SEED, max_entries=4096):
+        self.seed = seed
+        self._memo = TTLCache(ttl=3600, max_entries=max_entries)
+
+    def latest_day(self):
+        """The most recent business day, which every path ends on"""
+        return np.busday_offset(np.datetime64('today', 'D'), 0, roll='backward')
+
+    def parameters(self, keys):
+        """Per-symbol anchor price, annual drift and volatility, daily volume and share count"""
+        price, drift, vol, volume, shares = uniform(mix64(keys[:, None] ^ PARAMETER_SALTS)).T
+        return {
+            'price': np.exp(np.log(10.0) + price * np.log(900.0 / 10.0)),
+            'drift': (drift - 0.3) * 0.3,
+            'vol': 0.12 + vol * 0.33,
+            'volume': np.exp(np.log(5e5) + volume * np.log(5e7 / 5e5)),
+            'shares': np.round(np.exp(np.log(5e7) + shares * np.log(1.5e10 / 5e7)))
+        }
+
+    def generate(self, keys, bars, step=1):
+        """Bars for the symbols with these keys, shape (len(keys), bars), newest first"""
+        result = np.empty((len(keys), bars), dtype=BAR_DTYPE)
+        if bars < 1 or len(keys) == 0:
+            return result
+        params = self.parameters(keys)
+        back = np.arange(bars, dtype=np.uint64)
+
+        # One counter per (symbol, bars back, stream); keys are 64-bit hashes so ranges never meet
+        counters = keys[:, None] + back * STREAMS
+        z_return, z_gap = normal_pair(mix64(counters + RETURN_STREAM))
+        wicks = mix64(counters + WICK_STREAM)
+        volume_noise = uniform(mix64(counters + VOLUME_STREAM))
+
+        # Calm or turbulent regime per block of REGIME_DAYS business days
+        blocks = back * np.uint64(step) // np.uint64(REGIME_DAYS)
+        turbulent = uniform(mix64(keys[:, None] ^ (blocks + REGIME_SALT))) < TURBULENT_PROBABILITY
+        dt = step / TRADING_DAYS_PER_YEAR
+        sigma = params['vol'][:, None] * np.where(turbulent, TURBULENT_VOL_MULTIPLIER, 1.0) * np.sqrt(dt)
+        returns = (params['drift'][:, None] * dt - 0.5 * sigma**2) + sigma * z_return
+
+        # Paths are anchored at the latest close and walked backwards: the close k bars back is
+        # the latest close less the k most recent returns
+        log_close = np.empty_like(returns)
+        log_close[:, 0] = np.log(params['price'])
+        log_close[:, 1:] = log_close[:, :1] - np.cumsum(returns[:, :-1], axis=1)
+        close = np.exp(log_close)
+        open_ = np.exp(log_close - returns + 0.25 * sigma * z_gap)
+        # Wicks are exponential in units of the bar's volatility
+        result['high'] = np.round(np.maximum(open_, close) * np.exp(-0.4 * sigma * np.log(uniform(wicks))), 2)
+        result['low'] = np.round(np.minimum(open_, close) * np.exp(0.4 * sigma * np.log(uniform_low(wicks))), 2)
+        result['open'] = np.round(open_, 2)
+        result['close'] = np.round(close, 2)
+        # Volume rises with the size of the move
+        result['volume'] = np.round(params['volume'][:, None] * step * np.exp(0.6 * (volume_noise - 0.5))
+                                    * (1 + np.abs(returns) / sigma))
+        result['date'] = np.busday_offset(self.latest_day(), -(back.astype(np.int64) * step))
+        return result
+
+    def history(self, symbols, bars, step=1):
+        """OHLCV bars for each symbol, shape (len(symbols), bars), oldest first.
+
+        step is the number of business days per bar (1 daily, 5 weekly, 21 monthly).
+        """
+        return self.generate(symbol_keys(symbols, self.seed), bars, step)[:, ::-1]
+
+    def bars(self, symbol, bars, step=1):
+        """One symbol's bars, oldest first (read-only; shared by every caller that day)"""
+        key = ('bars', symbol.upper(), bars, step, self.latest_day())
+        result = self._memo.get(key)
+        if result is None:
+            result = self.history([symbol], bars, step)[0]
+            result.flags.writeable = False
+            self._memo.set(key, result)
+        return result
+
+    def business_days(self, days):
+        """Number of daily bars covering the last `days` calendar days"""
+        latest = self.latest_day()
+        return int(np.busday_count(latest - np.timedelta64(days, 'D'), latest + np.timedelta64(1, 'D')))
+
+    def quotes(self, symbols):
+        """Quote fields for each symbol from its latest two daily bars, as parallel arrays"""
+        keys = symbol_keys(symbols, self.seed)
+        bars = self.generate(keys, 2)
+        latest, previous = bars[:, 0], bars[:, 1]
+        change = latest['close'] - previous['close']
+        return {
+            "price": latest['close'],
+            "open": latest['open'],
+            "high": latest['high'],
+            "low": latest['low'],
+            "volume": latest['volume'],
+            "previousClose": previous['close'],
+            "change": change,
+            "changePercent": change / previous['close'] * 100,
+            "marketCap": latest['close'] * self.parameters(keys)['shares'],
+            "date": np.datetime_as_string(latest['date'])
+        }
+
+    def quote(self, symbol):
+        """Quote for one symbol in the /api/quote response shape"""
+        key = ('quote', symbol, self.latest_day())
+        quote = self._memo.get(key)
+        if quote is None:
+            quote = self._build_quote(symbol)
+            self._memo.set(key, quote)
+        return dict(quote)
+
+    def _build_quote(self, symbol):
+        fields = {name: values[0].item() for name, values in self.quotes([symbol]).items()}
+        return {
+            "symbol": symbol,
+            "shortName": f"{symbol} Inc.",
+            "regularMarketPrice": fields['price'],
+            "regularMarketChange": round(fields['change'], 4),
+            "regularMarketChangePercent": round(fields['changePercent'], 4),
+            "regularMarketVolume": fields['volume'],
+            "marketCap": fields['marketCap'],
+            "regularMarketOpen": fields['open'],
+            "regularMarketDayHigh": fields['high'],
+            "regularMarketDayLow": fields['low'],
+            "regularMarketPreviousClose": fields['previousClose']
+        }
+
+
+market_simulator = MarketSimulator()
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls so only one of them reaches the upstream.
+
+    Keys are tuples whose first element names the kind of call (e.g. the Alpha Vantage
+    function); counters are kept per kind. The first caller for a key runs the function and
+    every caller that arrives while it is in flight waits for and shares the same result.
+    Results are shared objects, so callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = {}
+        self.coalesced = {}
+
+    def do(self, key, fn):
+        kind = key[0]
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._count(self.coalesced, kind)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._count(self.executed, kind)
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @staticmethod
+    def _count(counter, kind):
+        counter[kind] = counter.get(kind, 0) + 1
+
+    def count(self, kind, coalesced):
+        """Record a call made outside do(), e.g. by an AsyncSingleFlight sharing these counters"""
+        with self._lock:
+            self._count(self.coalesced if coalesced else self.executed, kind)
+
+    def stats(self):
+        with self._lock:
+            return {
+                kind: {
+                    "executed": self.executed.get(kind, 0),
+                    "coalesced": self.coalesced.get(kind, 0),
+                    "inFlight": sum(1 for key in self._calls if key[0] == kind)
+                }
+                for kind in set(self.executed) | set(self.coalesced)
+            }
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop.
+
+    The first caller for a key starts fn() as a task and every caller awaits it through
+    asyncio.shield, so a client that disconnects does not cancel the call for the others.
+    Counts are recorded on the given SingleFlight so both serving modes report together.
+    """
+
+    def __init__(self, counters):
+        self.counters = counters
+        self._tasks = {}
+
+    async def do(self, key, fn):
+        task = self._tasks.get(key)
+        if task is not None:
+            self.counters.count(key[0], coalesced=True)
+        else:
+            self.counters.count(key[0], coalesced=False)
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Retrieve the outcome so a failure nobody is still awaiting is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,142 @@
+import threading
+import time
+from datetime import datetime
+
+from .http_cache import EncodedBody
+from .log import get_logger
+
+log = get_logger('snapshots')
+
+
+class Snapshot:
+    """A precomputed response payload and when it was built"""
+
+    def __init__(self, payload, missed=None):
+        self.payload = payload
+        self.missed = missed or []
+        self.created = time.monotonic()
+        self.updated_at = datetime.now()
+        self._body = None
+        self._lock = threading.Lock()
+
+    def body(self, serialize):
+        """The payload serialized once (with its ETag and compressed variants) for every reader"""
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    self._body = EncodedBody(serialize(self.payload))
+        return self._body
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created
+
+    @property
+    def partial(self):
+        return bool(self.missed)
+
+
+class SnapshotRefresher:
+    """Stale-while-revalidate store for responses that are the same for every user.
+
+    Each registered builder returns (payload, missed_keys). Readers always get the latest
+    snapshot immediately; once it is older than the refresh interval a rebuild is started
+    in the background. A scheduler thread also rebuilds every snapshot on that interval so
+    readers rarely see stale data at all. Only the very first reads of a snapshot wait for
+    a build; if one is already in flight (e.g. the scheduler's first pass) they wait for it.
+    """
+
+    def __init__(self, interval=60):
+        self.interval = interval
+        self._builders = {}
+        self._snapshots = {}
+        self._errors = {}
+        # Name -> Event set when the build in flight finishes
+        self._refreshing = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, builder):
+        self._builders[name] = builder
+
+    def refresh(self, name, wait=False):
+        """Rebuild one snapshot now; keeps the previous snapshot if the build fails.
+
+        If a build of the snapshot is already in flight no second one is started; with
+        wait=True the call returns once that build has finished.
+        """
+        with self._lock:
+            done = self._refreshing.get(name)
+            if done is None:
+                done = self._refreshing[name] = threading.Event()
+                building = True
+            else:
+                building = False
+        if not building:
+            if wait:
+                done.wait()
+            return
+
+        try:
+            payload, missed = self._builders[name]()
+            with self._lock:
+                self._snapshots[name] = Snapshot(payload, missed)
+                self._errors.pop(name, None)
+        except Exception as e:
+            log.warning('snapshot.refresh_failed', snapshot=name, error=str(e))
+            with self._lock:
+                self._errors[name] = e
+        finally:
+            with self._lock:
+                del self._refreshing[name]
+            done.set()
+
+    def refresh_async(self, name):
+        with self._lock:
+            if name in self._refreshing:
+                return
+        threading.Thread(target=self.refresh, args=(name,), name=f'snapshot-{name}', daemon=True).start()
+
+    def get(self, name):
+        """Return the latest snapshot, building it on first use and revalidating it when stale"""
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            self.refresh(name, wait=True)
+            snapshot = self._snapshots.get(name)
+            if snapshot is None:
+                raise self._errors.get(name) or RuntimeError(f"Snapshot {name} is not available")
+        elif snapshot.age >= self.interval:
+            self.refresh_async(name)
+        return snapshot
+
+    def start(self):
+        """Start the scheduler thread that rebuilds every snapshot on the refresh interval"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for name in list(self._builders):
+                snapshot = self._snapshots.get(name)
+                if snapshot is None or snapshot.age >= self.interval * 0.9:
+                    self.refresh(name)
+            self._stop.wait(self.interval)
+
+    def status(self):
+        """Age and health of every snapshot for monitoring"""
+        return {
+            name: {
+                "ageSeconds": self._snapshots[name].age if name in self._snapshots else None,
+                "partial": self._snapshots[name].partial if name in self._snapshots else None,
+                "refreshing": name in self._refreshing,
+                "lastError": str(self._errors[name]) if name in self._errors else None
+            }
+            for name in self._builders
+        }
@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+
+from .log import get_logger
+
+log = get_logger('streaming')
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class Subscription:
+    """One streaming client: the symbols it watches and a bounded queue of pending updates"""
+
+    def __init__(self, symbols, max_pending=100):
+        self.symbols = symbols
+        self.queue = queue.Queue(maxsize=max_pending)
+        # Optional callable run after each push, e.g. to wake an event loop waiting on the queue
+        self.wakeup = None
+
+    def push(self, symbol, quote):
+        """Queue an update, dropping the oldest pending one if the client is falling behind"""
+        while True:
+            try:
+                self.queue.put_nowait((symbol, quote))
+                break
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+        if self.wakeup is not None:
+            self.wakeup()
+
+
+class QuoteHub:
+    """Fans quote updates out to streaming clients from one poller thread per symbol.
+
+    However many clients watch a symbol, only its poller calls fetch_quote(symbol), and
+    clients are only sent a quote when it differs from the last one published. A poller
+    stops once its symbol has no subscribers left.
+    """
+
+    def __init__(self, fetch_quote, poll_interval=15, max_connections=1000):
+        self.fetch_quote = fetch_quote
+        self.poll_interval = poll_interval
+        self.max_connections = max_connections
+        self._subscribers = {}
+        self._latest = {}
+        self._pollers = {}
+        self._connections = 0
+        self._lock = threading.Lock()
+        self.polls = 0
+        self.published = 0
+
+    def subscribe(self, symbols):
+        """Register a client for symbols; it is sent the latest known quote for each right away"""
+        subscription = Subscription(symbols)
+        with self._lock:
+            if self._connections >= self.max_connections:
+                raise TooManyConnections(f"Streaming connection limit ({self.max_connections}) reached")
+            self._connections += 1
+
+            for symbol in symbols:
+                self._subscribers.setdefault(symbol, set()).add(subscription)
+                if symbol in self._latest:
+                    subscription.push(symbol, self._latest[symbol])
+                if symbol not in self._pollers:
+                    poller = threading.Thread(target=self._poll, args=(symbol,), name=f'quote-poller-{symbol}', daemon=True)
+                    self._pollers[symbol] = poller
+                    poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._connections -= 1
+            for symbol in subscription.symbols:
+                subscribers = self._subscribers.get(symbol)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[symbol]
+
+    def _poll(self, symbol):
+        while True:
+            with self._lock:
+                if not self._subscribers.get(symbol):
+                    del self._pollers[symbol]
+                    self._latest.pop(symbol, None)
+                    return
+
+            try:
+                quote = self.fetch_quote(symbol)
+                self.polls += 1
+            except Exception as e:
+                log.warning('stream.poll_failed', symbol=symbol, error=str(e))
+                quote = None
+
+            if quote is not None:
+                with self._lock:
+                    if self._latest.get(symbol) != quote:
+                        self._latest[symbol] = quote
+                        subscribers = list(self._subscribers.get(symbol, ()))
+                        self.published += 1
+                    else:
+                        subscribers = []
+                for subscription in subscribers:
+                    subscription.push(symbol, quote)
+
+            time.sleep(self.poll_interval)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connections": self._connections,
+                "maxConnections": self.max_connections,
+                "symbols": len(self._pollers),
+                "pollInterval": self.poll_interval,
+                "polls": self.polls,
+                "published": self.published
+            }
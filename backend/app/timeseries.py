@@ -0,0 +1,219 @@
+import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from .history_store import BAR_DTYPE
+
+# Alpha Vantage field names for each bar column; adjusted series report volume as "6. volume"
+PAYLOAD_FIELDS = {
+    'open': ("1. open",),
+    'high': ("2. high",),
+    'low': ("3. low",),
+    'close': ("4. close",),
+    'volume': ("5. volume", "6. volume")
+}
+
+
+def coerce_columns(bars, rows):
+    """Fill each bar column by looking its field up row by row; missing or bad values become 0.0"""
+    for column, field_keys in PAYLOAD_FIELDS.items():
+        values = [next((row[key] for key in field_keys if key in row), None) for row in rows]
+        bars[column] = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(0.0).to_numpy(dtype='f8')
+
+
+def parse_time_series(time_series):
+    """Convert an Alpha Vantage time-series mapping into a date-sorted bar array.
+
+    Alpha Vantage emits every bar with the same fields in the same order, so the values are
+    streamed straight into one float matrix and the dates into one datetime64 array. Payloads
+    with ragged or non-numeric rows fall back to per-column coercion, where bad values become
+    0.0 as in format_number.
+    """
+    rows = list(time_series.values())
+    bars = np.empty(len(rows), dtype=BAR_DTYPE)
+    if not rows:
+        return bars
+
+    bars['date'] = np.array(list(time_series), dtype='datetime64[D]')
+
+    # fromiter reads a fixed number of values, so a row with other keys would shift every later row
+    keys = list(rows[0])
+    if any(list(row) != keys for row in rows):
+        coerce_columns(bars, rows)
+    else:
+        try:
+            matrix = np.fromiter(
+                chain.from_iterable(row.values() for row in rows), dtype='f8', count=len(rows) * len(keys)
+            ).reshape(len(rows), len(keys))
+            for column, field_keys in PAYLOAD_FIELDS.items():
+                key = next((key for key in field_keys if key in keys), None)
+                bars[column] = matrix[:, keys.index(key)] if key is not None else 0.0
+        except (ValueError, TypeError):
+            coerce_columns(bars, rows)
+
+    bars.sort(order='date')
+    return bars
+
+
+def rows_to_bars(rows):
+    """Convert row-format bars ({"Date", "Open", ...} dicts) into a date-sorted bar array"""
+    bars = np.empty(len(rows), dtype=BAR_DTYPE)
+    if not rows:
+        return bars
+    frame = pd.DataFrame.from_records(rows)
+    bars['date'] = frame['Date'].to_numpy(dtype='datetime64[D]')
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        bars[column] = frame[column.capitalize()].to_numpy(dtype='f8')
+    bars.sort(order='date')
+    return bars
+
+
+def bars_to_rows(bars):
+    """Row format: one {"Date", "Open", "High", "Low", "Close", "Volume"} dict per bar"""
+    return [
+        {"Date": date, "Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}
+        for date, open_, high, low, close, volume in zip(
+            np.datetime_as_string(bars['date']).tolist(),
+            bars['open'].tolist(),
+            bars['high'].tolist(),
+            bars['low'].tolist(),
+            bars['close'].tolist(),
+            bars['volume'].tolist()
+        )
+    ]
+
+
+def bars_to_columns(bars):
+    """Columnar format: parallel arrays of dates, open, high, low, close and volume"""
+    return {
+        "dates": np.datetime_as_string(bars['date']).tolist(),
+        "open": bars['open'].tolist(),
+        "high": bars['high'].tolist(),
+        "low": bars['low'].tolist(),
+        "close": bars['close'].tolist(),
+        "volume": bars['volume'].tolist()
+    }
+
+
+# /historical interval values served by resampling the stored daily bars
+INTERVAL_ALIASES = {
+    '1d': 'daily', 'daily': 'daily',
+    '1wk': 'weekly', 'weekly': 'weekly',
+    '1mo': 'monthly', 'monthly': 'monthly'
+}
+
+
+def parse_interval(text):
+    """Map an interval query value to 'daily', 'weekly', 'monthly' or an 'Nd' bar width.
+
+    Unrecognised values are daily. Raises ValueError for an N-day width below 1.
+    """
+    text = (text or '1d').strip().lower()
+    match = re.fullmatch(r'(\d+)d', text)
+    if match and text != '1d':
+        days = int(match.group(1))
+        if days < 1:
+            raise ValueError("interval must be at least 1d")
+        return f"{days}d"
+    return INTERVAL_ALIASES.get(text, 'daily')
+
+
+def interval_groups(dates, interval):
+    """Group number of each date-sorted daily bar for an interval; equal numbers form one bar"""
+    if interval == 'weekly':
+        # Day 0 (1970-01-01) is a Thursday; shifting by 3 starts each week on Monday
+        return (dates.astype('int64') + 3) // 7
+    if interval == 'monthly':
+        return dates.astype('datetime64[M]').astype('int64')
+    # N-day bars are counted back from the latest bar, so only the oldest one can be short
+    width = int(interval[:-1])
+    return (np.arange(len(dates)) + (-len(dates) % width)) // width
+
+
+def resample_bars(bars, interval):
+    """Aggregate date-sorted daily bars into weekly, monthly or N-day bars.
+
+    Each bar opens at its first day's open, closes at its last day's close, spans the
+    extremes of its highs and lows, sums the volume and is dated by its last day, like Alpha
+    Vantage's weekly and monthly series. One reduceat pass per field, no loop over bars.
+    """
+    if interval == 'daily' or len(bars) == 0:
+        return bars
+    groups = interval_groups(bars['date'], interval)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+
+    resampled = np.empty(len(starts), dtype=BAR_DTYPE)
+    resampled['date'] = bars['date'][ends]
+    resampled['open'] = bars['open'][starts]
+    resampled['close'] = bars['close'][ends]
+    resampled['high'] = np.maximum.reduceat(bars['high'], starts)
+    resampled['low'] = np.minimum.reduceat(bars['low'], starts)
+    resampled['volume'] = np.add.reduceat(bars['volume'], starts)
+    return resampled
+
+
+def lttb_indices(values, max_points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps from a series, in order.
+
+    The first and last points are kept; the points between them are split into
+    max_points - 2 buckets, and from each bucket the point forming the largest triangle with
+    the point kept from the previous bucket and the average of the next bucket is kept.
+    Bucket averages and triangle areas are array operations; only the choice of one point
+    per bucket is sequential, so the loop runs max_points times whatever the series length.
+    """
+    count = len(values)
+    if max_points >= count or max_points < 3:
+        return np.arange(count)
+    values = np.asarray(values, dtype='f8')
+    buckets = max_points - 2
+    edges = np.linspace(1, count - 1, buckets + 1).astype(np.int64)
+    sums = np.r_[0.0, np.cumsum(values)]
+    sizes = np.diff(edges)
+    average_x = np.r_[(edges[:-1] + edges[1:] - 1) / 2.0, count - 1][1:]
+    average_y = np.r_[(sums[edges[1:]] - sums[edges[:-1]]) / sizes, values[-1]][1:]
+
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(buckets):
+        start, end = edges[bucket], edges[bucket + 1]
+        x = np.arange(start, end)
+        area = np.abs((previous - average_x[bucket]) * (values[start:end] - values[previous])
+                      - (previous - x) * (average_y[bucket] - values[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_indices(values, max_points):
+    """Indices of the lowest and highest point of each bucket, plus the first and last point, in order.
+
+    Keeps every local extreme a chart of max_points pixels could show. Fully vectorized: one
+    lexsort by (bucket, value) puts each bucket's minimum first and maximum last.
+    """
+    count = len(values)
+    if max_points >= count or max_points < 4:
+        return np.arange(count)
+    buckets = (max_points - 2) // 2
+    bucket = (np.arange(1, count - 1) - 1) * buckets // (count - 2)
+    order = np.lexsort((values[1:-1], bucket)) + 1
+    starts = np.flatnonzero(np.r_[True, np.diff(bucket[order - 1]) != 0])
+    ends = np.r_[starts[1:], len(order)] - 1
+    return np.unique(np.r_[0, order[starts], order[ends], count - 1])
+
+
+# maxPoints downsampling methods for /historical, applied to the close series
+DOWNSAMPLERS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices
+}
+
+
+def downsample_bars(bars, max_points, method='lttb'):
+    """At most max_points of the date-sorted bars, chosen by their closes to keep the chart's shape"""
+    if max_points is None or len(bars) <= max_points:
+        return bars
+    return bars[DOWNSAMPLERS[method](bars['close'], max_points)]
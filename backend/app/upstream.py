@@ -0,0 +1,221 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # only needed for the async serving mode
+    httpx = None
+
+ALPHA_VANTAGE_BASE_URL = os.environ.get('ALPHA_VANTAGE_BASE_URL', 'https://www.alphavantage.co/query')
+XAI_API_URL = os.environ.get('XAI_API_URL', 'https://api.x.ai/v1')
+
+# Connection pool sizing; pool_maxsize should be at least the dashboard fan-out width
+UPSTREAM_POOL_CONNECTIONS = int(os.environ.get('UPSTREAM_POOL_CONNECTIONS', '4'))
+UPSTREAM_POOL_MAXSIZE = int(os.environ.get('UPSTREAM_POOL_MAXSIZE', '16'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3.05'))
+UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', '2'))
+UPSTREAM_BACKOFF = float(os.environ.get('UPSTREAM_BACKOFF', '0.25'))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get('UPSTREAM_BACKOFF_MAX', '2'))
+
+# Connection limit per upstream for the async serving mode, where one process holds many in-flight calls
+ASYNC_UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('ASYNC_UPSTREAM_MAX_CONNECTIONS', '200'))
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+class LatencyStats:
+    """Running call/error/retry counters and latency totals for one upstream"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, elapsed, error=False):
+        with self._lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            self.total += elapsed
+            self.max = max(self.max, elapsed)
+            self.min = elapsed if self.min is None else min(self.min, elapsed)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "avgMs": (self.total / self.calls * 1000) if self.calls else 0.0,
+                "minMs": (self.min or 0.0) * 1000,
+                "maxMs": self.max * 1000
+            }
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client for one upstream API.
+
+    Owns a pooled requests.Session, applies consistent connect/read timeouts and retries
+    transient failures with jittered exponential backoff. Non-idempotent requests are only
+    retried when the connection could not be established, so a POST is never sent twice.
+    """
+
+    def __init__(self, name, base_url, read_timeout=10, pool_connections=UPSTREAM_POOL_CONNECTIONS,
+                 pool_maxsize=UPSTREAM_POOL_MAXSIZE, connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+                 max_retries=UPSTREAM_MAX_RETRIES, backoff=UPSTREAM_BACKOFF, backoff_max=UPSTREAM_BACKOFF_MAX):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.stats = LatencyStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, path=''):
+        return f"{self.base_url}/{path.lstrip('/')}" if path else self.base_url
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def request(self, method, path='', timeout=None, **kwargs):
+        """Send a request and return the response, retrying transient failures.
+
+        timeout is the read timeout in seconds; the connect timeout is fixed per client.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        timeout = (self.connect_timeout, self.read_timeout if timeout is None else timeout)
+        url = self.url(path)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.stats.record(time.perf_counter() - started, error=True)
+                # Only a connect timeout guarantees a non-idempotent request never reached the upstream
+                safe_to_retry = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if attempt >= self.max_retries or not safe_to_retry:
+                    raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES and idempotent
+                self.stats.record(time.perf_counter() - started, error=response.status_code >= 500)
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                response.close()
+
+            self.stats.record_retry()
+            time.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def get(self, path='', **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path='', **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+class AsyncUpstreamClient:
+    """asyncio counterpart of an UpstreamClient, used by the async serving mode.
+
+    Sends through an httpx.AsyncClient with the same base URL, timeouts and retry policy as
+    the sync client it wraps and records into the same LatencyStats. The httpx client is
+    created on first use so it belongs to the event loop that serves requests.
+    """
+
+    def __init__(self, client, max_connections=ASYNC_UPSTREAM_MAX_CONNECTIONS):
+        if httpx is None:
+            raise RuntimeError("The async serving mode requires httpx; install it with 'pip install httpx'")
+        self.sync = client
+        self.name = client.name
+        self.stats = client.stats
+        self.max_connections = max_connections
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            ))
+        return self._client
+
+    async def request(self, method, path='', timeout=None, stream=False, **kwargs):
+        """Send a request and return the httpx response, retrying transient failures.
+
+        With stream=True the body is not read; the caller must close the response.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        timeout = httpx.Timeout(self.sync.read_timeout if timeout is None else timeout,
+                                connect=self.sync.connect_timeout)
+        url = self.sync.url(path)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                request = self.client.build_request(method, url, timeout=timeout, **kwargs)
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                self.stats.record(time.perf_counter() - started, error=True)
+                safe_to_retry = idempotent or isinstance(e, httpx.ConnectTimeout)
+                if attempt >= self.sync.max_retries or not safe_to_retry:
+                    raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES and idempotent
+                self.stats.record(time.perf_counter() - started, error=response.status_code >= 500)
+                if not retryable or attempt >= self.sync.max_retries:
+                    return response
+                await response.aclose()
+
+            self.stats.record_retry()
+            await asyncio.sleep(self.sync.backoff_delay(attempt))
+            attempt += 1
+
+    async def get(self, path='', **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path='', **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+alpha_vantage = UpstreamClient('alpha_vantage', ALPHA_VANTAGE_BASE_URL,
+                               read_timeout=float(os.environ.get('ALPHA_VANTAGE_READ_TIMEOUT', '5')))
+xai = UpstreamClient('xai', XAI_API_URL, read_timeout=float(os.environ.get('XAI_READ_TIMEOUT', '30')))
+
+UPSTREAMS = {client.name: client for client in (alpha_vantage, xai)}
+
+
+def upstream_stats():
+    """Per-upstream latency stats for monitoring"""
+    return {name: client.stats.to_dict() for name, client in UPSTREAMS.items()}
@@ -0,0 +1,214 @@
+"""Local stand-in for the Alpha Vantage and X.AI APIs, for benchmarking without live keys.
+
+Serves GLOBAL_QUOTE, OVERVIEW and TIME_SERIES_DAILY/WEEKLY/MONTHLY at /query and chat
+completions (plain and streamed) at /v1/chat/completions, with configurable latency, error
+rate and rate-limit rate. Prices come from the backend's seeded market simulator, so they
+are deterministic per symbol and day and quotes match the time series. Point the backend at
+it with:
+
+    ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:8089/query XAI_API_URL=http://127.0.0.1:8089/v1
+
+Run with: python -m bench.fake_upstream --latency 150 --error-rate 0.02
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
+
+from app.simulator import market_simulator
+
+# Symbols starting with this prefix are answered with Alpha Vantage's invalid-symbol error
+INVALID_PREFIX = 'INVALID'
+
+TIME_SERIES_KEYS = {
+    'TIME_SERIES_DAILY': ('Time Series (Daily)', 1),
+    'TIME_SERIES_WEEKLY': ('Weekly Time Series', 5),
+    'TIME_SERIES_MONTHLY': ('Monthly Time Series', 21)
+}
+
+SECTORS = ['TECHNOLOGY', 'FINANCIAL SERVICES', 'HEALTHCARE', 'ENERGY', 'CONSUMER CYCLICAL', 'INDUSTRIALS']
+
+
+class FakeUpstreamConfig:
+    """Latency (ms, mean and uniform jitter), error and rate-limit rates for every response"""
+
+    def __init__(self, latency=100.0, jitter=50.0, llm_latency=1500.0, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.llm_latency = llm_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def roll(self):
+        """Pick this response's outcome: 'error', 'rate_limited' or 'ok'"""
+        with self.lock:
+            value = self.random.random()
+        if value < self.error_rate:
+            return 'error'
+        if value < self.error_rate + self.rate_limit_rate:
+            return 'rate_limited'
+        return 'ok'
+
+    def delay(self, base):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, base + jitter) / 1000)
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def symbol_seed(symbol):
+    return zlib.crc32(symbol.upper().encode())
+
+
+def global_quote(symbol):
+    quote = {name: values[0] for name, values in market_simulator.quotes([symbol]).items()}
+    return {"Global Quote": {
+        "01. symbol": symbol.upper(),
+        "02. open": f"{quote['open']:.4f}",
+        "03. high": f"{quote['high']:.4f}",
+        "04. low": f"{quote['low']:.4f}",
+        "05. price": f"{quote['price']:.4f}",
+        "06. volume": str(int(quote['volume'])),
+        "07. latest trading day": str(quote['date']),
+        "08. previous close": f"{quote['previousClose']:.4f}",
+        "09. change": f"{quote['change']:.4f}",
+        "10. change percent": f"{quote['changePercent']:.4f}%"
+    }}
+
+
+def overview(symbol):
+    seed = symbol_seed(symbol)
+    return {
+        "Symbol": symbol.upper(),
+        "Name": f"{symbol.upper()} Holdings Inc",
+        "Exchange": "NASDAQ" if seed % 2 else "NYSE",
+        "Sector": SECTORS[seed % len(SECTORS)],
+        "Industry": "BENCHMARK",
+        "MarketCapitalization": str(int(market_simulator.quotes([symbol])['marketCap'][0]))
+    }
+
+
+def time_series(function, symbol, outputsize):
+    key, step = TIME_SERIES_KEYS[function]
+    bars = market_simulator.bars(symbol, 2500 if outputsize == 'full' else 100, step)[::-1]
+    series = {
+        day: {
+            "1. open": f"{open_:.4f}",
+            "2. high": f"{high:.4f}",
+            "3. low": f"{low:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(int(volume))
+        }
+        for day, open_, high, low, close, volume in zip(
+            np.datetime_as_string(bars['date']).tolist(), bars['open'].tolist(), bars['high'].tolist(),
+            bars['low'].tolist(), bars['close'].tolist(), bars['volume'].tolist())
+    }
+    return {"Meta Data": {"2. Symbol": symbol.upper()}, key: series}
+
+
+def completion_text(body):
+    prompt = next((m['content'] for m in reversed(body.get('messages', [])) if m.get('role') == 'user'), '')
+    return (f"Benchmark answer for: {prompt[:80]}. " + "Markets moved on earnings and macro data. " * 8).strip()
+
+
+def create_fake_upstream(config):
+    app = Flask(__name__)
+
+    @app.route('/query', methods=['GET'])
+    def query():
+        function = request.args.get('function', '')
+        symbol = request.args.get('symbol', '')
+        config.count(function or 'unknown')
+        config.delay(config.latency)
+
+        outcome = config.roll()
+        if outcome == 'error':
+            return jsonify({"error": "upstream failure"}), 503
+        if outcome == 'rate_limited':
+            return jsonify({"Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day."})
+
+        if not symbol or symbol.upper().startswith(INVALID_PREFIX):
+            return jsonify({"Error Message": f"Invalid API call. Please retry or visit the documentation for {function}."})
+        if function == 'GLOBAL_QUOTE':
+            return jsonify(global_quote(symbol))
+        if function == 'OVERVIEW':
+            return jsonify(overview(symbol))
+        if function in TIME_SERIES_KEYS:
+            return jsonify(time_series(function, symbol, request.args.get('outputsize', 'compact')))
+        return jsonify({"Error Message": f"Invalid API call. Unknown function {function}."})
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(silent=True) or {}
+        config.count('chat_completions')
+
+        outcome = config.roll()
+        if outcome == 'error':
+            config.delay(config.latency)
+            return jsonify({"error": "upstream failure"}), 500
+        if outcome == 'rate_limited':
+            config.delay(config.latency)
+            return jsonify({"error": "Rate limit exceeded"}), 429
+
+        text = completion_text(body)
+        if not body.get('stream'):
+            config.delay(config.llm_latency)
+            return jsonify({
+                "id": "bench",
+                "model": body.get('model'),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]
+            })
+
+        # Streamed: first token after the base latency, the rest spread over the LLM latency
+        words = text.split(' ')
+
+        def events():
+            config.delay(config.latency)
+            for i, word in enumerate(words):
+                chunk = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else ' ' + word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                time.sleep(config.llm_latency / 1000 / len(words))
+            yield "data: [DONE]\n\n"
+
+        return Response(events(), mimetype='text/event-stream')
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        with config.lock:
+            return jsonify(dict(config.counts))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('FAKE_UPSTREAM_PORT', '8089')))
+    parser.add_argument('--latency', type=float, default=100.0, help='mean Alpha Vantage latency in ms')
+    parser.add_argument('--jitter', type=float, default=50.0, help='uniform latency jitter in ms')
+    parser.add_argument('--llm-latency', type=float, default=1500.0, help='chat completion latency in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of responses that are 5xx errors')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of responses that are rate-limit replies')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeUpstreamConfig(latency=args.latency, jitter=args.jitter, llm_latency=args.llm_latency,
+                                error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    print(f"Fake upstream listening on http://{args.host}:{args.port} (/query, /v1/chat/completions)")
+    create_fake_upstream(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
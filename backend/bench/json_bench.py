@@ -0,0 +1,103 @@
+"""Micro-benchmark of the JSON providers on realistic /api payloads.
+
+Serializes each payload the way jsonify does with the stdlib provider and with the
+orjson-backed provider, and reports the best time per call and the speedup:
+
+    python -m bench.json_bench --bars 1260 --repeat 7
+"""
+import argparse
+import timeit
+
+import numpy as np
+from flask import Flask
+
+from app.history_store import BAR_DTYPE
+from app.json_provider import FastJSONProvider, NumpyJSONProvider, orjson
+from app.timeseries import bars_to_columns, bars_to_rows
+
+SECTORS = ['Technology', 'Healthcare', 'Financial', 'Consumer Cyclical', 'Energy', 'Consumer Defensive',
+           'Industrial', 'Basic Materials', 'Real Estate', 'Utilities', 'Communication Services']
+
+
+def synthetic_bars(count, seed=7):
+    """Daily bars ending today, shaped like the history store's arrays"""
+    rng = np.random.default_rng(seed)
+    bars = np.empty(count, dtype=BAR_DTYPE)
+    bars['date'] = np.datetime64('today', 'D') - np.arange(count)[::-1]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, count)))
+    bars['open'] = np.round(close * (1 + rng.normal(0, 0.003, count)), 2)
+    bars['close'] = np.round(close, 2)
+    bars['high'] = np.maximum(bars['open'], bars['close']) + np.round(rng.uniform(0, 2, count), 2)
+    bars['low'] = np.minimum(bars['open'], bars['close']) - np.round(rng.uniform(0, 2, count), 2)
+    bars['volume'] = rng.integers(1_000_000, 50_000_000, count)
+    return bars
+
+
+def quote(symbol, rng):
+    price = float(np.round(rng.uniform(20, 800), 2))
+    return {
+        "symbol": symbol,
+        "shortName": f"{symbol} Inc.",
+        "regularMarketPrice": price,
+        "regularMarketChange": float(np.round(rng.normal(0, 3), 2)),
+        "regularMarketChangePercent": float(np.round(rng.normal(0, 1.5), 4)),
+        "regularMarketVolume": float(rng.integers(1_000_000, 90_000_000)),
+        "marketCap": float(rng.integers(10**9, 3 * 10**12)),
+        "regularMarketOpen": price,
+        "regularMarketDayHigh": price * 1.01,
+        "regularMarketDayLow": price * 0.99,
+        "regularMarketPreviousClose": price
+    }
+
+
+def payloads(bar_count):
+    rng = np.random.default_rng(11)
+    bars = synthetic_bars(bar_count)[::-1]
+    symbols = [f"SYM{i}" for i in range(100)]
+    columns = bars_to_columns(bars)
+    return {
+        'historical-rows': bars_to_rows(bars),
+        'historical-columnar': dict(symbol='AAPL', interval='daily', **columns),
+        'indicators-ndarray': {"symbol": "AAPL", "sma": bars['close'].copy(), "rsi": rng.uniform(0, 100, bar_count)},
+        'quotes-batch-100': {
+            "quotes": {symbol: quote(symbol, rng) for symbol in symbols},
+            "errors": {},
+            "missing": []
+        },
+        'sector-performance': [
+            {"sector": sector, "performance": float(rng.normal(0, 2)), "lastUpdated": "2024-01-02T15:30:00"}
+            for sector in SECTORS
+        ]
+    }
+
+
+def best_time(function, repeat):
+    """Best seconds per call over repeat rounds, each long enough to time reliably"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the stdlib and orjson JSON providers on /api payloads')
+    parser.add_argument('--bars', type=int, default=1260, help='bars per historical payload (1260 = 5y daily)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    stdlib, fast = NumpyJSONProvider(app), FastJSONProvider(app)
+    if orjson is None:
+        print("orjson is not installed: the fast provider falls back to the stdlib encoder\n")
+
+    header = f"{'payload':<22}{'bytes':>10}{'stdlib us':>12}{'fast us':>12}{'speedup':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, payload in payloads(args.bars).items():
+        size = len(fast.response_bytes(payload))
+        slow_time = best_time(lambda: stdlib.response_bytes(payload), args.repeat)
+        fast_time = best_time(lambda: fast.response_bytes(payload), args.repeat)
+        print(f"{name:<22}{size:>10}{slow_time * 1e6:>12.1f}{fast_time * 1e6:>12.1f}{slow_time / fast_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
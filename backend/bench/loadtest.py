@@ -0,0 +1,318 @@
+"""End-to-end load test for every /api route.
+
+Drives each scenario with a fixed number of requests at the configured concurrency and
+reports throughput, latency percentiles, status codes and how many responses fell back to
+mock data. Streaming scenarios are timed to their first event. Each run is saved as JSON
+under bench/results so runs can be compared with --compare.
+
+Against a running backend:
+
+    python -m bench.loadtest --base-url http://127.0.0.1:3002 --concurrency 32
+
+Or start the fake upstream and a backend wired to it for the duration of the run:
+
+    python -m bench.loadtest --spawn --server-mode async --compare previous
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'bench', 'results')
+
+DEFAULT_SYMBOLS = 'AAPL,MSFT,GOOGL,AMZN,META,NVDA,TSLA,JPM,V,HD'
+
+# name -> (method, path template, JSON body template or None, timed to first event)
+# Templates may use {symbol}, {symbols} (a batch of up to 10) and {n} (the request number).
+SCENARIOS = {
+    'quote': ('GET', '/api/quote/{symbol}', None, False),
+    'quotes': ('GET', '/api/quotes?symbols={symbols}', None, False),
+    'historical': ('GET', '/api/historical/{symbol}?period=1y', None, False),
+    'historical-columnar': ('GET', '/api/historical/{symbol}?period=1y&format=columnar', None, False),
+    'indicators': ('GET', '/api/indicators/{symbol}', None, False),
+    'market-indices': ('GET', '/api/market-indices', None, False),
+    'top-movers': ('GET', '/api/top-movers', None, False),
+    'sector-performance': ('GET', '/api/sector-performance', None, False),
+    'health': ('GET', '/api/health', None, False),
+    'upstream-stats': ('GET', '/api/upstream-stats', None, False),
+    'rate-limit': ('GET', '/api/rate-limit', None, False),
+    'cache-stats': ('GET', '/api/cache-stats', None, False),
+    'metrics': ('GET', '/api/metrics', None, False),
+    'portfolio-analyze': ('POST', '/api/portfolio/analyze', {"holdings": [
+        {"symbol": "{symbol}", "quantity": 10, "costBasis": 100},
+        {"symbol": "SPY", "quantity": 5}
+    ], "period": "6mo"}, False),
+    'test-xai': ('GET', '/api/test-xai', None, False),
+    'news-summary': ('GET', '/api/stock-news-summary/{symbol}', None, False),
+    'news-summary-stream': ('GET', '/api/stock-news-summary/{symbol}?stream=true', None, True),
+    'research': ('POST', '/api/research', {"message": "How is {symbol} positioned? ({n})", "promptType": "STOCK_RECOMMENDATIONS"}, False),
+    'research-stream': ('POST', '/api/research', {"message": "Summarize {symbol} ({n})", "stream": True}, True),
+    'stream-quotes': ('GET', '/api/stream/quotes?symbols={symbol}', None, True)
+}
+
+FAKE_UPSTREAM_PORT = 8089
+SPAWN_BACKEND_PORT = 3003
+
+
+def fill(template, symbols, n):
+    symbol = symbols[n % len(symbols)]
+    batch = ','.join(symbols[(n + i) % len(symbols)] for i in range(min(10, len(symbols))))
+    if isinstance(template, dict):
+        return {key: fill(value, symbols, n) for key, value in template.items()}
+    if isinstance(template, list):
+        return [fill(value, symbols, n) for value in template]
+    if isinstance(template, str):
+        return template.format(symbol=symbol, symbols=batch, n=n)
+    return template
+
+
+def send(session, base_url, scenario, symbols, n, timeout):
+    """Make one request and return (latency seconds, status code or None, used mock data)"""
+    method, path, body, first_event = SCENARIOS[scenario]
+    started = time.perf_counter()
+    try:
+        response = session.request(method, base_url + fill(path, symbols, n),
+                                   json=fill(body, symbols, n) if body else None,
+                                   timeout=timeout, stream=first_event)
+        if first_event:
+            # Time to the first quote/token event, then hang up
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line and line.startswith('data:'):
+                        break
+            return time.perf_counter() - started, response.status_code, False
+
+        elapsed = time.perf_counter() - started
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return elapsed, response.status_code, used_mock(payload)
+    except requests.RequestException:
+        return time.perf_counter() - started, None, False
+
+
+def used_mock(payload):
+    """Whether a response (or any entry of a batch response) was served from mock data"""
+    if isinstance(payload, dict):
+        if payload.get('source') == 'mock':
+            return True
+        if any(isinstance(entry, dict) and entry.get('source') == 'mock' for entry in (payload.get('quotes') or {}).values()):
+            return True
+        return any('mock' in (position.get('source') or {}).values() for position in payload.get('positions') or [])
+    return False
+
+
+def run_scenario(base_url, scenario, symbols, total, concurrency, timeout):
+    local = threading.local()
+
+    def one(n):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return send(local.session, base_url, scenario, symbols, n, timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = np.array([sample[0] for sample in samples]) * 1000
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "ok": sum(1 for _, status, _ in samples if status == 200),
+        "errors": sum(1 for _, status, _ in samples if status != 200),
+        "mock": sum(1 for _, _, mock in samples if mock),
+        "statuses": statuses,
+        "seconds": wall,
+        "throughput": total / wall if wall else 0.0,
+        "meanMs": float(latencies.mean()),
+        "p50Ms": float(p50),
+        "p95Ms": float(p95),
+        "p99Ms": float(p99),
+        "maxMs": float(latencies.max())
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def spawn_servers(args):
+    """Start the fake upstream and a backend pointed at it; returns (base URL, processes)"""
+    workdir = tempfile.mkdtemp(prefix='tennant-ticker-bench-')
+    upstream = subprocess.Popen(
+        [sys.executable, '-m', 'bench.fake_upstream', '--port', str(FAKE_UPSTREAM_PORT),
+         '--latency', str(args.latency), '--llm-latency', str(args.llm_latency),
+         '--error-rate', str(args.error_rate), '--rate-limit-rate', str(args.rate_limit_rate), '--seed', '1'],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    env = dict(
+        os.environ,
+        PORT=str(SPAWN_BACKEND_PORT),
+        SERVER_MODE=args.server_mode,
+        ALPHA_VANTAGE_BASE_URL=f'http://127.0.0.1:{FAKE_UPSTREAM_PORT}/query',
+        XAI_API_URL=f'http://127.0.0.1:{FAKE_UPSTREAM_PORT}/v1',
+        ALPHA_VANTAGE_API_KEY='bench',
+        XAI_API_KEY='bench',
+        # Unlimited call budget and no mock fallback, so the run measures the real request path
+        ALPHA_VANTAGE_CALLS_PER_MINUTE='0',
+        ALPHA_VANTAGE_CALLS_PER_DAY='0',
+        USE_MOCK_DATA_FALLBACK='false',
+        RATE_LIMIT_DB=os.path.join(workdir, 'ratelimit.sqlite'),
+        REFERENCE_DB=os.path.join(workdir, 'reference.sqlite'),
+        LLM_CACHE_DB=os.path.join(workdir, 'llm-cache.sqlite'),
+        HISTORY_STORE_DIR=os.path.join(workdir, 'history')
+    )
+    command = args.backend_cmd.split() if args.backend_cmd else [sys.executable, 'wsgi.py']
+    backend = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    processes = [backend, upstream]
+    try:
+        wait_until_up(f'http://127.0.0.1:{FAKE_UPSTREAM_PORT}/stats')
+        wait_until_up(f'http://127.0.0.1:{SPAWN_BACKEND_PORT}/api/health')
+    except RuntimeError:
+        stop_servers(processes)
+        raise
+    return f'http://127.0.0.1:{SPAWN_BACKEND_PORT}', processes
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def save_results(run):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{run['startedAt'].replace(':', '').replace('-', '')}.json")
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+def load_baseline(spec, current_path):
+    """Resolve --compare: a results file path, or 'previous' for the newest run before this one"""
+    if spec != 'previous':
+        with open(spec) as f:
+            return json.load(f)
+    runs = sorted(path for path in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if path != current_path)
+    if not runs:
+        return None
+    with open(runs[-1]) as f:
+        return json.load(f)
+
+
+def delta(current, baseline):
+    if not baseline:
+        return ''
+    return f" ({(current - baseline) / baseline * 100:+.0f}%)"
+
+
+def print_report(run, baseline=None):
+    print(f"\n{run['label'] or 'run'} @ {run['commit'] or '?'}  concurrency={run['concurrency']}  base={run['baseUrl']}")
+    header = f"{'scenario':<22}{'req/s':>16}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}{'errors':>8}{'mock':>6}"
+    print(header)
+    print('-' * len(header))
+    for name, result in run['scenarios'].items():
+        before = (baseline or {}).get('scenarios', {}).get(name, {})
+        print(f"{name:<22}"
+              f"{result['throughput']:>8.1f}{delta(result['throughput'], before.get('throughput')):>8}"
+              f"{result['p50Ms']:>8.1f}{delta(result['p50Ms'], before.get('p50Ms')):>8}"
+              f"{result['p95Ms']:>8.1f}{delta(result['p95Ms'], before.get('p95Ms')):>8}"
+              f"{result['p99Ms']:>8.1f}{delta(result['p99Ms'], before.get('p99Ms')):>8}"
+              f"{result['errors']:>8}{result['mock']:>6}")
+    if baseline:
+        print(f"\ncompared with {baseline.get('label') or 'run'} @ {baseline.get('commit') or '?'} from {baseline['startedAt']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end load test for every /api route')
+    parser.add_argument('--base-url', default='http://127.0.0.1:3002')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated scenario names')
+    parser.add_argument('--symbols', default=DEFAULT_SYMBOLS)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--label', default='', help='name stored with the results, e.g. "async-4w"')
+    parser.add_argument('--compare', default=None, help="results file to compare with, or 'previous'")
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--spawn', action='store_true', help='start the fake upstream and a backend for the run')
+    parser.add_argument('--server-mode', default='sync', choices=['sync', 'async'], help='with --spawn')
+    parser.add_argument('--backend-cmd', default=None, help="with --spawn, e.g. 'gunicorn -w 4 -b 127.0.0.1:3003 wsgi:app'")
+    parser.add_argument('--latency', type=float, default=100.0, help='with --spawn: fake Alpha Vantage latency in ms')
+    parser.add_argument('--llm-latency', type=float, default=1500.0, help='with --spawn: fake chat completion latency in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='with --spawn: fake upstream 5xx rate')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='with --spawn: fake upstream rate-limit rate')
+    parser.add_argument('--verbose', action='store_true', help='with --spawn: show backend output')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}. Available: {', '.join(SCENARIOS)}")
+    symbols = [symbol.strip().upper() for symbol in args.symbols.split(',') if symbol.strip()]
+
+    base_url, processes = (spawn_servers(args) if args.spawn else (args.base_url.rstrip('/'), []))
+    run = {
+        "startedAt": datetime.now().isoformat(timespec='seconds'),
+        "label": args.label or (f"spawn-{args.server_mode}" if args.spawn else ''),
+        "commit": git_commit(),
+        "baseUrl": base_url,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "scenarios": {}
+    }
+    if args.spawn:
+        run["upstream"] = {"latencyMs": args.latency, "llmLatencyMs": args.llm_latency,
+                           "errorRate": args.error_rate, "rateLimitRate": args.rate_limit_rate}
+    try:
+        for name in scenarios:
+            print(f"Running {name}...", flush=True)
+            run["scenarios"][name] = run_scenario(base_url, name, symbols, args.requests, args.concurrency, args.timeout)
+    finally:
+        stop_servers(processes)
+
+    path = None if args.no_save else save_results(run)
+    baseline = load_baseline(args.compare, path) if args.compare else None
+    print_report(run, baseline)
+    if path:
+        print(f"\nSaved results to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import pytest
+
+from app import circuit
+from app.circuit import CircuitBreaker, CircuitBreakers, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def open_breaker(**options):
+    breaker = CircuitBreaker('test', 'GLOBAL_QUOTE', failure_threshold=3, recovery_timeout=30, **options)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', 'GLOBAL_QUOTE', failure_threshold=3, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert not breaker.allow()
+    status = breaker.status()
+    assert status["rejected"] == 2
+    assert status["opened"] == 1
+    assert status["retryIn"] == 30
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = open_breaker()
+    clock[0] += 29
+    assert not breaker.allow()
+
+    clock[0] += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.status()["opened"] == 2
+    assert not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.allow()
+
+
+def test_success_threshold_needs_several_probes(clock):
+    breaker = open_breaker(success_threshold=2)
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_released_or_lost_probe_frees_the_slot(clock):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+    # A probe that never reports back stops blocking others after recovery_timeout
+    assert not breaker.allow()
+    clock[0] += 30
+    assert breaker.allow()
+
+
+def test_breakers_are_kept_per_upstream_and_function(clock):
+    breakers = CircuitBreakers(failure_threshold=1, recovery_timeout=10)
+    quote = breakers.get('alpha_vantage', 'GLOBAL_QUOTE')
+    assert breakers.get('alpha_vantage', 'GLOBAL_QUOTE') is quote
+    quote.record_failure()
+
+    assert not quote.allow()
+    assert breakers.get('alpha_vantage', 'OVERVIEW').allow()
+    status = breakers.status()
+    assert status['alpha_vantage']['GLOBAL_QUOTE']["state"] == OPEN
+    assert status['alpha_vantage']['OVERVIEW']["state"] == CLOSED
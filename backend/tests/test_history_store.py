@@ -0,0 +1,62 @@
+import json
+import time
+
+import numpy as np
+
+from app.history_store import BAR_DTYPE, HistoryStore, bars_since, merge_bars
+
+
+def daily_bars(end, count):
+    bars = np.zeros(count, dtype=BAR_DTYPE)
+    bars['date'] = np.busday_offset(np.datetime64(end, 'D'), np.arange(-count + 1, 1), roll='backward')
+    bars['close'] = np.arange(count, dtype='f8')
+    return bars
+
+
+def age_series(store, symbol, interval, seconds):
+    path = store._path(symbol, interval, 'json')
+    with open(path) as f:
+        meta = json.load(f)
+    meta['updated'] = time.time() - seconds
+    with open(path, 'w') as f:
+        json.dump(meta, f)
+
+
+def test_fresh_series_is_not_fetched(tmp_path):
+    store = HistoryStore(str(tmp_path), refresh_interval=900)
+    assert store.needs_fetch('AAPL', 'daily', False) == 'compact'
+    store.append('AAPL', 'daily', daily_bars(np.datetime64('today', 'D'), 10))
+    assert store.needs_fetch('AAPL', 'daily', False) is None
+    assert store.needs_fetch('AAPL', 'daily', True) == 'full'
+
+
+def test_stale_series_within_the_compact_window_is_topped_up(tmp_path):
+    store = HistoryStore(str(tmp_path), refresh_interval=900)
+    store.append('AAPL', 'daily', daily_bars(np.datetime64('today', 'D') - 20, 50))
+    age_series(store, 'AAPL', 'daily', 1000)
+    assert store.needs_fetch('AAPL', 'daily', False) == 'compact'
+
+
+def test_series_idle_longer_than_the_compact_window_is_fetched_in_full(tmp_path):
+    store = HistoryStore(str(tmp_path), refresh_interval=900)
+    store.append('AAPL', 'daily', daily_bars(np.datetime64('today', 'D') - 200, 50), backfilled=True)
+    age_series(store, 'AAPL', 'daily', 1000)
+    assert store.needs_fetch('AAPL', 'daily', False) == 'full'
+    assert store.needs_fetch('AAPL', 'daily', True) == 'full'
+
+
+def test_bars_since_counts_bars_of_each_interval():
+    today = np.datetime64('2024-06-14')  # a Friday
+    assert bars_since(np.datetime64('2024-06-07'), 'daily', today) == 5
+    assert bars_since(np.datetime64('2024-05-31'), 'weekly', today) == 2
+    assert bars_since(np.datetime64('2023-12-29'), 'monthly', today) == 6
+
+
+def test_merge_prefers_new_bars_for_the_same_date():
+    existing = daily_bars('2024-06-14', 5)
+    new = daily_bars('2024-06-17', 2)
+    new['close'] = [100.0, 101.0]
+    merged = merge_bars(existing, new)
+    assert len(merged) == 6
+    assert np.all(np.diff(merged['date'].astype('int64')) > 0)
+    assert merged['close'][-2:].tolist() == [100.0, 101.0]
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.indicators import IndicatorEngine, INDICATORS, parse_indicator_specs
+
+
+def make_bars(count, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    dates = [str(day) for day in np.datetime64('2020-01-01') + np.arange(count)]
+    return {"date": dates, "close": close}
+
+
+def window(bars, end):
+    return {"date": bars["date"][:end], "close": bars["close"][:end]}
+
+
+ALL_SPECS = parse_indicator_specs('sma:10,ema:12,rsi:14,macd:12:26:9,bbands:20:2,volatility:20')
+
+
+@pytest.mark.parametrize('spec', ALL_SPECS, ids=lambda spec: spec.key)
+def test_incremental_matches_full_recompute(spec):
+    bars = make_bars(300)
+    engine = IndicatorEngine()
+    engine.compute('AAPL', 'daily', window(bars, 200), spec)
+    for end in (201, 205, 240, 300):
+        incremental = engine.compute('AAPL', 'daily', window(bars, end), spec)
+        full = IndicatorEngine().compute('AAPL', 'daily', window(bars, end), spec)
+        for name in INDICATORS[spec.name][2]:
+            np.testing.assert_allclose(incremental[name], full[name], rtol=1e-9, equal_nan=True)
+    assert engine.full_computes == 1
+    assert engine.incremental_computes == 4
+
+
+def test_revised_latest_bar_is_recomputed():
+    bars = make_bars(120)
+    spec = parse_indicator_specs('ema:10')[0]
+    engine = IndicatorEngine()
+    engine.compute('AAPL', 'daily', bars, spec)
+
+    revised = {"date": bars["date"], "close": bars["close"].copy()}
+    revised["close"][-1] *= 1.05
+    result = engine.compute('AAPL', 'daily', revised, spec)
+
+    expected = pd.Series(revised["close"]).ewm(span=10, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(result["ema"], expected)
+    assert engine.incremental_computes == 1
+
+
+def test_rewritten_history_falls_back_to_a_full_compute():
+    bars = make_bars(150)
+    spec = parse_indicator_specs('sma:5')[0]
+    engine = IndicatorEngine()
+    engine.compute('AAPL', 'daily', window(bars, 100), spec)
+
+    shifted = {"date": bars["date"][10:], "close": bars["close"][10:]}
+    result = engine.compute('AAPL', 'daily', shifted, spec)
+    expected = pd.Series(shifted["close"]).rolling(5).mean().to_numpy()
+    np.testing.assert_allclose(result["sma"], expected, equal_nan=True)
+    assert engine.full_computes == 2
+    assert engine.incremental_computes == 0
+
+
+def test_warmup_bars_are_nan_and_rsi_is_bounded():
+    bars = make_bars(100)
+    engine = IndicatorEngine()
+    rsi = engine.compute('AAPL', 'daily', bars, parse_indicator_specs('rsi:14')[0])["rsi"]
+    assert np.isnan(rsi[:14]).all()
+    assert ((rsi[14:] >= 0) & (rsi[14:] <= 100)).all()
+
+    sma = engine.compute('AAPL', 'daily', bars, parse_indicator_specs('sma:20')[0])["sma"]
+    assert np.isnan(sma[:19]).all() and not np.isnan(sma[19:]).any()
+
+
+def test_parse_indicator_specs():
+    specs = parse_indicator_specs('SMA:50, macd, bbands:20:2.5')
+    assert [(spec.name, spec.params) for spec in specs] == [
+        ('sma', (50,)), ('macd', (12, 26, 9)), ('bbands', (20, 2.5))
+    ]
+    assert [spec.name for spec in parse_indicator_specs('')] == list(INDICATORS)
+
+    for text in ('foo', 'sma:10:20', 'rsi:0', 'ema:abc'):
+        with pytest.raises(ValueError):
+            parse_indicator_specs(text)
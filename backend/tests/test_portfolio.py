@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.portfolio import analyze, parse_holdings
+
+
+def test_lots_of_the_same_symbol_are_merged():
+    symbols, quantities, costs = parse_holdings([
+        {"symbol": "aapl", "quantity": 10, "costBasis": 150},
+        {"symbol": "AAPL", "quantity": 5, "costBasis": 120},
+        {"symbol": "MSFT", "quantity": 2}
+    ])
+    assert symbols == ['AAPL', 'MSFT']
+    assert quantities.tolist() == [15.0, 2.0]
+    assert costs[0] == 2100.0
+    assert np.isnan(costs[1])
+
+
+@pytest.mark.parametrize('holdings', [[], None, [{"quantity": 1}], [{"symbol": "A", "quantity": "x"}]])
+def test_bad_holdings_raise_value_error(holdings):
+    with pytest.raises(ValueError):
+        parse_holdings(holdings)
+
+
+def test_analyze_totals_exposure_and_risk():
+    dates = pd.bdate_range('2024-01-01', periods=60)
+    rng = np.random.default_rng(0)
+    closes = {symbol: pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 60))), index=dates)
+              for symbol in ('AAPL', 'XOM')}
+    quotes = {'AAPL': {"price": 200.0, "change": 2.0}, 'XOM': {"price": 100.0, "change": -1.0}}
+    payload = analyze(['AAPL', 'XOM', 'SPY'], np.array([10.0, 20.0, 5.0]), np.array([1500.0, np.nan, np.nan]),
+                      quotes, {'AAPL': 'Technology', 'XOM': 'Energy'}, closes)
+
+    summary = payload["summary"]
+    assert summary["totalValue"] == 4000.0
+    assert summary["dayPnl"] == 0.0
+    assert summary["unrealizedPnl"] == 500.0
+    assert summary["priced"] == 2
+    assert [entry["sector"] for entry in payload["sectorExposure"]] == ['Energy', 'Technology']
+    assert payload["positions"][2]["value"] is None
+
+    returns = np.log(pd.DataFrame(closes).to_numpy())
+    returns = np.diff(returns, axis=0)
+    weights = np.array([0.5, 0.5])
+    expected = np.sqrt(weights @ np.cov(returns, rowvar=False) @ weights * 252)
+    assert summary["volatility"] == pytest.approx(expected)
+    assert payload["correlation"]["symbols"] == ['AAPL', 'XOM']
+    assert payload["correlation"]["matrix"][0][0] == 1.0
@@ -0,0 +1,75 @@
+import asyncio
+
+from app import ratelimit
+from app.ratelimit import RateLimitGovernor, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+
+def make_governor(tmp_path, **options):
+    options.setdefault('interactive_wait', 0)
+    return RateLimitGovernor('test', str(tmp_path / 'ratelimit.sqlite'), **options)
+
+
+def test_background_callers_leave_the_minute_reserve(tmp_path):
+    governor = make_governor(tmp_path, per_minute=3, per_day=100, minute_reserve=1, day_reserve=0)
+    assert governor.try_acquire(PRIORITY_BACKGROUND) == (True, 0.0)
+    assert governor.try_acquire(PRIORITY_BACKGROUND) == (True, 0.0)
+    granted, wait = governor.try_acquire(PRIORITY_BACKGROUND)
+    assert not granted and wait > 0
+
+    assert governor.try_acquire(PRIORITY_INTERACTIVE) == (True, 0.0)
+    granted, wait = governor.try_acquire(PRIORITY_INTERACTIVE)
+    assert not granted and wait > 0
+
+
+def test_daily_budget_and_reserve(tmp_path):
+    governor = make_governor(tmp_path, per_minute=0, per_day=5, day_reserve=2)
+    assert [governor.try_acquire(PRIORITY_BACKGROUND)[0] for _ in range(4)] == [True, True, True, False]
+    assert governor.try_acquire(PRIORITY_BACKGROUND) == (False, None)
+    assert [governor.try_acquire(PRIORITY_INTERACTIVE)[0] for _ in range(3)] == [True, True, False]
+
+    remaining = governor.remaining()
+    assert remaining["dayUsed"] == 5
+    assert remaining["dayRemaining"] == 0
+    assert remaining["minuteRemaining"] is None
+
+
+def test_tokens_refill_over_time(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: clock[0])
+    governor = make_governor(tmp_path, per_minute=6, per_day=100, minute_reserve=0)
+    for _ in range(6):
+        assert governor.try_acquire(PRIORITY_INTERACTIVE)[0]
+    assert governor.try_acquire(PRIORITY_INTERACTIVE) == (False, 10.0)
+
+    clock[0] += 10
+    assert governor.try_acquire(PRIORITY_INTERACTIVE) == (True, 0.0)
+    assert not governor.try_acquire(PRIORITY_INTERACTIVE)[0]
+
+
+def test_workers_share_one_budget(tmp_path):
+    first = make_governor(tmp_path, per_minute=0, per_day=3, day_reserve=0)
+    second = make_governor(tmp_path, per_minute=0, per_day=3, day_reserve=0)
+    assert first.try_acquire()[0]
+    assert second.try_acquire()[0]
+    assert first.try_acquire()[0]
+    assert second.try_acquire() == (False, None)
+    assert first.remaining()["dayUsed"] == 3
+
+
+def test_mark_exhausted_drains_the_bucket(tmp_path):
+    governor = make_governor(tmp_path, per_minute=5, per_day=25, minute_reserve=0, day_reserve=0)
+    governor.mark_exhausted()
+    assert governor.remaining()["minuteRemaining"] == 0
+    assert governor.remaining()["dayRemaining"] == 25
+
+    governor.mark_exhausted(daily=True)
+    assert governor.remaining()["dayRemaining"] == 0
+    assert governor.try_acquire(PRIORITY_INTERACTIVE) == (False, None)
+
+
+def test_acquire_gives_up_when_the_wait_is_too_long(tmp_path):
+    governor = make_governor(tmp_path, per_minute=1, per_day=100, minute_reserve=0, interactive_wait=0.5)
+    assert governor.acquire(PRIORITY_INTERACTIVE)
+    assert not governor.acquire(PRIORITY_INTERACTIVE)
+    assert not asyncio.run(governor.acquire_async(PRIORITY_INTERACTIVE))
+    assert governor.remaining()["denied"] == {PRIORITY_INTERACTIVE: 2, PRIORITY_BACKGROUND: 0}
@@ -0,0 +1,36 @@
+from app.reference import ReferenceStore
+
+
+def test_overview_without_name_is_stored_as_a_placeholder(tmp_path):
+    store = ReferenceStore(str(tmp_path / 'reference.sqlite'))
+    row = store.put_reply('spy', {})
+    assert row['symbol'] == 'SPY'
+    assert row['name'] == 'SPY'
+    assert row['sector'] is None
+    assert store.missing(['SPY']) == []
+
+
+def test_rate_limit_reply_is_not_stored(tmp_path):
+    store = ReferenceStore(str(tmp_path / 'reference.sqlite'))
+    assert store.put_reply('AAPL', {"Information": "rate limit"}) is None
+    assert store.get('AAPL') is None
+
+
+def test_prefetch_stores_placeholders_and_stops_at_the_budget(tmp_path):
+    store = ReferenceStore(str(tmp_path / 'reference.sqlite'))
+    replies = {
+        'AAPL': {"Name": "Apple Inc", "Sector": "TECHNOLOGY", "MarketCapitalization": "3000000000000"},
+        'SPY': {},
+        'MSFT': {"Information": "budget exhausted"}
+    }
+    assert store.prefetch(['AAPL', 'SPY', 'MSFT', 'IBM'], replies.get) == 2
+    assert store.get('AAPL')['marketCap'] == 3e12
+    assert store.missing(['AAPL', 'SPY', 'MSFT', 'IBM']) == ['MSFT', 'IBM']
+
+
+def test_expired_rows_are_missing_but_served_stale(tmp_path):
+    store = ReferenceStore(str(tmp_path / 'reference.sqlite'), ttl=-1)
+    store.put('AAPL', {"Name": "Apple Inc"})
+    assert store.get('AAPL') is None
+    assert store.get('AAPL', allow_stale=True)['name'] == 'Apple Inc'
+    assert store.missing(['AAPL']) == ['AAPL']
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.history_store import BAR_DTYPE
+from app.timeseries import (
+    parse_time_series, parse_interval, resample_bars, lttb_indices, minmax_indices, downsample_bars
+)
+
+
+def make_bars(count, seed=3):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-01-02', periods=count).to_numpy(dtype='datetime64[D]')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    bars = np.empty(count, dtype=BAR_DTYPE)
+    bars['date'] = dates
+    bars['open'] = close * (1 + rng.normal(0, 0.005, count))
+    bars['close'] = close
+    bars['high'] = np.maximum(bars['open'], close) * 1.01
+    bars['low'] = np.minimum(bars['open'], close) * 0.99
+    bars['volume'] = rng.integers(1_000, 100_000, count)
+    return bars
+
+
+def pandas_resample(bars, rule):
+    frame = pd.DataFrame({name: bars[name] for name in BAR_DTYPE.names}).set_index(
+        pd.DatetimeIndex(bars['date'])
+    )
+    frame['date'] = frame.index
+    grouped = frame.resample(rule).agg({
+        'date': 'last', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+    }).dropna()
+    return grouped
+
+
+@pytest.mark.parametrize('interval, rule', [('weekly', 'W-SUN'), ('monthly', 'ME')])
+def test_weekly_and_monthly_match_pandas(interval, rule):
+    bars = make_bars(400)
+    resampled = resample_bars(bars, interval)
+    expected = pandas_resample(bars, rule)
+
+    assert len(resampled) == len(expected)
+    np.testing.assert_array_equal(resampled['date'], expected['date'].to_numpy(dtype='datetime64[D]'))
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        np.testing.assert_allclose(resampled[column], expected[column].to_numpy())
+
+
+def test_n_day_bars_count_back_from_the_latest_bar():
+    bars = make_bars(10)
+    resampled = resample_bars(bars, '3d')
+    assert len(resampled) == 4
+    np.testing.assert_array_equal(resampled['date'], bars['date'][[0, 3, 6, 9]])
+    np.testing.assert_array_equal(resampled['open'], bars['open'][[0, 1, 4, 7]])
+    assert resampled['volume'][1] == bars['volume'][1:4].sum()
+    assert resampled['high'][-1] == bars['high'][7:].max()
+    assert resampled['low'][-1] == bars['low'][7:].min()
+
+
+def test_daily_and_empty_bars_are_unchanged():
+    bars = make_bars(20)
+    assert resample_bars(bars, 'daily') is bars
+    assert len(resample_bars(bars[:0], 'weekly')) == 0
+
+
+def reference_lttb(values, max_points):
+    """Textbook Largest-Triangle-Three-Buckets, one point at a time"""
+    count = len(values)
+    every = (count - 2) / (max_points - 2)
+    kept = [0]
+    previous = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        if bucket == max_points - 3:
+            next_x, next_y = count - 1, values[count - 1]
+        else:
+            next_x = sum(range(end, next_end)) / (next_end - end)
+            next_y = sum(values[end:next_end]) / (next_end - end)
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((previous - next_x) * (values[index] - values[previous])
+                       - (previous - index) * (next_y - values[previous]))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
+
+@pytest.mark.parametrize('count, max_points', [(1000, 100), (997, 53), (50, 7), (300, 299)])
+def test_lttb_matches_reference(count, max_points):
+    values = make_bars(count)['close']
+    assert lttb_indices(values, max_points).tolist() == reference_lttb(values.tolist(), max_points)
+
+
+def test_minmax_keeps_the_extremes():
+    values = make_bars(1000)['close']
+    kept = minmax_indices(values, 100)
+    assert len(kept) <= 100
+    assert kept[0] == 0 and kept[-1] == len(values) - 1
+    assert (np.diff(kept) > 0).all()
+    assert np.argmin(values) in kept
+    assert np.argmax(values) in kept
+
+
+def test_small_series_and_budgets_are_not_downsampled():
+    values = make_bars(10)['close']
+    assert lttb_indices(values, 10).tolist() == list(range(10))
+    assert lttb_indices(values, 2).tolist() == list(range(10))
+    assert minmax_indices(values, 3).tolist() == list(range(10))
+
+    bars = make_bars(500)
+    assert downsample_bars(bars, None) is bars
+    assert len(downsample_bars(bars, 50)) == 50
+    assert len(downsample_bars(bars, 50, 'minmax')) <= 50
+
+
+def test_ragged_time_series_rows_keep_their_columns():
+    row = {"1. open": "10", "2. high": "12", "3. low": "9", "4. close": "11", "5. volume": "100"}
+    bars = parse_time_series({
+        "2024-01-04": dict(row, **{"1. open": "30"}),
+        "2024-01-03": dict(row, **{"1. open": "20", "6. x": "99"}),
+        "2024-01-02": {key: row[key] for key in reversed(list(row))}
+    })
+    assert bars['open'].tolist() == [10.0, 20.0, 30.0]
+    assert bars['close'].tolist() == [11.0, 11.0, 11.0]
+    assert bars['volume'].tolist() == [100.0, 100.0, 100.0]
+
+
+def test_parse_interval():
+    assert parse_interval(None) == 'daily'
+    assert parse_interval('1d') == 'daily'
+    assert parse_interval('1WK') == 'weekly'
+    assert parse_interval('monthly') == 'monthly'
+    assert parse_interval('5d') == '5d'
+    assert parse_interval('hourly') == 'daily'
+    with pytest.raises(ValueError):
+        parse_interval('0d')
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight, AsyncSingleFlight
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start callers threads on flight.do(key, fn); results and errors fill in as they finish"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, kind, waiters):
+    while flight.stats().get(kind, {}).get("coalesced", 0) < waiters:
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"price": 1.0}
+
+    threads, results, errors = run_concurrently(flight, ('GLOBAL_QUOTE', 'AAPL'), fetch, 5)
+    wait_for_waiters(flight, 'GLOBAL_QUOTE', 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert errors == []
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    assert flight.stats() == {'GLOBAL_QUOTE': {"executed": 1, "coalesced": 4, "inFlight": 0}}
+
+
+def test_error_propagates_to_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    threads, results, errors = run_concurrently(flight, ('GLOBAL_QUOTE', 'AAPL'), fetch, 4)
+    wait_for_waiters(flight, 'GLOBAL_QUOTE', 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert len(errors) == 4
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+    # The failed call is not remembered: the next caller runs fn again
+    assert flight.do(('GLOBAL_QUOTE', 'AAPL'), lambda: "recovered") == "recovered"
+    assert flight.stats()['GLOBAL_QUOTE']["executed"] == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do(('GLOBAL_QUOTE', 'AAPL'), lambda: 'AAPL') == 'AAPL'
+    assert flight.do(('GLOBAL_QUOTE', 'MSFT'), lambda: 'MSFT') == 'MSFT'
+    assert flight.stats()['GLOBAL_QUOTE'] == {"executed": 2, "coalesced": 0, "inFlight": 0}
+
+
+def test_async_calls_share_one_task_and_its_error():
+    counters = SingleFlight()
+    flight = AsyncSingleFlight(counters)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "quote"
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do(('xai_chat', 'body'), fetch) for _ in range(3)))
+        failures = await asyncio.gather(*(flight.do(('xai_chat', 'other'), failing) for _ in range(3)),
+                                        return_exceptions=True)
+        return results, failures
+
+    results, failures = asyncio.run(main())
+    assert results == ["quote"] * 3
+    assert calls == [1]
+    assert all(isinstance(failure, RuntimeError) for failure in failures)
+    assert counters.stats()['xai_chat'] == {"executed": 2, "coalesced": 4, "inFlight": 0}
+
+
+def test_async_waiter_cancellation_does_not_cancel_the_call():
+    flight = AsyncSingleFlight(SingleFlight())
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "quote"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do(('xai_chat', 'body'), fetch))
+        second = asyncio.ensure_future(flight.do(('xai_chat', 'body'), fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "quote"
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from app.snapshots import SnapshotRefresher
+
+
+def test_first_readers_wait_for_the_build_in_flight():
+    refresher = SnapshotRefresher(interval=60)
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.2)
+        return {"value": 1}, []
+
+    refresher.register('indices', build)
+    # The scheduler's first pass is already building when the readers arrive
+    threading.Thread(target=refresher.refresh, args=('indices',)).start()
+    time.sleep(0.05)
+
+    results, errors = [], []
+
+    def read():
+        try:
+            results.append(refresher.get('indices').payload)
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert results == [{"value": 1}] * 3
+    assert len(builds) == 1
+
+
+def test_first_read_raises_when_the_build_fails():
+    refresher = SnapshotRefresher(interval=60)
+
+    def build():
+        raise ValueError("upstream down")
+
+    refresher.register('indices', build)
+    with pytest.raises(ValueError, match="upstream down"):
+        refresher.get('indices')
+    assert refresher.status()['indices']['lastError'] == "upstream down"
+
+
+def test_failed_rebuild_keeps_the_previous_snapshot():
+    refresher = SnapshotRefresher(interval=60)
+    payloads = iter([({"value": 1}, []), None])
+
+    def build():
+        result = next(payloads)
+        if result is None:
+            raise RuntimeError("rebuild failed")
+        return result
+
+    refresher.register('indices', build)
+    assert refresher.get('indices').payload == {"value": 1}
+    refresher.refresh('indices')
+    assert refresher.get('indices').payload == {"value": 1}
@@ -9,4 +9,8 @@ from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=os.environ.get('FLASK_DEBUG', 'false').lower() == 'true', use_reloader=False, host='0.0.0.0', port=3002) 
\ No newline at end of file
+    if os.environ.get('SERVER_MODE', 'sync').lower() == 'async':
+        import uvicorn
+        uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', '3002')))
+    else:
+        app.run(debug=os.environ.get('FLASK_DEBUG', 'false').lower() == 'true', use_reloader=False, host='0.0.0.0', port=int(os.environ.get('PORT', '3002'))) 
\ No newline at end of file
@@ -2,7 +2,8 @@ import React, { useState, useEffect, useCallback } from 'react';
 import { StockCard } from '../components/StockCard';
 import { StockManager } from '../components/StockManager';
 import financialDatasetsApi from '../services/financialDatasetsApi';
-import { Stock, NewsItem } from '../types/index';
+import { getStockQuotes } from '../services/stockApi';
+import { Stock, NewsItem, StockQuote } from '../types/index';
 import { Settings, RefreshCw, AlertCircle, TrendingUp, BarChart3, PieChart as PieIcon, ServerCrash } from 'lucide-react';
 import { PageHeader } from '../components/PageHeader';
 import toast from 'react-hot-toast';
@@ -157,13 +158,24 @@ export function StockMonitorPage() {
         return;
       }
 
+      // One /api/quotes request prices the whole watchlist; symbols it cannot quote fall back to FinancialDatasets
+      let batchQuotes: Record<string, StockQuote> = {};
+      try {
+        batchQuotes = await getStockQuotes(stocksList.map(stock => stock.symbol));
+      } catch (error) {
+        console.error('Error fetching batch quotes:', error);
+      }
+
       const loadedStocks: (Stock | (Stock & { error: true; errorMessage: string }))[] = await Promise.all(
         stocksList.map(async (stock, index): Promise<Stock | (Stock & { error: true; errorMessage: string })> => {
           try {
-            await new Promise(resolve => setTimeout(resolve, index * 500));
+            let apiData: any = batchQuotes[stock.symbol.toUpperCase()];
+            if (!apiData) {
+              await new Promise(resolve => setTimeout(resolve, index * 500));
 
-            console.log(`Fetching data for ${stock.symbol} using FinancialDatasets API...`);
-            const apiData = await financialDatasetsApi.getStockData(stock.symbol);
+              console.log(`Fetching data for ${stock.symbol} using FinancialDatasets API...`);
+              apiData = await financialDatasetsApi.getStockData(stock.symbol);
+            }
 
             const companyName = apiData.name || stock.name;
             const currentPrice = apiData.price ?? 0;
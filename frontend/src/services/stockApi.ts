@@ -18,6 +18,37 @@ export async function getStockQuote(symbol: string): Promise<StockQuote> {
   } as StockQuote;
 }
 
+export async function getStockQuotes(symbols: string[]): Promise<Record<string, StockQuote>> {
+  const unique = Array.from(new Set(symbols.map((symbol) => symbol.trim().toUpperCase()).filter(Boolean)));
+  if (unique.length === 0) {
+    return {};
+  }
+
+  const response = await fetch(`${API_BASE_URL}/api/quotes?symbols=${encodeURIComponent(unique.join(','))}`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch quotes for ${unique.join(', ')}: ${response.status}`);
+  }
+  const data = await response.json();
+
+  const quotes: Record<string, StockQuote> = {};
+  for (const [symbol, entry] of Object.entries<Record<string, any>>(data.quotes ?? {})) {
+    // Entries that are not 'ok' carry simulated prices (source "mock") when the backend falls back
+    if (entry.status !== 'ok' || !entry.quote) {
+      continue;
+    }
+    quotes[symbol] = {
+      price: entry.quote.regularMarketPrice ?? 0,
+      change: entry.quote.regularMarketChange ?? 0,
+      changePercent: entry.quote.regularMarketChangePercent ?? 0,
+      volume: entry.quote.regularMarketVolume ?? 0,
+      symbol: entry.quote.symbol,
+      name: entry.quote.shortName,
+      marketCap: entry.quote.marketCap ? String(entry.quote.marketCap) : null,
+    } as StockQuote;
+  }
+  return quotes;
+}
+
 export async function getCompanyOverview(symbol: string): Promise<{
   marketCap: string;
   peRatio: number | null;